@@ -1,12 +1,42 @@
-from .dbg_master import t_dbg_master_op, t_dbg_master_resp_type, t_dbg_master_request, t_dbg_master_response
-from .dbg_master import DbgMaster, DbgMasterMuxScript, DbgMasterFifoScript, DbgMasterSramScript
-from .dprintf import t_dprintf_byte, t_dprintf_req_4, t_dprintf_req_2, DprintfByte, Dprintf, DprintfBus
-from .fifo_status     import t_fifo_status, FifoStatus
-from .sram_access import t_sram_access_req, t_sram_access_resp, SramAccessBus, SramAccess, SramAccessRead, SramAccessWrite
-
-__all__ = [
-    t_dbg_master_op, t_dbg_master_resp_type, t_dbg_master_request, t_dbg_master_response, DbgMaster, DbgMasterMuxScript, DbgMasterFifoScript, DbgMasterSramScript,
-    t_dprintf_byte, t_dprintf_req_4, t_dprintf_req_2, DprintfByte, Dprintf, DprintfBus,
-    t_fifo_status, FifoStatus,
-    t_sram_access_req, t_sram_access_resp, SramAccessBus, SramAccess, SramAccessRead, SramAccessWrite
-]
+#a Documentation
+# Submodules are imported on first use of one of their names, so that
+# 'from regress.utils import Dprintf' only loads dprintf.py
+
+#a Imports
+import importlib
+
+#v Exported names and the submodule that provides each
+_submodule_of_name = {}
+for (_submodule, _names) in [
+        ("dbg_master",  ["t_dbg_master_op", "t_dbg_master_resp_type", "t_dbg_master_request", "t_dbg_master_response",
+                         "DbgMaster", "DbgMasterMuxScript", "DbgMasterFifoScript", "DbgMasterSramScript",
+                         "DbgMasterResponse", "DbgMasterBufferSink", "DbgMasterFileSink", "DbgMasterQueue"]),
+        ("dbg_master_model", ["DbgFifoModel", "DbgSramModel", "DbgMasterFifoSinkModel", "DbgMasterSramAccessModel",
+                              "DbgMasterMuxModel", "DbgMasterModelCheck"]),
+        ("dbg_master_cost", ["DbgMasterCost", "DbgMasterCostEstimator"]),
+        ("dbg_fifo_drain", ["DbgFifoDrain"]),
+        ("dprintf",     ["t_dprintf_byte", "t_dprintf_req_4", "t_dprintf_req_2", "DprintfByte", "Dprintf", "DprintfBus", "dprintf_pack"]),
+        ("dprintf_display", ["DprintfDisplay"]),
+        ("dprintf_catalogue", ["DprintfCatalogue"]),
+        ("fifo_status", ["t_fifo_status", "FifoStatus"]),
+        ("sram_access", ["t_sram_access_req", "t_sram_access_resp", "SramAccessBus", "SramAccess", "SramAccessRead", "SramAccessWrite"]),
+        ("lfsr",        ["Lfsr", "max_lfsr"]),
+        ("crc",         ["crc_catalogue"]),
+        ]:
+    for _name in _names: _submodule_of_name[_name] = _submodule
+    pass
+del _submodule, _names, _name
+
+__all__ = list(_submodule_of_name.keys())
+
+#f __getattr__
+def __getattr__(name:str):
+    if name not in _submodule_of_name:
+        raise AttributeError("module %r has no attribute %r"%(__name__, name))
+    value = getattr(importlib.import_module("."+_submodule_of_name[name], __name__), name)
+    globals()[name] = value
+    return value
+
+#f __dir__
+def __dir__():
+    return sorted(set(list(globals().keys()) + __all__))
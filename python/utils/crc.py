@@ -1,3 +1,12 @@
+#a Imports
+import os
+import math
+import mmap
+import struct
+import zlib
+from .gf2 import gf2_mulmod, gf2_xpow
+
+#a Useful functions
 def int_of_bits(bits):
     l = len(bits)
     m = 1<<(l-1)
@@ -15,41 +24,197 @@ def bits_of_n(nbits, n):
         pass
     return bits
 
-class crc(object):
-    init=0xffffffff
-    poly=0x04C11DB7
-    nbits=32
-    def __init__(self, value=None):
-        self.value = value
-        if value is None: self.value = self.init
-        self.mask=(1<<self.nbits)-1
+#a Table-driven CRC
+# The tables are for the MSB-first (unreflected) CRC that crc.do_crc
+# implements one bit at a time; table k entry b is the CRC register
+# contribution of byte b followed by k zero bytes, i.e. b.x^(nbits+8k) mod poly
+#v Byte bit-reversal table
+_byte_reverse = bytes(int("{:08b}".format(i)[::-1], 2) for i in range(256))
+
+#v Cache of slice-by-8 tables keyed on (poly, nbits)
+_crc_tables = {}
+
+#f crc_tables
+def crc_tables(poly:int, nbits:int) -> list[list[int]]:
+    """
+    Return the eight 256-entry tables for slice-by-8 CRC of the polynomial
+    (without its top bit); generated on first use and then cached
+    """
+    key = (poly, nbits)
+    if key in _crc_tables: return _crc_tables[key]
+    poly = poly | (1<<nbits)
+    def reduce(v, top):
+        for i in range(top, nbits-1, -1):
+            if (v>>i)&1: v ^= poly<<(i-nbits)
+            pass
+        return v
+    tables = [[reduce(b<<nbits, nbits+7) for b in range(256)]]
+    for k in range(7):
+        t = tables[-1]
+        tables.append([reduce(t[b]<<8, nbits+7) for b in range(256)])
         pass
-    def clk_once(self):
-        self.value = self.value<<1
-        if (self.value>>self.nbits):
-            self.value = self.value ^ ((1<<self.nbits) ^ self.poly)
+    _crc_tables[key] = tables
+    return tables
+
+#f bit_reverse
+def bit_reverse(value:int, nbits:int) -> int:
+    """
+    Reverse the bottom nbits bits of value, using the byte-reverse table
+    """
+    nbytes = (nbits+7) // 8
+    r = int.from_bytes(value.to_bytes(nbytes,"little").translate(_byte_reverse),"big")
+    return r >> (8*nbytes-nbits)
+
+#f crc_bytes
+def crc_bytes(value:int, data, poly:int, nbits:int, reflect_in:bool=False) -> int:
+    """
+    Run the bytes of data (bytes, bytearray or memoryview) MSB first through a
+    CRC register starting at value, and return the resulting register; if
+    reflect_in is set then each byte is bit-reversed first (i.e. LSB first)
+
+    This gives the same result as crc.do_crc with the bits of each byte
+    presented MSB first
+    """
+    data = memoryview(data).cast("B")
+    if (nbits==32) and (poly==0x04C11DB7):
+        # zlib provides the bit-reflected version of this polynomial in C
+        data = bytes(data)
+        if not reflect_in: data = data.translate(_byte_reverse)
+        r = zlib.crc32(data, bit_reverse(value,32) ^ 0xffffffff) ^ 0xffffffff
+        return bit_reverse(r,32)
+    if reflect_in:
+        data = memoryview(bytes(data).translate(_byte_reverse))
+        pass
+    if len(data)>=crc_block_threshold and 8<=nbits<=64 and _numpy() is not None:
+        return crc_bytes_blocks(value, data, poly, nbits)
+    tables = crc_tables(poly, nbits)
+    mask = (1<<nbits)-1
+    n = len(data) // 8
+    if nbits<=64 and n>0:
+        (t0, t1, t2, t3, t4, t5, t6, t7) = tables
+        shift = 64 - nbits
+        for w in struct.unpack(">%dQ"%n, data[:n*8]):
+            w ^= value << shift
+            value = (t7[w>>56] ^ t6[(w>>48)&0xff] ^ t5[(w>>40)&0xff] ^ t4[(w>>32)&0xff] ^
+                     t3[(w>>24)&0xff] ^ t2[(w>>16)&0xff] ^ t1[(w>>8)&0xff] ^ t0[w&0xff])
             pass
+        data = data[n*8:]
         pass
-    def clk(self,n):
-        for i in range(n):
-            self.clk_once()
+    t0 = tables[0]
+    if nbits<8:
+        for b in data:
+            value = t0[(value<<(8-nbits)) ^ b]
             pass
+        return value
+    shift = nbits - 8
+    for b in data:
+        value = ((value<<8) & mask) ^ t0[(value>>shift) ^ b]
         pass
-    def do_crc(self,bits):
-        for b in bits:
-            self.value ^= b<<(self.nbits-1)
-            self.clk_once()
+    return value
+
+#a Block-parallel CRC
+# For large buffers (with numpy available) the data is split into M blocks
+# of B bytes, whose CRCs (from a zero register) are found together one
+# byte column at a time with numpy table gathers, as crc.batch does. The
+# block CRCs are then folded in order: the register before a block is
+# advanced past it (multiplied by x^(8B), a linear map applied with one
+# table lookup per byte of the register) and the block CRC added in.
+#
+# M of about 4.sqrt(length) balances the B numpy steps against the M
+# Python fold steps.
+#v Smallest buffer for which crc_bytes uses the block-parallel path
+crc_block_threshold = 1<<14
+
+#v numpy module, once imported (False if it is not available)
+_np = None
+
+#f _numpy
+def _numpy():
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+            pass
+        except ImportError:
+            _np = False
             pass
         pass
-    def bit_reverse(self):
-        x = bits_of_n(self.nbits, self.value)
-        x.reverse()
-        return int_of_bits(x)
+    return _np or None
+
+#f crc_shift_tables
+def crc_shift_tables(poly:int, nbits:int, shift:int) -> list[list[int]]:
+    """
+    Return one 256-entry table per byte of the CRC register, whose XOR
+    gives the register multiplied by x^shift mod poly (i.e. advanced past
+    shift zero bits)
+    """
+    poly = poly | (1<<nbits)
+    m = gf2_xpow(shift, poly)
+    basis = [gf2_mulmod(1<<i, m, poly) for i in range(nbits)] + [0]*7
+    tables = []
+    for k in range(0, nbits, 8):
+        t = [0]*256
+        for b in range(1,256):
+            t[b] = t[b&(b-1)] ^ basis[k+(b&-b).bit_length()-1]
+            pass
+        tables.append(t)
+        pass
+    return tables
 
+#f crc_bytes_blocks
+def crc_bytes_blocks(value:int, data, poly:int, nbits:int) -> int:
+    """
+    As crc_bytes (without reflect_in) for 8 to 64 bit CRCs, computing the
+    CRCs of blocks of the data in parallel with numpy
+    """
+    np = _numpy()
+    data = np.frombuffer(data, dtype=np.uint8)
+    num_blocks = 4*math.isqrt(len(data))
+    block = len(data) // num_blocks
+    columns = np.ascontiguousarray(data[:num_blocks*block].reshape(num_blocks, block).T)
+    table = np.array(crc_tables(poly, nbits)[0], dtype=np.uint64)
+    mask = np.uint64((1<<nbits)-1)
+    down = np.uint64(nbits-8)
+    eight = np.uint64(8)
+    v = np.zeros(num_blocks, dtype=np.uint64)
+    for column in columns:
+        v = ((v << eight) & mask) ^ table[(v >> down) ^ column]
+        pass
+    shift_tables = list(enumerate(crc_shift_tables(poly, nbits, 8*block)))
+    for c in v.tolist():
+        for (k, t) in shift_tables: c ^= t[(value>>(8*k)) & 0xff]
+        value = c
+        pass
+    return crc_bytes(value, data[num_blocks*block:], poly, nbits)
+
+#f crc_file_chunk
+def crc_file_chunk(path:str, offset:int, length:int, poly:int, nbits:int, reflect_in:bool=False) -> int:
+    """
+    CRC register (starting from zero) of length bytes of a file at offset,
+    each byte reflected first if reflect_in; used by crc.of_file for each
+    chunk handed to a worker process
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            with memoryview(m) as mv:
+                return crc_bytes(0, mv[offset:offset+length], poly, nbits, reflect_in)
+            pass
+        pass
+    pass
+
+#a CRC class
+# The class attributes follow the Rocksoft CRC model: 'value' is the
+# unreflected CRC register, and result() applies reflect_out and xorout
 class crc(object):
+    name="CRC-32/MPEG-2"
     init=0xffffffff
     poly=0x04C11DB7
     nbits=32
+    reflect_in=False
+    reflect_out=False
+    xorout=0
+    check=0x0376E6E7 # result for b"123456789"
     def __init__(self, value=None):
         self.value = value
         if value is None: self.value = self.init
@@ -62,9 +227,12 @@ class crc(object):
             pass
         pass
     def clk(self,n):
-        for i in range(n):
-            self.clk_once()
-            pass
+        """
+        Equivalent to n calls of clk_once (or stepping backwards for
+        negative n), using x^n mod poly by square-and-multiply
+        """
+        poly = self.poly | (1<<self.nbits)
+        self.value = gf2_mulmod(self.value, gf2_xpow(n, poly), poly)
         pass
     def do_crc(self,bits):
         for b in bits:
@@ -72,12 +240,298 @@ class crc(object):
             self.clk_once()
             pass
         pass
+    def do_crc_bytes(self, data):
+        """
+        Table-driven equivalent of do_crc for a bytes-like object, with each
+        byte presented MSB first (LSB first if reflect_in is set)
+        """
+        self.value = crc_bytes(self.value, data, self.poly, self.nbits, self.reflect_in)
+        pass
+    def update(self, data):
+        """
+        Add a chunk of bytes to the CRC; chunks may be of any size, and
+        the result is the same as a single do_crc_bytes of all the data
+        """
+        self.do_crc_bytes(data)
+        return self
+    @classmethod
+    def combine(cls, crc_a:int, crc_b:int, len_b:int) -> int:
+        """
+        Given the CRC register values (each started from init) of data A and
+        of data B of len_b bytes, return the register value of A followed by B
+        """
+        poly = cls.poly | (1<<cls.nbits)
+        return crc_b ^ gf2_mulmod(crc_a ^ cls.init, gf2_xpow(8*len_b, poly), poly)
+    @classmethod
+    def of_file(cls, path:str, processes:int=1, chunk_size:int=1<<24):
+        """
+        Return a CRC object for the contents of a file, read in chunks so
+        memory use is bounded by chunk_size; if processes is greater than 1
+        (or None for one per CPU) then the chunks are handed to a process
+        pool and the results combined
+        """
+        c = cls()
+        size = os.path.getsize(path)
+        if processes==1 or size<=chunk_size:
+            buffer = bytearray(chunk_size)
+            with open(path, "rb") as f:
+                while True:
+                    n = f.readinto(buffer)
+                    if n==0: break
+                    with memoryview(buffer) as mv:
+                        c.update(mv[:n])
+                        pass
+                    pass
+                pass
+            return c
+        from concurrent.futures import ProcessPoolExecutor
+        # Each chunk CRC is from a zero register, so the running value just
+        # needs advancing past the chunk before the chunk CRC is added in
+        poly = cls.poly | (1<<cls.nbits)
+        offsets = range(0, size, chunk_size)
+        lengths = [min(chunk_size, size-o) for o in offsets]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunk_crcs = pool.map(crc_file_chunk,
+                                  [path]*len(lengths), offsets, lengths,
+                                  [cls.poly]*len(lengths), [cls.nbits]*len(lengths), [cls.reflect_in]*len(lengths))
+            for (r, l) in zip(chunk_crcs, lengths):
+                c.value = r ^ gf2_mulmod(c.value, gf2_xpow(8*l, poly), poly)
+                pass
+            pass
+        return c
     def bit_reverse(self):
-        x = bits_of_n(self.nbits, self.value)
-        x.reverse()
-        return int_of_bits(x)
-for i in range(64):#range(16):
-    x=crc(1)
-    #ib = bits_of_n(16,i)
-    #x.do_crc(ib)
-    x.clk(i+8)
+        return bit_reverse(self.value, self.nbits)
+    def result(self) -> int:
+        """
+        Return the CRC of the data so far, with reflect_out and xorout applied
+        """
+        v = self.value
+        if self.reflect_out: v = bit_reverse(v, self.nbits)
+        return v ^ self.xorout
+    @classmethod
+    def batch(cls, packets, lengths=None):
+        """
+        Return a numpy array of the CRC results (as result()) of many packets
+
+        packets is a 2-D uint8 array with one packet per row, or a list of
+        bytes-like packets; lengths (optional for a list) gives the number of
+        valid bytes in each row if the packets are padded. The packets are
+        processed together, one byte column at a time, with table gathers
+
+        The result is uint32 for CRCs of up to 32 bits, else uint64; CRCs of
+        more than 64 bits are not supported (ValueError); no packets give an
+        empty array
+        """
+        if cls.nbits>64: raise ValueError("crc.batch supports CRCs of up to 64 bits, not %d"%cls.nbits)
+        import numpy as np
+        if len(packets)==0: return np.zeros(0, dtype=np.uint32 if cls.nbits<=32 else np.uint64)
+        if not isinstance(packets, np.ndarray):
+            if lengths is None: lengths = [len(p) for p in packets]
+            data = np.zeros((len(packets), max(lengths, default=0)), dtype=np.uint8)
+            for (i,p) in enumerate(packets):
+                data[i,:len(p)] = np.frombuffer(p, dtype=np.uint8)
+                pass
+            pass
+        else:
+            data = packets.astype(np.uint8, copy=False).reshape(len(packets),-1)
+            pass
+        (n, width) = data.shape
+        if cls.reflect_in:
+            data = np.frombuffer(_byte_reverse, dtype=np.uint8)[data]
+            pass
+        # Sort by descending length so that at each column only a prefix of
+        # the rows is still active
+        order = None
+        active = [n] * width
+        if lengths is not None:
+            lengths = np.asarray(lengths)
+            order = np.argsort(-lengths, kind="stable")
+            data = data[order]
+            active = np.searchsorted(-lengths[order], -np.arange(width), side="left")
+            pass
+        columns = np.ascontiguousarray(data.T)
+        dtype = np.uint32 if cls.nbits<=32 else np.uint64
+        table = np.array(crc_tables(cls.poly, cls.nbits)[0], dtype=dtype)
+        mask = dtype((1<<cls.nbits)-1)
+        v = np.full(n, cls.init, dtype=dtype)
+        if cls.nbits<8:
+            up = dtype(8-cls.nbits)
+            for j in range(width):
+                k = active[j]
+                v[:k] = table[(v[:k] << up) ^ columns[j,:k]]
+                pass
+            pass
+        else:
+            down = dtype(cls.nbits-8)
+            eight = dtype(8)
+            for j in range(width):
+                k = active[j]
+                vk = v[:k]
+                v[:k] = ((vk << eight) & mask) ^ table[(vk >> down) ^ columns[j,:k]]
+                pass
+            pass
+        v = v.astype(np.uint64)
+        if cls.reflect_out:
+            rev = np.frombuffer(_byte_reverse, dtype=np.uint8)
+            v = rev[v.astype("<u8").view(np.uint8).reshape(n,8)[:,::-1]]
+            v = np.ascontiguousarray(v).view("<u8").reshape(n) >> np.uint64(64-cls.nbits)
+            pass
+        v = v ^ np.uint64(cls.xorout)
+        if order is not None:
+            r = np.empty_like(v)
+            r[order] = v
+            v = r
+            pass
+        if cls.nbits<=32: return v.astype(np.uint32)
+        return v.astype(np.uint64)
+    @classmethod
+    def validate(cls) -> bool:
+        """
+        Check the model against its check value
+        """
+        return cls().update(b"123456789").result() == cls.check
+    pass
+
+#a CRC catalogue
+# Parameters from the catalogue of parametrised CRC algorithms at
+# https://reveng.sourceforge.io/crc-catalogue/
+#c CRC-8
+class Crc8_Smbus(crc):
+    name="CRC-8/SMBUS"
+    nbits=8
+    poly=0x07
+    init=0
+    check=0xF4
+    pass
+class Crc8_MaximDow(crc):
+    name="CRC-8/MAXIM-DOW"
+    nbits=8
+    poly=0x31
+    init=0
+    reflect_in=True
+    reflect_out=True
+    check=0xA1
+    pass
+class Crc8_Bluetooth(crc):
+    name="CRC-8/BLUETOOTH"
+    nbits=8
+    poly=0xA7
+    init=0
+    reflect_in=True
+    reflect_out=True
+    check=0x26
+    pass
+
+#c CRC-16
+class Crc16_Xmodem(crc):
+    name="CRC-16/XMODEM"
+    nbits=16
+    poly=0x1021
+    init=0
+    check=0x31C3
+    pass
+class Crc16_Ibm3740(crc):
+    name="CRC-16/IBM-3740"
+    nbits=16
+    poly=0x1021
+    init=0xFFFF
+    check=0x29B1
+    pass
+class Crc16_Kermit(crc):
+    name="CRC-16/KERMIT"
+    nbits=16
+    poly=0x1021
+    init=0
+    reflect_in=True
+    reflect_out=True
+    check=0x2189
+    pass
+class Crc16_Arc(crc):
+    name="CRC-16/ARC"
+    nbits=16
+    poly=0x8005
+    init=0
+    reflect_in=True
+    reflect_out=True
+    check=0xBB3D
+    pass
+class Crc16_Modbus(crc):
+    name="CRC-16/MODBUS"
+    nbits=16
+    poly=0x8005
+    init=0xFFFF
+    reflect_in=True
+    reflect_out=True
+    check=0x4B37
+    pass
+class Crc16_Usb(crc):
+    name="CRC-16/USB"
+    nbits=16
+    poly=0x8005
+    init=0xFFFF
+    reflect_in=True
+    reflect_out=True
+    xorout=0xFFFF
+    check=0xB4C8
+    pass
+
+#c CRC-32
+class Crc32_IsoHdlc(crc):
+    name="CRC-32/ISO-HDLC"
+    reflect_in=True
+    reflect_out=True
+    xorout=0xFFFFFFFF
+    check=0xCBF43926
+    pass
+class Crc32_Bzip2(crc):
+    name="CRC-32/BZIP2"
+    xorout=0xFFFFFFFF
+    check=0xFC891918
+    pass
+class Crc32_Mpeg2(crc):
+    pass
+class Crc32_Iscsi(crc):
+    name="CRC-32/ISCSI"
+    poly=0x1EDC6F41
+    reflect_in=True
+    reflect_out=True
+    xorout=0xFFFFFFFF
+    check=0xE3069283
+    pass
+
+#c CRC-64
+class Crc64_Ecma182(crc):
+    name="CRC-64/ECMA-182"
+    nbits=64
+    poly=0x42F0E1EBA9EA3693
+    init=0
+    check=0x6C40DF5F0B497347
+    pass
+class Crc64_Xz(crc):
+    name="CRC-64/XZ"
+    nbits=64
+    poly=0x42F0E1EBA9EA3693
+    init=0xFFFFFFFFFFFFFFFF
+    reflect_in=True
+    reflect_out=True
+    xorout=0xFFFFFFFFFFFFFFFF
+    check=0x995DC9BBDF1939FA
+    pass
+class Crc64_GoIso(crc):
+    name="CRC-64/GO-ISO"
+    nbits=64
+    poly=0x1B
+    init=0xFFFFFFFFFFFFFFFF
+    reflect_in=True
+    reflect_out=True
+    xorout=0xFFFFFFFFFFFFFFFF
+    check=0xB90956C775A41001
+    pass
+
+#v crc_catalogue
+crc_catalogue = { c.name:c for c in [
+    Crc8_Smbus, Crc8_MaximDow, Crc8_Bluetooth,
+    Crc16_Xmodem, Crc16_Ibm3740, Crc16_Kermit, Crc16_Arc, Crc16_Modbus, Crc16_Usb,
+    Crc32_IsoHdlc, Crc32_Bzip2, Crc32_Mpeg2, Crc32_Iscsi,
+    Crc64_Ecma182, Crc64_Xz, Crc64_GoIso,
+    ] }
@@ -0,0 +1,188 @@
+#a Copyright
+#
+#  This file 'dbg_fifo_drain.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Drain a FIFO through a dbg_master_fifo_sink (behind a dbg_master_mux)
+# to a response sink, such as a DbgMasterBufferSink.
+#
+# Every script reads the entries the last status showed and then reads
+# the status, so the next burst is sized from the entries_full of that
+# status. Only the drain pops the FIFO, so the burst never reads an empty
+# FIFO (and never fails a poll), and no script is spent on status alone
+# unless the FIFO was empty.
+#
+# Between scripts the drain waits for the FIFO to fill to target_burst
+# entries, at the fill rate measured from successive status words (an
+# average weighted to recent scripts); when no entries arrive the wait
+# doubles, up to max_interval. target_burst defaults to the smallest
+# burst whose [read, status] script the DbgMasterCostEstimator puts within
+# 90% of the bytes per cycle of the longest burst.
+#
+# Each script is run through a DbgMasterQueue, whose report gives the
+# scripts and cycles of the drain as a whole.
+
+#a Imports
+from typing import Callable, Optional
+from .fifo_status import FifoStatus
+from .dbg_master import DbgMaster, DbgMasterQueue, DbgMasterResponse, DbgMasterMuxScript, DbgMasterFifoScript, max_fifo_read_count, compile_fifo_ops
+from .dbg_master_cost import DbgMasterCostEstimator
+from .dbg_master_model import fifo_read_chunks
+
+#a DbgFifoDrain
+#c DbgFifoDrain
+class DbgFifoDrain:
+    """
+    Adaptive drain of a FIFO through a DbgMaster, streaming each response
+    of entry data to sink
+    """
+    efficiency : float = 0.9
+    #f __init__
+    def __init__(self, dbg_master:DbgMaster, bfm_wait, sink:Callable[[DbgMasterResponse],None],
+                 select:int=1, entry_bits:int=64, inter_data_idle=lambda :0,
+                 target_burst:Optional[int]=None, max_burst:int=max_fifo_read_count,
+                 max_interval:int=4096, fifo_size:Optional[int]=None, cycles_to_run:int=1<<20):
+        self.queue = DbgMasterQueue(dbg_master, bfm_wait, inter_data_idle, cycles_to_run)
+        self.dbg_master = dbg_master
+        self.sink = sink
+        self.select = select
+        self.entry_bits = entry_bits
+        self.max_burst = max_burst
+        self.max_interval = max_interval
+        self.fifo_size = fifo_size
+        self.responses_per_entry = len(fifo_read_chunks(compile_fifo_ops((("read", entry_bits, 1),))[0]))
+        if target_burst is None: target_burst = self.best_burst()
+        self.target_burst = target_burst
+        self.status = None
+        self.entries = 0
+        self.status_cycle = 0
+        self.fill_rate = 0.0
+        self.rate_samples = 0
+        self.interval = 0
+        self.scripts = 0
+        self.empty_polls = 0
+        self.entries_read = 0
+        self.bytes_read = 0
+        pass
+    #f best_burst
+    def best_burst(self) -> int:
+        """
+        Smallest burst whose script returns bytes at efficiency of the rate
+        of the longest burst (by the cost estimate)
+        """
+        estimator = DbgMasterCostEstimator(start_gap=0)
+        best = estimator.estimate(self.script(self.max_burst)).bytes_per_cycle()
+        n = 1
+        while n<self.max_burst:
+            if estimator.estimate(self.script(n)).bytes_per_cycle() >= self.efficiency * best: break
+            n *= 2
+            pass
+        return min(n, self.max_burst)
+    #f script
+    def script(self, n:int) -> DbgMasterMuxScript:
+        """
+        Script to read n entries and then the FIFO status
+        """
+        ops = [("read", self.entry_bits, n), "status"] if n>0 else ["status"]
+        return DbgMasterMuxScript(self.select, False, DbgMasterFifoScript(ops))
+    #f cycles
+    @property
+    def cycles(self) -> int:
+        return self.queue.cycles
+    #f poll
+    def poll(self) -> int:
+        """
+        Run one script, reading the entries the last status showed and then
+        the status; returns the number of entries read
+        """
+        n = min(self.entries, self.max_burst)
+        data_responses = n * self.responses_per_entry
+        status = None
+        def on_response(response:DbgMasterResponse) -> None:
+            nonlocal data_responses, status
+            if data_responses>0:
+                self.sink(response)
+                self.bytes_read += response.num_bytes
+                data_responses -= 1
+                pass
+            else:
+                status = response
+                pass
+            pass
+        future = self.queue.submit(self.script(n), on_response)
+        self.queue.run()
+        (completion, data_returned) = future.result()
+        self.scripts += 1
+        if completion!="ok" or status is None or data_responses>0:
+            raise RuntimeError("FIFO drain script of %d entries completed %s with %d responses missing"%(n, completion, data_responses))
+        status = FifoStatus.of_csr32(status.value, self.fifo_size)
+        arrived = status.entries_full - (self.entries - n)
+        elapsed = self.cycles - self.status_cycle
+        if self.status is not None and elapsed>0:
+            self.fill_rate = (self.fill_rate + arrived/elapsed) / 2 if self.rate_samples>0 else arrived/elapsed
+            self.rate_samples += 1
+            pass
+        self.status = status
+        self.status_cycle = self.cycles
+        self.entries = status.entries_full
+        self.entries_read += n
+        if n==0 and self.entries==0: self.empty_polls += 1
+        return n
+    #f next_interval
+    def next_interval(self) -> int:
+        """
+        Cycles to wait before the next script, for the FIFO to reach
+        target_burst entries at the measured fill rate
+        """
+        if self.entries>=self.target_burst or self.status.full:
+            self.interval = 0
+            pass
+        elif self.fill_rate>0:
+            self.interval = int((self.target_burst - self.entries) / self.fill_rate)
+            pass
+        else:
+            self.interval = max(1, 2*self.interval)
+            pass
+        self.interval = min(self.interval, self.max_interval)
+        return self.interval
+    #f run
+    def run(self, cycles:int, until_empty:bool=False) -> int:
+        """
+        Drain for (at least) cycles cycles, or until a status shows the
+        FIFO empty if until_empty; returns the entries read
+        """
+        end = self.cycles + cycles
+        entries_read = self.entries_read
+        while self.cycles < end:
+            self.poll()
+            if until_empty and self.entries==0: break
+            interval = min(self.next_interval(), end-self.cycles)
+            if interval>0: self.queue.bfm_wait(interval)
+            pass
+        return self.entries_read - entries_read
+    #f bytes_per_cycle
+    def bytes_per_cycle(self) -> float:
+        if self.cycles==0: return 0.0
+        return self.bytes_read / self.cycles
+    #f report
+    def report(self) -> str:
+        """
+        Sustained throughput of the drain
+        """
+        return "%d entries (%d bytes) in %d cycles, %.3f bytes/cycle; %d scripts (%d empty), fill rate %.4f entries/cycle, burst target %d"%(
+            self.entries_read, self.bytes_read, self.cycles, self.bytes_per_cycle(),
+            self.scripts, self.empty_polls, self.fill_rate, self.target_burst)
+    pass
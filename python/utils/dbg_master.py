@@ -1,3 +1,13 @@
+#a Imports
+# typing and concurrent.futures are slow to import (see 'make
+# import_time'), so annotations are not evaluated and Future is imported
+# on first use
+from __future__ import annotations
+import time
+from collections import deque, namedtuple
+from collections.abc import Callable, Iterator
+from functools import lru_cache
+
 #a Structs
 #t t_dbg_master_op
 t_dbg_master_op = {
@@ -32,66 +42,222 @@ t_dbg_master_response  = {
     "data":32,
 }
 
+#v Integer op and response type values, and masks for bytes_valid of 0 to 7
+_op_idle        = t_dbg_master_op["dbg_op_idle"]
+_op_start_clear = t_dbg_master_op["dbg_op_start_clear"]
+_op_data        = t_dbg_master_op["dbg_op_data"]
+_op_data_last   = t_dbg_master_op["dbg_op_data_last"]
+_resp_idle      = t_dbg_master_resp_type["dbg_resp_idle"]
+_resp_running   = t_dbg_master_resp_type["dbg_resp_running"]
+_completion_of_resp_type = {
+    t_dbg_master_resp_type["dbg_resp_completed"]:   "ok",
+    t_dbg_master_resp_type["dbg_resp_errored"]:     "errored",
+    t_dbg_master_resp_type["dbg_resp_poll_failed"]: "poll_failed",
+}
+_bytes_valid_mask = (0, 0xff, 0xffff, 0xffffff, 0xffffffff, 0, 0, 0)
+
+#a Script compilation
+# Script ops are compiled with adjacent compatible reads merged and long
+# reads split into the largest bursts the targets support; the data
+# returned is unchanged.
+#
+# A FIFO read (or read_err) op of B bytes per entry and N entries is the
+# opcode 64 (128) + B-1 then N-1 in 16 bits. B is 1 to 32 (the sink
+# presents only four 64-bit words of an entry). The sink loads its 16-bit
+# word count with N, so N of 65536 would read one entry;
+# max_fifo_read_count is therefore 65535. Reading an empty FIFO completes
+# the whole script, so adjacent reads of the same kind and width merge
+# exactly.
+#
+# An SRAM read op of B bytes per word (1 to 8), address A and N words is
+# the opcode 64 + B-1, A in 16 bits, then N-1 in 16 bits. Reads of the
+# same width merge if the second starts where the first ends, up to
+# max_sram_read_count words; as A is 16 bits, a longer read cannot be
+# split.
+
+#v Limits of read ops
+max_fifo_read_count = 0xffff
+max_fifo_read_bytes = 32
+max_sram_read_count = 0x10000
+max_sram_read_bytes = 8
+
+#f read_bytes_per_entry
+def read_bytes_per_entry(op, max_bytes:int) -> int:
+    """
+    Return the bytes per entry of a read op, given in bits
+    """
+    bits = op[1]
+    if bits%8!=0 or bits<8 or bits>8*max_bytes:
+        raise ValueError("Read width of %r must be a multiple of 8 bits from 8 to %d"%(op, 8*max_bytes))
+    return bits//8
+
+#f compile_fifo_ops
+@lru_cache(maxsize=1024)
+def compile_fifo_ops(ops:tuple) -> bytes:
+    """
+    Compile a tuple of FIFO script ops: "status", ("read", bits, n) or
+    ("read_err", bits, n)
+    """
+    merged = []
+    for op in ops:
+        if op=="status":
+            merged.append([0, 0])
+            continue
+        if op[0] not in ("read", "read_err"):
+            raise ValueError("Unknown FIFO script op %r"%(op,))
+        opcode = (64 if op[0]=="read" else 128) + read_bytes_per_entry(op, max_fifo_read_bytes)-1
+        count = op[2]
+        if count<0: raise ValueError("Negative count in FIFO script op %r"%(op,))
+        if count==0: continue
+        if merged and merged[-1][0]==opcode:
+            merged[-1][1] += count
+            continue
+        merged.append([opcode, count])
+        pass
+    r = bytearray()
+    for (opcode, count) in merged:
+        if opcode==0:
+            r.append(0)
+            continue
+        while count>0:
+            n = min(count, max_fifo_read_count)
+            r.append(opcode)
+            r += (n-1).to_bytes(2, "little")
+            count -= n
+            pass
+        pass
+    return bytes(r)
+
+#f compile_sram_ops
+@lru_cache(maxsize=1024)
+def compile_sram_ops(ops:tuple) -> bytes:
+    """
+    Compile a tuple of SRAM script ops: ("read", bits, address, n)
+    """
+    merged = []
+    for op in ops:
+        if op[0]!="read":
+            raise ValueError("Unknown SRAM script op %r"%(op,))
+        opcode = 64 + read_bytes_per_entry(op, max_sram_read_bytes)-1
+        (address, count) = (op[2], op[3])
+        if address<0 or address>0xffff:
+            raise ValueError("Address of SRAM script op %r must be 16 bits"%(op,))
+        if count<0 or count>max_sram_read_count:
+            raise ValueError("Count of SRAM script op %r must be at most %d"%(op, max_sram_read_count))
+        if count==0: continue
+        if merged:
+            (last_opcode, last_address, last_count) = merged[-1]
+            if (last_opcode==opcode and last_address+last_count==address and
+                last_count+count<=max_sram_read_count):
+                merged[-1][2] += count
+                continue
+            pass
+        merged.append([opcode, address, count])
+        pass
+    r = bytearray()
+    for (opcode, address, count) in merged:
+        r.append(opcode)
+        r += address.to_bytes(2, "little")
+        r += (count-1).to_bytes(2, "little")
+        pass
+    return bytes(r)
+
+#f script_ops
+def script_ops(ops) -> tuple:
+    """
+    Return ops as a (hashable) tuple of strings and tuples
+    """
+    return tuple([op if isinstance(op, str) else tuple(op) for op in ops])
+
 #a DbgMasterMuxScript
 class DbgMasterMuxScript:
     def __init__(self, select:int, clear:bool, subscript):
         self.select = select
         self.clear = clear
         self.subscript = subscript
+        self.compiled = (None, b"")
         pass
     def as_bytes(self) -> bytes:
-        r = bytearray(self.subscript.as_bytes())
-        if self.clear:
-            r.insert(0,128 + self.select)
+        """
+        Script bytes; memoized on the header and the subscript bytes, so
+        changing select, clear or the subscript recompiles
+        """
+        header = (128 if self.clear else 0) + self.select
+        subscript_bytes = self.subscript.as_bytes()
+        (key, compiled) = self.compiled
+        if key is None or key[0]!=header or key[1] is not subscript_bytes:
+            compiled = bytes([header]) + subscript_bytes
+            self.compiled = ((header, subscript_bytes), compiled)
             pass
-        else:
-            r.insert(0,self.select)
-            pass
-        return r
+        return compiled
     pass
 
 #a DbgMasterFifoScript
 class DbgMasterFifoScript:
+    """
+    FIFO sink script; ops are compiled (and memoized) by compile_fifo_ops,
+    so the script may be changed (even in place) between calls of as_bytes
+    """
     def __init__(self, ops):
-        self.ops = ops
+        self.ops = script_ops(ops)
         pass
     def as_bytes(self) -> bytes:
-        r = bytearray()
-        for op in self.ops:
-            if op == "status": # Read fifo status
-                r.append(0)
-                pass
-            elif op[0] == "read":
-                r.append(64 + (op[1]//8-1))
-                r.append((op[2]-1) &0xff)
-                r.append(((op[2]-1)>>8) &0xff)
-                pass
-            elif op[0] == "read_err":
-                r.append(128 + (op[1]//8-1))
-                r.append((op[2]-1) &0xff)
-                r.append(((op[2]-1)>>8) &0xff)
-                pass
-            pass
-        return r
+        return compile_fifo_ops(script_ops(self.ops))
     pass
 #a DbgMasterSramScript
 class DbgMasterSramScript:
+    """
+    SRAM access script; ops are compiled (and memoized) by compile_sram_ops,
+    so the script may be changed (even in place) between calls of as_bytes
+    """
     def __init__(self, ops):
-        self.ops = ops
+        self.ops = script_ops(ops)
         pass
     def as_bytes(self) -> bytes:
-        r = bytearray()
-        for op in self.ops:
-            if op[0] == "read":
-                r.append(64 + (op[1]//8-1))
-                r.append((op[2]) &0xff)
-                r.append(((op[2])>>8) &0xff)
-                r.append((op[3]-1) &0xff)
-                r.append(((op[3]-1)>>8) &0xff)
-                pass
-            pass
-        return r
+        return compile_sram_ops(script_ops(self.ops))
+    pass
+#a Response sinks
+#c DbgMasterResponse
+class DbgMasterResponse(namedtuple("DbgMasterResponse", ["num_bytes", "value"])):
+    """
+    Data returned by a script: num_bytes (1 to 4) bytes in the bottom of value
+    """
+    __slots__ = ()
+
+#c DbgMasterBufferSink
+class DbgMasterBufferSink:
+    """
+    Sink writing response data, little-endian, into a preallocated buffer;
+    length is the number of bytes written
+    """
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer).cast("B")
+        self.length = 0
+        pass
+    def __call__(self, response:DbgMasterResponse) -> None:
+        end = self.length + response.num_bytes
+        if end > len(self.buffer):
+            raise ValueError("Debug master response overflows buffer of %d bytes"%len(self.buffer))
+        self.buffer[self.length:end] = response.value.to_bytes(response.num_bytes, "little")
+        self.length = end
+        pass
     pass
+
+#c DbgMasterFileSink
+class DbgMasterFileSink:
+    """
+    Sink writing response data, little-endian, to a binary file object
+    """
+    def __init__(self, f):
+        self.write = f.write
+        self.length = 0
+        pass
+    def __call__(self, response:DbgMasterResponse) -> None:
+        self.write(response.value.to_bytes(response.num_bytes, "little"))
+        self.length += response.num_bytes
+        pass
+    pass
+
 #a DbgMaster
 class DbgMaster:
     def __init__(self, obj, req_name:str, resp_name:str):
@@ -102,78 +268,199 @@ class DbgMaster:
         self.req_op = getattr(obj, req_name+"__op")
         self.req_num_data_valid = getattr(obj, req_name+"__num_data_valid")
         self.req_data = getattr(obj, req_name+"__data")
+        self.completion = None
         pass
-    #f invoke_script_bytes
-    def invoke_script_bytes(self, bytes_to_run:bytes, bfm_wait, inter_data_idle, cycles_to_run:int=1000):
-        bytes_to_run = bytearray(bytes_to_run)
-        if (self.resp_type.value() != t_dbg_master_resp_type["dbg_resp_idle"]):
-            return ("Not idle", [])
+    #f script_responses
+    def script_responses(self, bytes_to_run:bytes, bfm_wait, inter_data_idle, cycles_to_run:int=1000, start_gap:int=1) -> Iterator[DbgMasterResponse]:
+        """
+        Run a script, yielding a DbgMasterResponse for each response with
+        bytes valid as it is seen; the completion is the return value of
+        the generator, and is also left in self.completion
+
+        start_gap is the number of idle cycles between the start and the
+        first data
+
+        The script is fed from a cursor into a memoryview, so each cycle
+        costs the same however long the script is
+        """
+        script = memoryview(bytes(bytes_to_run))
+        script_length = len(script)
+        position = 0
+        self.completion = None
+        if (self.resp_type.value() != _resp_idle):
+            self.completion = "Not idle"
+            return self.completion
         if self.resp_data.value() != 0:
-            return("Data not zero when idle",[])
+            self.completion = "Data not zero when idle"
+            return self.completion
         if self.resp_bytes_valid.value() != 0:
-            return("bytes valid not zero when idle",[])
+            self.completion = "bytes valid not zero when idle"
+            return self.completion
 
-        self.req_num_data_valid.drive(0)
-        self.req_op.drive(t_dbg_master_op["dbg_op_start_clear"] )
-        bfm_wait(1)
-        self.req_op.drive(t_dbg_master_op["dbg_op_idle"] )
+        resp_type = self.resp_type.value
+        resp_data = self.resp_data.value
+        resp_bytes_valid = self.resp_bytes_valid.value
+        resp_bytes_consumed = self.resp_bytes_consumed.value
+        req_op = self.req_op.drive
+        req_data = self.req_data.drive
+        req_num_data_valid = self.req_num_data_valid.drive
+
+        req_num_data_valid(0)
+        req_op(_op_start_clear)
         bfm_wait(1)
-        completion = "ok"
-        data_returned = []
+        req_op(_op_idle)
+        if start_gap>0: bfm_wait(start_gap)
         do_idle_cnt = inter_data_idle()
         while cycles_to_run > 0:
-            bv = self.resp_bytes_valid.value()
-            data = self.resp_data.value()
-            if bv == 1: data_returned.append(data&0xff)
-            if bv == 2: data_returned.append(data&0xffff)
-            if bv == 3: data_returned.append(data&0xffffff)
-            if bv == 4: data_returned.append(data&0xffffffff)
-            if self.resp_type.value() != t_dbg_master_resp_type["dbg_resp_running"]:
+            bytes_valid = resp_bytes_valid()
+            mask = _bytes_valid_mask[bytes_valid]
+            if mask: yield DbgMasterResponse(bytes_valid, resp_data() & mask)
+            if resp_type() != _resp_running:
                 break
-            bytes_consumed = self.resp_bytes_consumed.value()
-            for i in range(bytes_consumed):
-                if len(bytes_to_run)>0:
-                    bytes_to_run.pop(0)
-                    pass
-                do_idle_cnt = inter_data_idle()
+            bytes_consumed = resp_bytes_consumed()
+            if bytes_consumed:
+                position = min(position+bytes_consumed, script_length)
+                for i in range(bytes_consumed): do_idle_cnt = inter_data_idle()
                 pass
 
             if do_idle_cnt > 0:
-                self.req_op.drive(t_dbg_master_op["dbg_op_idle"] )
-                self.req_data.drive(0xdeadbeef)
-                self.req_num_data_valid.drive(do_idle_cnt&7)
+                req_op(_op_idle)
+                req_data(0xdeadbeef)
+                req_num_data_valid(do_idle_cnt&7)
                 bfm_wait(1)
                 do_idle_cnt -= 1
                 continue
-                pass
 
-            n = len(bytes_to_run)
-            self.req_op.drive(t_dbg_master_op["dbg_op_data"] )
+            n = script_length - position
             if n<=6:
-                self.req_op.drive(t_dbg_master_op["dbg_op_data_last"] )
+                req_op(_op_data_last)
                 pass
             else:
+                req_op(_op_data)
                 n = 6
                 pass
-            data = 0
-            for i in range(n):
-                data = data | (bytes_to_run[i] << (8*i))
-                pass
-            self.req_data.drive(data)
-            self.req_num_data_valid.drive(n)
+            req_data(int.from_bytes(script[position:position+n], "little"))
+            req_num_data_valid(n)
             bfm_wait(1)
             cycles_to_run -= 1
             pass
         self.req_num_data_valid.drive(0)
-        self.req_op.drive(t_dbg_master_op["dbg_op_idle"] )
-        completion = "unexpected"
-        if self.resp_type.value() == t_dbg_master_resp_type["dbg_resp_completed"]:
-            completion = "ok"
+        self.req_op.drive(_op_idle)
+        self.completion = _completion_of_resp_type.get(self.resp_type.value(), "unexpected")
+        return self.completion
+    #f invoke_script_sink
+    def invoke_script_sink(self, bytes_to_run:bytes, bfm_wait, inter_data_idle, sink:Callable[[DbgMasterResponse],None], cycles_to_run:int=1000, start_gap:int=1) -> tuple[str,int]:
+        """
+        Run a script, calling sink with each response as it is seen (such
+        as a DbgMasterBufferSink or DbgMasterFileSink); returns (completion,
+        number of responses)
+        """
+        n = 0
+        for response in self.script_responses(bytes_to_run, bfm_wait, inter_data_idle, cycles_to_run, start_gap):
+            sink(response)
+            n += 1
+            pass
+        return (self.completion, n)
+    #f invoke_script_bytes
+    def invoke_script_bytes(self, bytes_to_run:bytes, bfm_wait, inter_data_idle, cycles_to_run:int=1000, start_gap:int=1):
+        """
+        Run a script, returning (completion, data returned)
+        """
+        data_returned = [r.value for r in self.script_responses(bytes_to_run, bfm_wait, inter_data_idle, cycles_to_run, start_gap)]
+        return (self.completion, data_returned)
+
+#a DbgMasterQueue
+#c DbgMasterQueue
+class DbgMasterQueue:
+    """
+    Scripts submitted to a DbgMaster and run back to back
+
+    A script is bytes, an object with as_bytes() (such as a
+    DbgMasterMuxScript), or a callable returning either; a callable is
+    called just before its script starts, so it may use the results of
+    earlier scripts. submit returns a Future whose result is (completion,
+    data returned), and done callbacks run as soon as the script completes.
+    If on_response is given it is called with each DbgMasterResponse of the
+    script as it is seen.
+
+    The start of each script is driven in the first cycle that the master
+    reports idle after the previous one completes, which is the earliest
+    the master accepts it, and its data follows immediately (start_gap of
+    0; the mux and sinks wait for data after a start).
+    """
+    #f __init__
+    def __init__(self, dbg_master:DbgMaster, bfm_wait, inter_data_idle=lambda :0, cycles_to_run:int=1000, idle_timeout:int=100):
+        self.dbg_master = dbg_master
+        self.inter_data_idle = inter_data_idle
+        self.cycles_to_run = cycles_to_run
+        self.idle_timeout = idle_timeout
+        self.queue = deque()
+        self.scripts_run = 0
+        self.cycles = 0
+        self.seconds = 0.0
+        def counted_bfm_wait(n:int) -> None:
+            self.cycles += n
+            bfm_wait(n)
             pass
-        if self.resp_type.value() == t_dbg_master_resp_type["dbg_resp_errored"]:
-            completion = "errored"
+        self.bfm_wait = counted_bfm_wait
+        pass
+    #f submit
+    def submit(self, script, on_response:Callable[[DbgMasterResponse],None]|None=None):
+        """
+        Queue a script, returning a concurrent.futures.Future for its result
+        """
+        from concurrent.futures import Future
+        future = Future()
+        self.queue.append((script, future, on_response))
+        return future
+    #f wait_for_idle
+    def wait_for_idle(self) -> bool:
+        resp_type = self.dbg_master.resp_type.value
+        for i in range(self.idle_timeout):
+            if resp_type() == _resp_idle: return True
+            self.bfm_wait(1)
             pass
-        if self.resp_type.value() == t_dbg_master_resp_type["dbg_resp_poll_failed"]:
-            completion = "poll_failed"
+        return resp_type() == _resp_idle
+    #f run
+    def run(self) -> int:
+        """
+        Run queued scripts (including any submitted by done callbacks)
+        until the queue is empty; returns the number run
+        """
+        start_time = time.perf_counter()
+        n = 0
+        while self.queue:
+            (script, future, on_response) = self.queue.popleft()
+            if not future.set_running_or_notify_cancel(): continue
+            try:
+                if callable(script): script = script()
+                if hasattr(script, "as_bytes"): script = script.as_bytes()
+                pass
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            self.wait_for_idle()
+            data_returned = []
+            for response in self.dbg_master.script_responses(script, self.bfm_wait, self.inter_data_idle, self.cycles_to_run, start_gap=0):
+                if on_response is not None: on_response(response)
+                data_returned.append(response.value)
+                pass
+            n += 1
+            future.set_result((self.dbg_master.completion, data_returned))
             pass
-        return (completion, data_returned)
+        self.scripts_run += n
+        self.seconds += time.perf_counter() - start_time
+        return n
+    #f scripts_per_second
+    def scripts_per_second(self) -> float:
+        if self.seconds==0: return 0.0
+        return self.scripts_run / self.seconds
+    #f report
+    def report(self) -> str:
+        """
+        Aggregate throughput of the scripts run
+        """
+        cycles_per_script = self.cycles / self.scripts_run if self.scripts_run else 0.0
+        return "%d scripts in %d cycles (%.1f cycles per script), %.1f scripts/second"%(
+            self.scripts_run, self.cycles, cycles_per_script, self.scripts_per_second())
+    pass
@@ -0,0 +1,192 @@
+#a Copyright
+#
+#  This file 'dbg_master_cost.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Static estimate of the cycles a dbg_master_mux script takes when run by
+# DbgMaster (invoke_script_bytes), and the bytes it returns, from the
+# state machines of dbg_master_mux, dbg_master_fifo_sink (with fifo_sink)
+# and dbg_master_sram_access.
+#
+# Cycles are counted from the start op to DbgMaster seeing the completion
+# (the cycles DbgMaster waits); the mux is idle again 2 cycles later.
+#
+# DbgMaster presents the first script byte start_gap+1 cycles after the
+# start (plus its first inter-data idle), and the mux consumes it as the
+# select. The mux presents data to a target two cycles after the
+# previous bytes are consumed, and the target sees it a cycle later, so a
+# target consumes an op at most once every 4 cycles; it consumes it when
+# both the data is there and it has finished the previous op. An op of a
+# target takes (from the cycle it is consumed):
+#
+#   FIFO status:               2 cycles
+#   FIFO read of N entries:    N * (2K+2) cycles, plus pop_wait per entry
+#   SRAM read of N words:      1 + N * (2K+2) cycles
+#
+# where K is the number of 4-byte chunks of an entry or word. The end of
+# the script reaches the target 4 cycles after the last op is consumed,
+# and the completion is seen 2 cycles after the target completes. Reading
+# an empty FIFO (or the status of one) completes the script a cycle after
+# the read or status is issued.
+#
+# An inter-data idle of two or more cycles at a consumption means the mux
+# presents an idle op to the target, which then never consumes the data
+# DbgMaster presents after the idle; unless that data is the end of the
+# script (or the target completes by itself) the script stalls, and
+# DbgMaster would report 'unexpected' after cycles_to_run. An idle of one
+# cycle costs nothing.
+
+#a Imports
+from typing import Callable, NamedTuple, Optional
+from .dbg_master import DbgMasterFifoScript, DbgMasterSramScript
+from .dbg_master_model import fifo_read_chunks, sram_read_chunks
+
+#a Useful constants
+#v Cycles from a target completing to DbgMaster seeing it, and from then to the mux being idle
+completion_cycles = 2
+recovery_cycles = 2
+
+#v Bytes valid of each chunk mask
+_bytes_of_mask = {0:0, 0xff:1, 0xffff:2, 0xffffff:3, 0xffffffff:4}
+
+#a DbgMasterCost
+#c DbgMasterCost
+class DbgMasterCost(NamedTuple):
+    """
+    Estimated completion, cycles, bytes returned and number of responses
+    of a script
+    """
+    completion : str
+    cycles : int
+    bytes_returned : int
+    responses : int
+    #f period
+    def period(self) -> int:
+        """
+        Cycles from the start of the script to the start of a following
+        script
+        """
+        return self.cycles + recovery_cycles
+    #f bytes_per_cycle
+    def bytes_per_cycle(self) -> float:
+        """
+        Bytes returned per cycle of back-to-back scripts of this shape
+        """
+        return self.bytes_returned / self.period()
+    pass
+
+#a DbgMasterCostEstimator
+#c DbgMasterCostEstimator
+class DbgMasterCostEstimator:
+    """
+    Estimate the cost of scripts for a given inter-data idle pattern
+    (called as DbgMaster calls it) and FIFO assumptions: the number of
+    entries in the FIFO (None for never empty) and the cycles each pop
+    waits for pop_rdy and data_valid (which may be fractional, for an
+    average)
+
+    targets maps a mux select to "fifo" or "sram", for scripts given as
+    bytes; a DbgMasterMuxScript of a FIFO or SRAM script needs no mapping
+    """
+    #f __init__
+    def __init__(self, inter_data_idle:Callable[[],int]=lambda :0, fifo_entries:Optional[int]=None, pop_wait:float=0, start_gap:int=1, targets:Optional[dict]=None):
+        self.inter_data_idle = inter_data_idle
+        self.fifo_entries = fifo_entries
+        self.pop_wait = pop_wait
+        self.start_gap = start_gap
+        self.targets = dict(targets or {})
+        pass
+    #f target_of_script
+    def target_of_script(self, script) -> Optional[str]:
+        subscript = getattr(script, "subscript", None)
+        if isinstance(subscript, DbgMasterFifoScript): return "fifo"
+        if isinstance(subscript, DbgMasterSramScript): return "sram"
+        return None
+    #f estimate
+    def estimate(self, script, fifo_entries:Optional[int]=None) -> DbgMasterCost:
+        """
+        Estimate the cost of a DbgMasterMuxScript (or the bytes of one);
+        fifo_entries, if given, overrides that of the estimator
+        """
+        target = self.target_of_script(script)
+        if hasattr(script, "as_bytes"): script = script.as_bytes()
+        script = bytes(script)
+        if fifo_entries is None: fifo_entries = self.fifo_entries
+        idle = self.inter_data_idle
+
+        consumed = 1 + self.start_gap + idle()
+        if len(script)<2:
+            return DbgMasterCost("errored", consumed+1, 0, 0)
+        if target is None: target = self.targets.get(script[0] & 7)
+        if target is None:
+            return DbgMasterCost("errored", consumed+3, 0, 0)
+        idle_cycles = idle()
+        ready = consumed
+        position = 1
+        total_bytes = 0
+        responses = 0
+        while True:
+            remaining = len(script)-position
+            if remaining==0:
+                done = max(consumed + 4 + max(idle_cycles-1, 0), ready)
+                return DbgMasterCost("ok", done+completion_cycles, total_bytes, responses)
+            if idle_cycles>1:
+                return DbgMasterCost("unexpected", ready, total_bytes, responses)
+            consumed = max(consumed+4, ready)
+            opcode = script[position]
+            if target=="fifo":
+                required = 1 if opcode<64 else 3
+                pass
+            else:
+                required = 5
+                pass
+            if remaining<required:
+                return DbgMasterCost("errored", consumed+completion_cycles, total_bytes, responses)
+            if target=="fifo" and opcode<64:
+                total_bytes += 4
+                responses += 1
+                if fifo_entries==0:
+                    return DbgMasterCost("ok", consumed+1+completion_cycles, total_bytes, responses)
+                ready = consumed + 2
+                pass
+            elif target=="fifo":
+                count = ((script[position+1] | (script[position+2]<<8)) + 1) & 0xffff
+                count = max(count, 1)
+                chunks = fifo_read_chunks(opcode)
+                entry_cycles = 2*max(len(chunks),1) + 2 + self.pop_wait
+                if fifo_entries is not None and fifo_entries<count:
+                    total_bytes += fifo_entries * sum([_bytes_of_mask[m] for (_,m) in chunks])
+                    responses += fifo_entries * len(chunks)
+                    done = consumed + round(fifo_entries * entry_cycles) + 1
+                    completion = "poll_failed" if (opcode>>6)==2 else "ok"
+                    return DbgMasterCost(completion, done+completion_cycles, total_bytes, responses)
+                if fifo_entries is not None: fifo_entries -= count
+                total_bytes += count * sum([_bytes_of_mask[m] for (_,m) in chunks])
+                responses += count * len(chunks)
+                ready = consumed + round(count * entry_cycles)
+                pass
+            else:
+                count = (script[position+3] | (script[position+4]<<8)) + 1
+                chunks = sram_read_chunks(opcode)
+                total_bytes += count * sum([_bytes_of_mask[m] for (_,m) in chunks])
+                responses += count * len(chunks)
+                ready = consumed + 1 + count * (2*len(chunks) + 2)
+                pass
+            position += required
+            for i in range(required): idle_cycles = idle()
+            pass
+        pass
+    pass
@@ -0,0 +1,298 @@
+#a Copyright
+#
+#  This file 'dbg_master_model.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Transaction-level models of dbg_master_mux, dbg_master_fifo_sink and
+# dbg_master_sram_access, running scripts against a modelled FIFO and
+# SRAM and returning the (completion, data) that DbgMaster
+# invoke_script_bytes would; no cycles are modelled.
+#
+# The mux takes the first script byte as the select (bits 2 to 0); a
+# script shorter than two bytes, or a select with no target, is errored.
+#
+# The FIFO sink runs status (opcode class 0, one byte) and read ops (any
+# other class: opcode then N-1 in 16 bits; class 2 is read_err). Status
+# returns the csr32 of the FIFO status, and completes the script if the
+# FIFO is empty. A read presents ((opcode&63)+1)&63 bytes of each entry in
+# 4-byte chunks from the low bits of data0 up, with chunks past the fourth
+# 64-bit word repeating its top half; reading an empty FIFO completes the
+# script (poll_failed for read_err).
+#
+# The SRAM access runs read ops (opcode, A in 16 bits, N-1 in 16 bits) of
+# N words from address A up; of size s=opcode&15 it presents min(s+1,4)
+# bytes of the low half of each word, then the top half of the word s/4
+# times.
+#
+# Both targets complete ok at the end of the script, and are errored if
+# the script ends part way through an op.
+#
+# DbgMasterModelCheck runs each script on a DbgMaster and on a model,
+# recording any difference; the model state must be kept in step with
+# the hardware (for example by pushing each dprintf request to the model
+# FIFO as it is driven).
+
+#a Imports
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Optional
+from .fifo_status import FifoStatus
+
+#a Chunk layouts
+#v Masks for 0 to 4 bytes valid
+_chunk_mask = (0, 0xff, 0xffff, 0xffffff, 0xffffffff)
+
+#f fifo_read_chunks
+@lru_cache(maxsize=64)
+def fifo_read_chunks(opcode:int) -> tuple:
+    """
+    Return (shift, mask) of each chunk of an entry presented by a FIFO
+    sink read opcode
+    """
+    remaining = ((opcode & 63)+1) & 63
+    chunks = []
+    i = 0
+    while remaining>4:
+        chunks.append((32*min(i,7), 0xffffffff))
+        remaining -= 4
+        i += 1
+        pass
+    if remaining>0: chunks.append((32*min(i,7), _chunk_mask[remaining]))
+    return tuple(chunks)
+
+#f sram_read_chunks
+@lru_cache(maxsize=16)
+def sram_read_chunks(opcode:int) -> tuple:
+    """
+    Return (shift, mask) of each chunk of a word presented by an SRAM
+    access read opcode
+    """
+    size = opcode & 15
+    return ((0, _chunk_mask[min(size+1, 4)]),) + ((32, 0xffffffff),) * (size//4)
+
+#a Modelled FIFO and SRAM
+#c DbgFifoModel
+class DbgFifoModel:
+    """
+    FIFO of entries of (up to) four 64-bit words, as dprintf_4_fifo_512
+    presents data0 to data3
+    """
+    #f __init__
+    def __init__(self, size:int=515):
+        self.size = size
+        self.entries = deque()
+        self.overflowed = False
+        self.underflowed = False
+        pass
+    #f __len__
+    def __len__(self) -> int:
+        return len(self.entries)
+    #f push
+    def push(self, data_list) -> bool:
+        """
+        Push an entry of 64-bit words (data0 first); returns False if the
+        FIFO is full, as the push would not be acknowledged
+        """
+        if len(self.entries)>=self.size: return False
+        entry = 0
+        for (i, d) in enumerate(data_list[:4]):
+            entry |= (d & 0xffffffffffffffff) << (64*i)
+            pass
+        self.entries.append(entry)
+        return True
+    #f push_dprintf
+    def push_dprintf(self, d) -> bool:
+        """
+        Push the data of a Dprintf request
+        """
+        return self.push(d.data_list)
+    #f pop
+    def pop(self) -> Optional[int]:
+        if not self.entries: return None
+        return self.entries.popleft()
+    #f status
+    def status(self) -> FifoStatus:
+        return FifoStatus(self.size, len(self.entries), self.overflowed, self.underflowed)
+    pass
+
+#c DbgSramModel
+class DbgSramModel:
+    """
+    SRAM of size words of width bits; on_access, if given, is called with
+    (read_not_write, address, write_data) for every access
+    """
+    #f __init__
+    def __init__(self, size:int=65536, width:int=32, on_access:Optional[Callable[[bool,int,int],None]]=None):
+        self.size = size
+        self.mask = (1<<width)-1
+        self.words = [0] * size
+        self.on_access = on_access
+        pass
+    #f read
+    def read(self, address:int) -> int:
+        address %= self.size
+        if self.on_access is not None: self.on_access(True, address, 0)
+        return self.words[address]
+    #f write
+    def write(self, address:int, data:int) -> None:
+        address %= self.size
+        if self.on_access is not None: self.on_access(False, address, data)
+        self.words[address] = data & self.mask
+        pass
+    #f access
+    def access(self, s) -> Optional[int]:
+        """
+        Perform an SramAccess; returns the data for a read
+        """
+        if s.read_not_write: return self.read(s.address)
+        self.write(s.address, s.write_data)
+        return None
+    pass
+
+#a Target models
+#c DbgMasterFifoSinkModel
+class DbgMasterFifoSinkModel:
+    """
+    Model of dbg_master_fifo_sink on a DbgFifoModel
+    """
+    #f __init__
+    def __init__(self, fifo:DbgFifoModel):
+        self.fifo = fifo
+        pass
+    #f run
+    def run(self, script:bytes, position:int, data:list) -> str:
+        """
+        Run the script from position, appending data to data; returns the
+        completion
+        """
+        fifo = self.fifo
+        entries = fifo.entries
+        length = len(script)
+        while position<length:
+            opcode = script[position]
+            if opcode<64:
+                position += 1
+                data.append(fifo.status().as_csr32())
+                if not entries: return "ok"
+                continue
+            if length-position<3: return "errored"
+            count = ((script[position+1] | (script[position+2]<<8)) + 1) & 0xffff
+            position += 3
+            chunks = fifo_read_chunks(opcode)
+            for i in range(max(count,1)):
+                if not entries: return "poll_failed" if (opcode>>6)==2 else "ok"
+                entry = entries.popleft()
+                for (shift, mask) in chunks: data.append((entry>>shift) & mask)
+                pass
+            pass
+        return "ok"
+    pass
+
+#c DbgMasterSramAccessModel
+class DbgMasterSramAccessModel:
+    """
+    Model of dbg_master_sram_access on a DbgSramModel
+    """
+    #f __init__
+    def __init__(self, sram:DbgSramModel):
+        self.sram = sram
+        pass
+    #f run
+    def run(self, script:bytes, position:int, data:list) -> str:
+        """
+        Run the script from position, appending data to data; returns the
+        completion
+        """
+        read = self.sram.read
+        length = len(script)
+        while position<length:
+            if length-position<5: return "errored"
+            opcode = script[position]
+            address = script[position+1] | (script[position+2]<<8)
+            count = (script[position+3] | (script[position+4]<<8)) + 1
+            position += 5
+            chunks = sram_read_chunks(opcode)
+            for a in range(address, address+count):
+                word = read(a)
+                for (shift, mask) in chunks: data.append((word>>shift) & mask)
+                pass
+            pass
+        return "ok"
+    pass
+
+#a DbgMasterMuxModel
+#c DbgMasterMuxModel
+class DbgMasterMuxModel:
+    """
+    Model of dbg_master_mux with a target model for each select
+    """
+    #f __init__
+    def __init__(self, targets:dict):
+        self.targets = targets
+        self.completion = None
+        pass
+    #f run_script
+    def run_script(self, bytes_to_run:bytes) -> tuple[str,list[int]]:
+        """
+        Run a script, returning (completion, data returned)
+        """
+        script = bytes(bytes_to_run)
+        data = []
+        target = None
+        if len(script)>=2: target = self.targets.get(script[0] & 7)
+        if target is None:
+            self.completion = "errored"
+            return (self.completion, data)
+        self.completion = target.run(script, 1, data)
+        return (self.completion, data)
+    #f invoke_script_bytes
+    def invoke_script_bytes(self, bytes_to_run:bytes, bfm_wait=None, inter_data_idle=None, cycles_to_run:int=1000, start_gap:int=1) -> tuple[str,list[int]]:
+        """
+        As DbgMaster invoke_script_bytes; the timing arguments are ignored
+        """
+        return self.run_script(bytes_to_run)
+    pass
+
+#a DbgMasterModelCheck
+#c DbgMasterModelCheck
+class DbgMasterModelCheck:
+    """
+    Run scripts on a DbgMaster and on a model, recording a message for
+    each script whose results differ
+    """
+    #f __init__
+    def __init__(self, dbg_master, model:DbgMasterMuxModel):
+        self.dbg_master = dbg_master
+        self.model = model
+        self.completion = None
+        self.scripts = 0
+        self.mismatches = []
+        pass
+    #f invoke_script_bytes
+    def invoke_script_bytes(self, bytes_to_run:bytes, bfm_wait, inter_data_idle, cycles_to_run:int=1000, start_gap:int=1) -> tuple[str,list[int]]:
+        """
+        Run the script on the DbgMaster and the model, returning the
+        (completion, data) of the DbgMaster
+        """
+        result = self.dbg_master.invoke_script_bytes(bytes_to_run, bfm_wait, inter_data_idle, cycles_to_run, start_gap)
+        model_result = self.model.run_script(bytes_to_run)
+        self.completion = result[0]
+        self.scripts += 1
+        if tuple(result)!=model_result:
+            self.mismatches.append("Script %d (%s): hardware gave %r, model gave %r"%(self.scripts, bytes(bytes_to_run).hex(), tuple(result), model_result))
+            pass
+        return result
+    pass
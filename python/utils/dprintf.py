@@ -15,6 +15,15 @@
 # limitations under the License.
 #
 
+#a Imports
+# typing and re are slow to import (see 'make import_time'), so
+# annotations are not evaluated and re is imported on first use
+from __future__ import annotations
+import struct
+from collections.abc import Iterable
+from functools import partial, lru_cache
+from itertools import chain
+
 #a Structs
 #t t_dprintf_byte
 t_dprintf_byte = {"address":16,
@@ -43,6 +52,569 @@ t_dprintf_req_2 = {
 
 
 
+#a Decoder
+# A dprintf message is a sequence of bytes, each of which is:
+#   0x00      - ignored
+#   0x01-0x7f - output as a character
+#   0x80-0xbf - hex of the next ((c&31)+2)//2 bytes, (c&31)+1 digits
+#               (bit 5 is unused; dprintf.cdl documents only 4 bits of
+#               size, but its formatter uses bit 4 in the byte count)
+#   0xc0-0xfe - decimal of the next (c&3)+1 bytes, space padded to
+#               ((c>>2)&15)+1 characters if that is non-zero
+#   0xff      - end of message
+# Field bytes beyond the end of the message are taken as 0xff
+#
+# The interpreter copies runs of characters with a regular expression, and
+# formats fields with the entry in a 256-entry table for the field byte.
+#
+# The 'skeleton' of a request is everything but its field data, and it
+# fixes how the request is decoded. A skeleton seen twice in a row for the
+# same leading characters is compiled into a DprintfPlan, which decodes a
+# run of consecutive requests with that skeleton using one regular
+# expression match, one struct unpack and one %-format. At most
+# max_dprintf_plans are held, the oldest being dropped first.
+#
+# All of the speed comes from the plans; the dispatch table alone is no
+# faster than the byte by byte decoder this replaced. Measured with
+# test/python/bench_dprintf.py ('make dprintf_bench'):
+#   a buffer of 900 requests of one format:    about 8x faster
+#   a buffer of three interleaved formats:     about 2x
+#   a single message with its plan compiled:   1.0x to 1.9x
+#   a single message seen for the first time:  0.4x to 0.9x (it is slower)
+# So a single message is not much faster than before: its time is the
+# overhead of the call rather than its bytes.
+
+#v Runs of literal bytes (with zeros, which are removed from the output), compiled on first use
+_dprintf_literals = None
+
+#v Dispatch table, created on first use
+_dprintf_dispatch = None
+
+#v Plan (or skeleton seen once) keyed on (request size, bytes up to the first field byte)
+_dprintf_plans = {}
+
+#v Limit on the number of plans and skeletons held
+max_dprintf_plans = 1024
+
+#f _hex_field
+def _hex_field(nybbles:int):
+    if nybbles%2==0: return lambda field:field.hex().upper().encode()
+    return lambda field:field.hex()[1:].upper().encode()
+
+#f _decimal_field
+def _decimal_field(pad_to:int):
+    width = pad_to+1 if pad_to>=1 else 0
+    def format_decimal(field):
+        assert(pad_to<10)
+        return b"%*d"%(width, int.from_bytes(field, "big"))
+    return format_decimal
+
+#f dprintf_dispatch
+def dprintf_dispatch() -> list:
+    """
+    Return the table of (number of field bytes, formatter) for each field
+    byte 0x80 to 0xfe; 0xff is (0, None)
+    """
+    global _dprintf_dispatch
+    if _dprintf_dispatch is None:
+        table = [(0,None)]*256
+        for c in range(0x80, 0xc0):
+            nybbles = (c & 0x1f)+1
+            table[c] = ((nybbles+1)//2, _hex_field(nybbles))
+            pass
+        for c in range(0xc0, 0xff):
+            table[c] = ((c&3)+1, _decimal_field((c>>2) & 15))
+            pass
+        _dprintf_dispatch = table
+        pass
+    return _dprintf_dispatch
+
+#f dprintf_literals
+def dprintf_literals():
+    """
+    Return the regular expression matching a run of literal bytes; re is
+    imported here, as importing it is slower than the rest of this module
+    """
+    global _dprintf_literals
+    if _dprintf_literals is None:
+        import re
+        _dprintf_literals = re.compile(rb"[\x00-\x7f]+")
+        pass
+    return _dprintf_literals
+
+#f dprintf_interpret
+def dprintf_interpret(data:bytes, start:int, end:int, skeleton:list|None=None) -> bytes:
+    """
+    Decode the message in data[start:end] with the dispatch table; if
+    skeleton is a list then it is extended with the tokens of the message,
+    which are a literal run (bytes), a field byte (int), or None for the
+    end of message. A truncated field ends the skeleton with a False.
+    """
+    dispatch = dprintf_dispatch()
+    literals = dprintf_literals().match
+    output = []
+    append = output.append
+    n = start
+    while n < end:
+        m = literals(data, n, end)
+        if m is not None:
+            append(m.group())
+            n = m.end()
+            if skeleton is not None: skeleton.append(m.group())
+            continue
+        (num_data_bytes, formatter) = dispatch[data[n]]
+        if formatter is None:
+            if skeleton is not None: skeleton.append(None)
+            break
+        if skeleton is not None: skeleton.append(data[n])
+        n += 1
+        field = data[n:min(n+num_data_bytes,end)]
+        if len(field)<num_data_bytes:
+            field += b"\xff"*(num_data_bytes-len(field))
+            if skeleton is not None: skeleton.append(False)
+            pass
+        append(formatter(field))
+        n += num_data_bytes
+        pass
+    # Formatted fields never contain a zero, so only literal zeros are removed
+    return b"".join(output).replace(b"\x00", b"")
+
+#c DprintfPlan
+class DprintfPlan:
+    """
+    Decoder for requests of request_size bytes which all have the same
+    skeleton (as produced by dprintf_interpret)
+    """
+    #f __init__
+    def __init__(self, request_size:int, skeleton:list):
+        import re
+        self.request_size = request_size
+        pattern = []
+        unpack = [">"]
+        template = []
+        self.converters = []
+        num_fields = 0
+        size = 0
+        for t in skeleton:
+            if t is None:
+                pattern.append(rb"\xff.{%d}"%(request_size-size-1))
+                unpack.append("%dx"%(request_size-size))
+                size = request_size
+                pass
+            elif isinstance(t, bytes):
+                pattern.append(re.escape(t))
+                unpack.append("%dx"%len(t))
+                template.append(t.replace(b"\x00",b"").replace(b"%",b"%%"))
+                size += len(t)
+                pass
+            else:
+                num_data_bytes = dprintf_dispatch()[t][0]
+                pattern.append(re.escape(bytes([t])) + rb".{%d}"%num_data_bytes)
+                if num_data_bytes in (1,2,4,8):
+                    unpack.append("x"+" BH I   Q"[num_data_bytes])
+                    pass
+                else:
+                    unpack.append("x%ds"%num_data_bytes)
+                    self.converters.append((num_fields, partial(int.from_bytes, byteorder="big")))
+                    pass
+                if t<0xc0:
+                    nybbles = (t & 0x1f)+1
+                    if nybbles%2==1: self.converters.append((num_fields, ((1<<(4*nybbles))-1).__and__))
+                    template.append(b"%%0%dX"%nybbles)
+                    pass
+                else:
+                    pad_to = (t>>2) & 15
+                    template.append(b"%%%dd"%(pad_to+1) if pad_to>=1 else b"%d")
+                    pass
+                num_fields += 1
+                size += 1+num_data_bytes
+                pass
+            pass
+        assert size==request_size
+        self.num_fields = num_fields
+        self.run = re.compile(b"(?:" + b"".join(pattern) + b")+", re.DOTALL)
+        self.unpack = struct.Struct("".join(unpack))
+        self.template = b"".join(template)
+        self.literal_output = self.template.replace(b"%%",b"%")
+        pass
+    #f decode_run
+    def decode_run(self, data:bytes, start:int) -> tuple[bytes,int]|None:
+        """
+        Decode the run of requests starting at data[start] that fit the
+        plan, returning (output, end of run), or None if the first request
+        does not fit
+        """
+        m = self.run.match(data, start)
+        if m is None: return None
+        end = m.end()
+        count = (end-start) // self.request_size
+        if self.num_fields==0: return (self.literal_output*count, end)
+        if count==1:
+            args = self.unpack.unpack_from(data, start)
+            if self.converters:
+                args = list(args)
+                for (i, converter) in self.converters: args[i] = converter(args[i])
+                args = tuple(args)
+                pass
+            return (self.template % args, end)
+        args = list(chain.from_iterable(self.unpack.iter_unpack(memoryview(data)[start:end])))
+        for (i, converter) in self.converters:
+            args[i::self.num_fields] = map(converter, args[i::self.num_fields])
+            pass
+        return ((self.template*count) % tuple(args), end)
+    pass
+
+#f dprintf_decode
+def dprintf_decode(data:bytes, request_size:int|None=None) -> bytes:
+    """
+    Decode dprintf data to the bytes it outputs; if request_size is given
+    then data is a sequence of requests of that many bytes (32 for a
+    t_dprintf_req_4) each decoded as a separate message, and the outputs
+    are concatenated
+    """
+    literals = dprintf_literals().match
+    plans = _dprintf_plans
+    output = []
+    data_len = len(data)
+    if request_size is None: request_size = data_len if data_len>0 else 1
+    n = 0
+    while n < data_len:
+        end = n+request_size
+        if end>data_len: end = data_len
+        m = literals(data, n, end)
+        key = (request_size, data[n:(n if m is None else m.end())+1])
+        plan = plans.get(key)
+        if isinstance(plan, DprintfPlan):
+            decoded = plan.decode_run(data, n)
+            if decoded is not None:
+                output.append(decoded[0])
+                n = decoded[1]
+                continue
+            pass
+        skeleton = []
+        output.append(dprintf_interpret(data, n, end, skeleton))
+        if end-n==request_size and False not in skeleton:
+            skeleton = tuple(skeleton)
+            if key not in plans and len(plans)>=max_dprintf_plans: del plans[next(iter(plans))]
+            plans[key] = DprintfPlan(request_size, skeleton) if plan==skeleton else skeleton
+            pass
+        n = end
+        pass
+    return b"".join(output)
+
+#a Encoder
+# A printf-style format is compiled once (dprintf_format, cached) into the
+# dprintf data it produces: the literal characters and field bytes as a
+# constant integer, with each argument masked and shifted into its field
+# data. Conversions are:
+#   %[0][width][hh|h|l|ll](x|X) - hex of width digits (default 2, 4, 8 or
+#                                 16 by size); always upper case and zero
+#                                 padded, as dprintf outputs it
+#   %[width][hh|h|l|ll](d|u)    - unsigned decimal of 1, 2 or 4 (default)
+#                                 bytes, space padded to width (up to 10)
+#   %%                          - a percent character
+# Any other conversion (such as %s or %f) is a ValueError. Messages shorter
+# than a t_dprintf_req_4 are ended with 0xff; Dprintf.format rejects
+# messages longer than one, and Dprintf.format_requests splits them into
+# requests with dprintf_pack.
+
+#v Format conversions (zero flag, width, size, conversion), compiled on first use
+_dprintf_conversion = None
+
+#f dprintf_conversion
+def dprintf_conversion():
+    """
+    Return the regular expression matching a format conversion
+    """
+    global _dprintf_conversion
+    if _dprintf_conversion is None:
+        import re
+        _dprintf_conversion = re.compile(r"%(0?)([0-9]*)(hh|h|ll|l)?([xXdu%])")
+        pass
+    return _dprintf_conversion
+
+#c DprintfFormat
+class DprintfFormat:
+    """
+    A format string compiled to a constant with argument fields
+    """
+    #f __init__
+    def __init__(self, fmt:str):
+        data = bytearray()
+        template = []
+        fields = []
+        position = 0
+        for m in dprintf_conversion().finditer(fmt):
+            self.add_text(data, template, fmt[position:m.start()])
+            position = m.end()
+            (zero, width, size, conversion) = m.groups()
+            if conversion=="%":
+                self.add_literal(data, template, "%")
+                continue
+            if conversion in "xX":
+                nybbles = int(width) if width else {None:8, "hh":2, "h":4, "l":16, "ll":16}[size]
+                if nybbles<1 or nybbles>16: raise ValueError("Dprintf hex field '%s' must be 1 to 16 digits"%m.group())
+                num_data_bytes = (nybbles+1)//2
+                data.append(0x80 + nybbles-1)
+                template.append(b"%%0%dX"%nybbles)
+                mask = (1<<(4*nybbles))-1
+                pass
+            else:
+                if zero: raise ValueError("Dprintf decimal field '%s' can only be space padded"%m.group())
+                num_data_bytes = {None:4, "hh":1, "h":2, "l":4, "ll":4}[size]
+                width = int(width) if width else 0
+                if width>10: raise ValueError("Dprintf decimal field '%s' can be padded to at most 10 characters"%m.group())
+                pad_to = width-1 if width>1 else 0
+                data.append(0xc0 | (pad_to<<2) | (num_data_bytes-1))
+                template.append(b"%%%dd"%width if width>1 else b"%d")
+                mask = (1<<(8*num_data_bytes))-1
+                pass
+            fields.append((len(data), num_data_bytes, mask))
+            data += bytes(num_data_bytes)
+            pass
+        self.add_text(data, template, fmt[position:])
+        if len(data)<32: data.append(0xff)
+        self.data_length = len(data)
+        self.num_words = max(4, (self.data_length+7)//8)
+        self.pad_shift = 8*(8*self.num_words - self.data_length)
+        self.base = int.from_bytes(data, "big")
+        self.fields = [(8*(self.data_length-offset-num_data_bytes), mask) for (offset, num_data_bytes, mask) in fields]
+        self.field_sizes = [num_data_bytes for (_, num_data_bytes, _) in fields]
+        self.template = b"".join(template)
+        self.words = struct.Struct(">%dQ"%self.num_words)
+        pass
+    #f add_text
+    def add_text(self, data:bytearray, template:list, text:str) -> None:
+        """
+        Add the text between conversions, which must not contain a '%'
+        """
+        if "%" in text:
+            raise ValueError("Dprintf format conversion at '%s' is not supported"%text[text.index("%"):][:6])
+        self.add_literal(data, template, text)
+        pass
+    #f add_literal
+    @staticmethod
+    def add_literal(data:bytearray, template:list, text:str) -> None:
+        literal = text.encode("latin-1")
+        if any([c==0 or c>=128 for c in literal]):
+            raise ValueError("Dprintf literal text must be characters 1 to 127, in %r"%text)
+        data += literal
+        template.append(literal.replace(b"%",b"%%"))
+        pass
+    #f encode
+    def encode(self, args) -> tuple[bytes, list[int], bytes]:
+        """
+        Return (data, data_list, output) for the arguments
+        """
+        if len(args)!=len(self.fields):
+            raise TypeError("Dprintf format needs %d arguments, got %d"%(len(self.fields), len(args)))
+        value = self.base
+        masked = []
+        for ((shift, mask), a) in zip(self.fields, args):
+            a &= mask
+            masked.append(a)
+            value |= a << shift
+            pass
+        data = value.to_bytes(self.data_length, "big")
+        data_list = list(self.words.unpack((value<<self.pad_shift).to_bytes(8*self.num_words, "big")))
+        return (data, data_list, self.template % tuple(masked))
+    pass
+
+#f dprintf_format
+@lru_cache(maxsize=1024)
+def dprintf_format(fmt:str) -> DprintfFormat:
+    """
+    Compiled form of a format string
+    """
+    return DprintfFormat(fmt)
+
+#a Request packing
+# Messages are packed into as few requests (of 'words' 64-bit words) as
+# possible: the data of a message is split into tokens, which are single
+# characters or whole fields, and each request is filled with as many
+# tokens as fit. A message whose address follows on from the output of
+# the previous message continues in the same request; a request that
+# continues a message has the address following the output so far.
+# Requests that are not full are ended with 0xff.
+
+#f dprintf_tokens
+def dprintf_tokens(data:bytes) -> list[tuple[bytes,bytes]]:
+    """
+    Split message data into (data, output) tokens; character runs (which
+    may be split anywhere) are one token, with zeros removed, and fields
+    are a token each, with any data beyond the message given as 0xff
+    """
+    dispatch = dprintf_dispatch()
+    literals = dprintf_literals().match
+    tokens = []
+    data_len = len(data)
+    n = 0
+    while n < data_len:
+        m = literals(data, n)
+        if m is not None:
+            run = m.group().replace(b"\x00", b"")
+            if run: tokens.append((run, run))
+            n = m.end()
+            continue
+        (num_data_bytes, formatter) = dispatch[data[n]]
+        if formatter is None: break
+        field = data[n+1:n+1+num_data_bytes]
+        field += b"\xff"*(num_data_bytes-len(field))
+        tokens.append((data[n:n+1]+field, formatter(field)))
+        n += 1+num_data_bytes
+        pass
+    return tokens
+
+#f dprintf_pack
+def dprintf_pack(messages:Iterable, words:int=4) -> list:
+    """
+    Pack Dprintf messages (in order) into the fewest Dprintf requests of
+    at most words 64-bit words (4 for t_dprintf_req_4, 2 for
+    t_dprintf_req_2) that write the same output to the same addresses
+    """
+    capacity = 8*words
+    requests = []
+    address = 0
+    data = bytearray()
+    output = bytearray()
+    def flush():
+        if data:
+            requests.append(Dprintf.of_request(address, bytes(data) + (b"\xff" if len(data)<capacity else b""), output))
+            pass
+        pass
+    for message in messages:
+        next_address = (address+len(output)) & 0xffff
+        if (message.address & 0xffff) != next_address or not data:
+            flush()
+            (address, data, output) = (message.address & 0xffff, bytearray(), bytearray())
+            pass
+        for (token_data, token_output) in dprintf_tokens(message.data):
+            while token_data:
+                room = capacity - len(data)
+                if token_data[0] < 0x80:
+                    take = min(room, len(token_data))
+                    pass
+                else:
+                    take = len(token_data) if len(token_data)<=room else 0
+                    pass
+                if take==0:
+                    flush()
+                    (address, data, output) = ((address+len(output)) & 0xffff, bytearray(), bytearray())
+                    continue
+                data += token_data[:take]
+                if take==len(token_data):
+                    output += token_output
+                    pass
+                else:
+                    output += token_output[:take]
+                    token_output = token_output[take:]
+                    pass
+                token_data = token_data[take:]
+                pass
+            pass
+        pass
+    flush()
+    return requests
+
+#a Cycle model
+# Timing of dprintf.cdl for a request, with byte_blocked never asserted.
+# The formatter performs one action per cycle:
+#   taking the request, and starting to format it
+#   a character, a zero (skipped) or the 0xff ending the request
+#   a hex field: its field byte, then one per digit
+#   a decimal field: its field byte, one per data byte, then for each of
+#     the ten digit positions one cycle plus one per unit of the digit
+#     (repeated subtraction of 10^9), so 10 plus the sum of the digits
+# A request is 32 bytes of data followed by 0xff.
+
+#v Hex digit characters
+_hex_digits = b"0123456789ABCDEF"
+
+#c DprintfTiming
+class DprintfTiming:
+    """
+    Cycle timing of a request; cycle 0 is the cycle in which the request is
+    taken, and an action in cycle t is valid on dprintf_byte (or
+    dprintf_ack) in cycle t+1. The last marker is valid in cycle 'cycles',
+    and the next request can be taken in that cycle.
+
+    bytes is a list of (cycle, address, data) of the bytes output, and
+    tokens a list of (data, output, cycles) for the characters and fields
+    of the request
+    """
+    #f __init__
+    def __init__(self, address:int, data_list:list[int]):
+        self.bytes = []
+        self.tokens = []
+        buffer = b"".join([(d & 0xffffffffffffffff).to_bytes(8, "big") for d in (list(data_list)+[0]*4)[:4]])
+        address &= 0xffff
+        def byte(n): return buffer[n] if n<32 else 0xff
+        def write(t, data):
+            nonlocal address
+            self.bytes.append((t+1, address, data))
+            address = (address+1) & 0xffff
+            pass
+        t = 2
+        n = 0
+        while True:
+            c = byte(n)
+            (token_t, token_n, token_bytes) = (t, n, len(self.bytes))
+            t += 1
+            n += 1
+            if c==0xff:
+                self.cycles = t
+                self.tokens.append((b"\xff", b"", 1))
+                break
+            elif c<0x80:
+                if c!=0: write(t-1, c)
+                pass
+            elif c<0xc0:
+                for i in range(((c>>1)&15)+1):
+                    b = byte(n)
+                    if i>0 or (c&1):
+                        write(t, _hex_digits[b>>4])
+                        t += 1
+                        pass
+                    write(t, _hex_digits[b&15])
+                    t += 1
+                    n += 1
+                    pass
+                pass
+            else:
+                pad_to = (c>>2) & 15
+                value = 0
+                for i in range((c&3)+1):
+                    value = (value<<8) | byte(n)
+                    t += 1
+                    n += 1
+                    pass
+                started = False
+                for position in range(9,-1,-1):
+                    digit = (value // 10**position) % 10
+                    if started or digit>0:
+                        started = True
+                        t += digit
+                        write(t, 0x30+digit)
+                        pass
+                    elif position==0:
+                        write(t, 0x30)
+                        pass
+                    elif position<=pad_to:
+                        write(t, 0x20)
+                        pass
+                    t += 1
+                    pass
+                pass
+            self.tokens.append((bytes([byte(i) for i in range(token_n, n)]),
+                                bytes([d for (_,_,d) in self.bytes[token_bytes:]]),
+                                t-token_t))
+            pass
+        pass
+    #f output
+    def output(self) -> bytes:
+        return bytes([d for (_,_,d) in self.bytes])
+    pass
+
 #a Bus driver
 class DprintfBus:
     def __init__(self, obj, req_name:str, ack_name:str, n=4):
@@ -125,91 +697,61 @@ class Dprintf:
         self.generate_list()
         pass
     def generate_list(self):
-        self.data_list = []
-        value = 0
-        shift = 56
-        for d in self.data:
-            value |= d << shift
-            if shift == 0:
-                self.data_list.append(value)
-                shift = 56
-                pass
-            else:
-                shift = shift - 8
-                pass
-            pass
+        data = self.data + bytes(-len(self.data) % 8)
+        self.data_list = [int.from_bytes(data[i:i+8], "big") for i in range(0, len(data), 8)]
         while len(self.data_list)<4:
-            self.data_list.append(value)
-            value = 0
+            self.data_list.append(0)
             pass
         pass
+    @classmethod
+    def of_request(cls, address:int, data:bytes, output:bytes):
+        """
+        Dprintf of data whose output is already known
+        """
+        d = cls.__new__(cls)
+        d.address = address
+        d.data = data
+        d.output = bytearray(output)
+        d.generate_list()
+        return d
+    @classmethod
+    def format(cls, address:int, fmt:str, *args:int):
+        """
+        Dprintf of a printf-style format (see dprintf_format) and integer
+        arguments, e.g. Dprintf.format(0x40, "val=%08x n=%5d", a, b); the
+        message must fit in a t_dprintf_req_4 (32 bytes)
+        """
+        compiled = dprintf_format(fmt)
+        if compiled.data_length>32:
+            raise ValueError("Dprintf format %r is %d bytes, more than a t_dprintf_req_4 carries; use Dprintf.format_requests to split it"%(fmt, compiled.data_length))
+        d = cls.__new__(cls)
+        d.address = address
+        (d.data, d.data_list, output) = compiled.encode(args)
+        d.output = bytearray(output)
+        return d
+    @classmethod
+    def format_requests(cls, address:int, fmt:str, *args:int, words:int=4) -> list:
+        """
+        Dprintf requests of at most words 64-bit words for a printf-style
+        format of any length, split (with dprintf_pack) where the message
+        does not fit in one
+        """
+        return dprintf_pack([cls(address, dprintf_format(fmt).encode(args)[0])], words)
+    def timing(self) -> DprintfTiming:
+        """
+        Cycle timing of dprintf.cdl for the request (data_list)
+        """
+        return DprintfTiming(self.address, self.data_list)
     def as_dprintf_bytes(self) -> list[DprintfByte]:
         result = []
-        addr = self.address
-        for b in output:
+        address = self.address
+        for b in self.output:
             result.append(DprintfByte(address, b))
             address += 1
             pass
         result.append(DprintfByte.last())
         return result
     def generate_output(self):
-        hex = b"0123456789ABCDEF"
-        self.output = bytearray()
-        data_len = len(self.data)
-        n = 0
-        while n < data_len:
-            c = self.data[n]
-            if c==0:
-                n += 1
-                pass
-            elif c<128:
-                self.output.append(c)
-                n += 1
-                pass
-            elif c<0x90:
-                nybbles = (c & 0xf)+1
-                num_data_bytes = (nybbles + 1) // 2
-                # assert(n+1+num_data_bytes < data_len)
-                for i in range(num_data_bytes):
-                    if n+1+i < data_len:
-                        v = self.data[n+1+i]
-                        pass
-                    else:
-                        v = 255
-                        pass
-                    if i>0 or (nybbles%2)==0:
-                        self.output.append(hex[(v >> 4) & 0xf])
-                        pass
-                    self.output.append(hex[v & 0xf])
-                    pass
-                n += 1+num_data_bytes
-                pass
-            elif c<255:
-                num_data_bytes = ((c&3)+ 1)
-                pad_to = (c>>2) & 15
-                # assert(n+1+num_data_bytes < data_len)
-                assert(pad_to<10)
-                value = 0
-                for i in range(num_data_bytes):
-                    if n+1+i < data_len:
-                        v = self.data[n+1+i]
-                        pass
-                    else:
-                        v = 255
-                        pass
-                    value = value*256 + v
-                    pass
-                s = str(value)
-                if pad_to >= 1:
-                    for i in range(pad_to+1-len(s)):
-                        self.output.append(32)
-                        pass
-                    pass
-                self.output += s.encode()
-                n += 1+num_data_bytes
-                pass
-            else:
-                break
-            pass
+        self.output = bytearray(dprintf_decode(self.data))
         pass
     pass
@@ -0,0 +1,266 @@
+#a Copyright
+#
+#  This file 'dprintf_catalogue.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# A catalogue of constant dprintf format strings (see dprintf_format), so
+# that hardware can log a message as a message id and its arguments only,
+# rather than as the full text of a dprintf request.
+#
+# A record is a 16-bit big-endian message id (1 to 65535) followed by the
+# data of each field of the format, in order, laid out as the field data
+# is in a full dprintf request (so the same bytes a hardware block would
+# place after the field byte). Records are packed whole into requests of
+# 'words' 64-bit words, and the rest of a request is zero (id 0 ends the
+# records of a request). The request address is not used by the catalogue,
+# so it may carry (for example) a sequence number.
+#
+# A record is expanded on the host to the output dprintf would give for
+# the full format; hex fields with an odd number of digits ignore the top
+# nybble of their data, as dprintf does.
+#
+# The catalogue is saved as JSON (a list of [id, name, format]), and
+# header_source gives CDL constants for the ids and record sizes.
+
+#a Imports
+import re
+import json
+from typing import Optional, Iterable, Union
+from .dprintf import Dprintf, dprintf_format
+
+#a DprintfCatalogueEntry
+#c DprintfCatalogueEntry
+class DprintfCatalogueEntry:
+    """
+    A format in the catalogue, with its record layout
+    """
+    #f __init__
+    def __init__(self, message_id:int, name:str, fmt:str):
+        self.message_id = message_id
+        self.name = name
+        self.fmt = fmt
+        self.format = dprintf_format(fmt)
+        self.data_size = sum(self.format.field_sizes)
+        self.record_size = 2 + self.data_size
+        self.base = message_id << (8*self.data_size)
+        self.fields = []
+        shift = 8*self.data_size
+        for ((_, mask), size) in zip(self.format.fields, self.format.field_sizes):
+            shift -= 8*size
+            self.fields.append((shift, mask))
+            pass
+        pass
+    #f encode
+    def encode(self, args) -> bytes:
+        """
+        Return the record for the arguments
+        """
+        if len(args)!=len(self.fields):
+            raise TypeError("Dprintf message '%s' needs %d arguments, got %d"%(self.name, len(self.fields), len(args)))
+        value = self.base
+        for ((shift, mask), a) in zip(self.fields, args):
+            value |= (a & mask) << shift
+            pass
+        return value.to_bytes(self.record_size, "big")
+    #f decode
+    def decode(self, data:bytes, offset:int=0) -> tuple[tuple, bytes]:
+        """
+        Return (args, output) for the record at offset in data
+        """
+        value = int.from_bytes(data[offset+2:offset+self.record_size], "big")
+        args = tuple([(value >> shift) & mask for (shift, mask) in self.fields])
+        return (args, self.format.template % args)
+    #f dprintf
+    def dprintf(self, address:int, args) -> Dprintf:
+        """
+        Return the full dprintf request for the arguments
+        """
+        return Dprintf.format(address, self.fmt, *args)
+    pass
+
+#a DprintfCatalogue
+#c DprintfCatalogue
+class DprintfCatalogue:
+    """
+    Message ids for dprintf format strings, with record packing and
+    decoding
+    """
+    max_message_id : int = 0xffff
+    #v Valid message names (CDL identifiers)
+    valid_name = re.compile(r"[A-Za-z_][A-Za-z0-9_]*$")
+    #f __init__
+    def __init__(self, formats:Iterable[str]=()):
+        self.entries = {}
+        self.ids_of_format = {}
+        self.ids_of_name = {}
+        for fmt in formats: self.add(fmt)
+        pass
+    #f add
+    def add(self, fmt:str, name:Optional[str]=None, message_id:Optional[int]=None) -> int:
+        """
+        Add a format (if not already present) and return its message id;
+        ids are allocated from 1 unless given
+        """
+        if fmt in self.ids_of_format and name is None and message_id is None:
+            return self.ids_of_format[fmt]
+        if message_id is None:
+            message_id = max(list(self.entries.keys())+[0]) + 1
+            pass
+        if message_id<1 or message_id>self.max_message_id:
+            raise ValueError("Dprintf message id %d must be 1 to %d"%(message_id, self.max_message_id))
+        if message_id in self.entries:
+            raise ValueError("Dprintf message id %d is already used for %r"%(message_id, self.entries[message_id].fmt))
+        if name is None: name = "%d"%message_id
+        if name in self.ids_of_name:
+            raise ValueError("Dprintf message name '%s' is already used"%name)
+        entry = DprintfCatalogueEntry(message_id, name, fmt)
+        self.entries[message_id] = entry
+        self.ids_of_format.setdefault(fmt, message_id)
+        self.ids_of_name[name] = message_id
+        return message_id
+    #f entry
+    def entry(self, message:Union[int,str]) -> DprintfCatalogueEntry:
+        """
+        Return the entry for a message id, name or format string
+        """
+        if isinstance(message, str):
+            if message in self.ids_of_name: return self.entries[self.ids_of_name[message]]
+            return self.entries[self.ids_of_format[message]]
+        return self.entries[message]
+    #f record
+    def record(self, message:Union[int,str], *args:int) -> bytes:
+        """
+        Return the record for a message (id, name or format) and arguments
+        """
+        return self.entry(message).encode(args)
+    #f pack
+    def pack(self, records:Iterable[bytes], address:int=0, words:int=4) -> list[Dprintf]:
+        """
+        Pack records, in order, into the fewest requests of words 64-bit
+        words, returned as Dprintf requests at address (with no output, as
+        they are not for the dprintf formatter)
+        """
+        capacity = 8*words
+        requests = []
+        data = bytearray()
+        for r in records:
+            if len(r)>capacity:
+                raise ValueError("Dprintf record of %d bytes does not fit in a request of %d bytes"%(len(r), capacity))
+            if len(data)+len(r)>capacity:
+                requests.append(Dprintf.of_request(address, bytes(data), b""))
+                data = bytearray()
+                pass
+            data += r
+            pass
+        if data: requests.append(Dprintf.of_request(address, bytes(data), b""))
+        return requests
+    #f decode
+    def decode(self, data:bytes, words:int=4) -> list[tuple[int,tuple,bytes]]:
+        """
+        Decode the records in the data of consecutive requests of words
+        64-bit words, returning (message id, args, output) for each
+        """
+        capacity = 8*words
+        entries = self.entries
+        result = []
+        for start in range(0, len(data), capacity):
+            end = min(start+capacity, len(data))
+            n = start
+            while n+2<=end:
+                message_id = (data[n]<<8) | data[n+1]
+                if message_id==0: break
+                if message_id not in entries:
+                    raise ValueError("Unknown dprintf message id %d at offset %d"%(message_id, n))
+                entry = entries[message_id]
+                if n+entry.record_size>end:
+                    raise ValueError("Dprintf message id %d at offset %d runs past the end of its request"%(message_id, n))
+                (args, output) = entry.decode(data, n)
+                result.append((message_id, args, output))
+                n += entry.record_size
+                pass
+            pass
+        return result
+    #f decode_requests
+    def decode_requests(self, requests:Iterable) -> list[tuple[int,tuple,bytes]]:
+        """
+        Decode the records of requests (anything with a data_list, such as
+        Dprintf)
+        """
+        data = bytearray()
+        words = 4
+        for r in requests:
+            words = len(r.data_list)
+            for d in r.data_list: data += (d & 0xffffffffffffffff).to_bytes(8, "big")
+            pass
+        return self.decode(bytes(data), words)
+    #f expand
+    def expand(self, address:int, data:bytes, words:int=4) -> list[Dprintf]:
+        """
+        Return the full dprintf requests for the records in data, the first
+        at address and each following on from the output of the previous
+        """
+        result = []
+        for (message_id, args, output) in self.decode(data, words):
+            result.append(self.entries[message_id].dprintf(address, args))
+            address = (address + len(output)) & 0xffff
+            pass
+        return result
+    #f header_source
+    def header_source(self, prefix:str="dprintf_msg") -> str:
+        """
+        Return CDL constants for each message: <prefix>_<name> is the message
+        id and <prefix>_<name>_bytes the size of its record
+        """
+        r = []
+        r.append("/*a Dprintf message catalogue")
+        r.append(" * Generated by DprintfCatalogue.write_header; a record is the 16-bit message")
+        r.append(" * id then the data of each field")
+        r.append(" */")
+        for message_id in sorted(self.entries.keys()):
+            entry = self.entries[message_id]
+            name = "%s_%s"%(prefix, entry.name)
+            r.append("/* %s */"%(json.dumps(entry.fmt).replace("*/","*\\/")))
+            r.append("constant integer %s = %d;"%(name, message_id))
+            r.append("constant integer %s_bytes = %d;"%(name, entry.record_size))
+            pass
+        return "\n".join(r)+"\n"
+    #f write_header
+    def write_header(self, filename:str, prefix:str="dprintf_msg") -> None:
+        for entry in self.entries.values():
+            if not self.valid_name.match("%s_%s"%(prefix, entry.name)):
+                raise ValueError("Dprintf message name '%s' is not a valid CDL identifier"%entry.name)
+            pass
+        with open(filename, "w") as f:
+            f.write(self.header_source(prefix))
+            pass
+        pass
+    #f save
+    def save(self, filename:str) -> None:
+        with open(filename, "w") as f:
+            json.dump([[e.message_id, e.name, e.fmt] for e in self.entries.values()], f, indent=1)
+            pass
+        pass
+    #f load
+    @classmethod
+    def load(cls, filename:str) -> "DprintfCatalogue":
+        catalogue = cls()
+        with open(filename) as f:
+            for (message_id, name, fmt) in json.load(f):
+                catalogue.add(fmt, name=name, message_id=message_id)
+                pass
+            pass
+        return catalogue
+    pass
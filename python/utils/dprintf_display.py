@@ -0,0 +1,228 @@
+#a Copyright
+#
+#  This file 'dprintf_display.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Reassemble the t_dprintf_byte output of dprintf into an address-indexed
+# virtual screen, as the display SRAM it normally writes would hold it.
+#
+# Records are (address, data, last); a record with last set ends a string
+# and its address and data are not written (dprintf holds the previous
+# byte). Records may come from any iterator, or from a binary capture of
+# 4-byte records (capture_record: little-endian 16-bit address, data,
+# flags with bit 0 last and bit 1 valid) which is memory mapped and read
+# a chunk at a time, so memory use does not depend on the capture length.
+#
+# The screen is columns*rows bytes (by default enough for the whole 16-bit
+# address space at 80 columns); addresses wrap at 16 bits, and are then
+# taken modulo the screen size. Each row keeps the span of columns written
+# since the last update; updates() yields and clears these spans, and
+# consume/consume_capture call on_update with them at the end of every
+# string.
+#
+# The capture reader takes the data of a whole string with one strided
+# slice, checking that its addresses are consecutive by comparing strided
+# slices of the address bytes, so it runs at millions of bytes per second.
+
+#a Imports
+import os
+import re
+import sys
+import mmap
+import struct
+from array import array
+from typing import Optional, Callable, Iterable, Iterator
+
+#a Capture format
+#v capture_record
+capture_record = struct.Struct("<HBB")
+capture_flag_last  = 1
+capture_flag_valid = 2
+
+#v Records that are not valid data (last, or invalid)
+_not_data = re.compile(rb"[^\x02]")
+
+#f pack_capture
+def pack_capture(records:Iterable) -> bytes:
+    """
+    Pack (address, data, last) records (or DprintfByte) into capture format
+    """
+    result = bytearray()
+    for r in records:
+        if isinstance(r, tuple):
+            (address, data, last) = r
+            valid = True
+            pass
+        else:
+            (address, data, last, valid) = (r.address, r.data, r.last, r.valid)
+            pass
+        flags = (capture_flag_last if last else 0) | (capture_flag_valid if valid else 0)
+        result += capture_record.pack(address & 0xffff, data, flags)
+        pass
+    return bytes(result)
+
+#a DprintfDisplay
+#c DprintfDisplay
+class DprintfDisplay:
+    """
+    Virtual screen written by a dprintf byte stream, with dirty-region
+    tracking per row
+    """
+    chunk_records : int = 1<<16
+    #f __init__
+    def __init__(self, columns:int=80, rows:Optional[int]=None, fill:int=32):
+        if rows is None: rows = (0x10000+columns-1) // columns
+        self.columns = columns
+        self.rows = rows
+        self.size = columns * rows
+        self.screen = bytearray([fill]) * self.size
+        self.dirty_start = array("l", [columns]) * rows
+        self.dirty_end   = array("l", [0]) * rows
+        self.dirty_rows = set()
+        self.bytes_written = 0
+        self.strings = 0
+        pass
+    #f write
+    def write(self, address:int, data:bytes) -> None:
+        """
+        Write data to the screen starting at (16-bit) address
+        """
+        columns = self.columns
+        address &= 0xffff
+        self.bytes_written += len(data)
+        while data:
+            position = address % self.size
+            (row, column) = divmod(position, columns)
+            n = min(columns - column, len(data), 0x10000 - address)
+            self.screen[position:position+n] = data[:n]
+            if column < self.dirty_start[row]: self.dirty_start[row] = column
+            if column+n > self.dirty_end[row]: self.dirty_end[row] = column+n
+            self.dirty_rows.add(row)
+            data = data[n:]
+            address = (address + n) & 0xffff
+            pass
+        pass
+    #f updates
+    def updates(self) -> Iterator[tuple[int,bytes]]:
+        """
+        Yield (address, bytes) for the region of each row written since the
+        last update, in address order, and mark them clean
+        """
+        columns = self.columns
+        for row in sorted(self.dirty_rows):
+            address = row*columns
+            yield (address+self.dirty_start[row],
+                   bytes(self.screen[address+self.dirty_start[row]:address+self.dirty_end[row]]))
+            self.dirty_start[row] = columns
+            self.dirty_end[row] = 0
+            pass
+        self.dirty_rows.clear()
+        pass
+    #f end_string
+    def end_string(self, on_update:Optional[Callable[[int,bytes],None]]) -> None:
+        self.strings += 1
+        if on_update is not None:
+            for (address, data) in self.updates():
+                on_update(address, data)
+                pass
+            pass
+        pass
+    #f consume
+    def consume(self, records:Iterable, on_update:Optional[Callable[[int,bytes],None]]=None) -> None:
+        """
+        Consume (address, data, last) records, calling on_update(address,
+        bytes) for each updated region at the end of each string
+        """
+        run = bytearray()
+        run_address = 0
+        for (address, data, last) in records:
+            if last:
+                if run: self.write(run_address, run)
+                run = bytearray()
+                self.end_string(on_update)
+                continue
+            if run and address==run_address+len(run):
+                run.append(data)
+                continue
+            if run: self.write(run_address, run)
+            run = bytearray([data])
+            run_address = address
+            pass
+        if run: self.write(run_address, run)
+        pass
+    #f consume_capture
+    def consume_capture(self, capture, on_update:Optional[Callable[[int,bytes],None]]=None) -> None:
+        """
+        Consume a capture file (by filename) or buffer, a chunk at a time
+        """
+        if isinstance(capture, (str, os.PathLike)):
+            with open(capture, "rb") as f:
+                if os.fstat(f.fileno()).st_size==0: return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    self.consume_capture(m, on_update)
+                    pass
+                pass
+            return
+        chunk_size = self.chunk_records * capture_record.size
+        length = len(capture) - (len(capture) % capture_record.size)
+        for offset in range(0, length, chunk_size):
+            self.consume_chunk(capture[offset:min(offset+chunk_size, length)], on_update)
+            pass
+        pass
+    #f consume_chunk
+    def consume_chunk(self, chunk:bytes, on_update:Optional[Callable[[int,bytes],None]]=None) -> None:
+        """
+        Consume whole capture records in chunk; runs of valid data between
+        last or invalid records are written a string at a time
+        """
+        flags = chunk[3::4]
+        start = 0
+        for m in _not_data.finditer(flags):
+            end = m.start()
+            if end > start: self.write_run(chunk, start, end)
+            f = flags[end]
+            if (f & capture_flag_valid) and (f & capture_flag_last): self.end_string(on_update)
+            start = end+1
+            pass
+        if len(flags) > start: self.write_run(chunk, start, len(flags))
+        pass
+    #f write_run
+    def write_run(self, chunk:bytes, start:int, end:int) -> None:
+        """
+        Write the data of records start to end of a chunk, which are all
+        valid data records
+        """
+        address = int.from_bytes(chunk[4*start:4*start+2], "little")
+        if address+end-start <= 0x10000:
+            expected = array("H", range(address, address+end-start))
+            if sys.byteorder!="little": expected.byteswap()
+            expected = expected.tobytes()
+            if (chunk[4*start:4*end:4]==expected[0::2]) and (chunk[4*start+1:4*end:4]==expected[1::2]):
+                self.write(address, chunk[4*start+2:4*end:4])
+                return
+            pass
+        for i in range(start, end):
+            (address, data, _) = capture_record.unpack_from(chunk, 4*i)
+            self.write(address, bytes([data]))
+            pass
+        pass
+    #f row
+    def row(self, row:int) -> bytes:
+        return bytes(self.screen[row*self.columns:(row+1)*self.columns])
+    #f __str__
+    def __str__(self) -> str:
+        return "\n".join([self.row(r).decode("latin-1").rstrip() for r in range(self.rows)]).rstrip("\n")
+    pass
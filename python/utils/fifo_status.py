@@ -42,6 +42,15 @@ class FifoStatus:
         return r
     def as_dbg_master_fifo_status(self) -> int:
         return self.as_csr32()
+    @classmethod
+    def of_csr32(cls, value:int, size=None):
+        """
+        Decode a csr32 status word; entries_full and spaces_available
+        saturate at 0x3fff, so size should be given for larger FIFOs
+        """
+        entries_full = (value >> 4) & 0x3fff
+        if size is None: size = entries_full + ((value >> 18) & 0x3fff)
+        return cls(size, entries_full, overflowed=(value & 8)!=0, underflowed=(value & 4)!=0)
     def push(self):
         if self.full:
             self.overflowed = True
@@ -0,0 +1,384 @@
+#a Copyright
+#
+#  This file 'gf2.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Polynomials over GF(2) are held as Python integers, bit i being the
+# coefficient of x^i. A modulus 'poly' always includes its top bit
+# (x^nbits), so a value is reduced if it is less than 1<<nbits.
+
+#a Imports
+import math
+import random
+from functools import lru_cache
+
+#a Integer factorization
+#f is_prime
+def is_prime(n:int) -> bool:
+    """
+    Miller-Rabin primality test; deterministic below 3.3e24, and with a
+    negligible chance of error above that
+    """
+    small_primes = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+    if n<2: return False
+    for p in small_primes:
+        if n%p==0: return n==p
+        pass
+    d = n-1
+    s = 0
+    while d%2==0:
+        d //= 2
+        s += 1
+        pass
+    for a in small_primes:
+        x = pow(a, d, n)
+        if x==1 or x==n-1: continue
+        for i in range(s-1):
+            x = x*x % n
+            if x==n-1: break
+            pass
+        else:
+            return False
+        pass
+    return True
+
+#f find_factor
+def find_factor(n:int) -> int:
+    """
+    Return a non-trivial factor of a composite n (Pollard-Brent rho)
+    """
+    if n%2==0: return 2
+    rng = random.Random(n)
+    while True:
+        y = rng.randrange(1, n)
+        c = rng.randrange(1, n)
+        m = 128
+        g = r = q = 1
+        while g==1:
+            x = y
+            for i in range(r): y = (y*y+c) % n
+            k = 0
+            while k<r and g==1:
+                ys = y
+                for i in range(min(m, r-k)):
+                    y = (y*y+c) % n
+                    q = q * abs(x-y) % n
+                    pass
+                g = math.gcd(q, n)
+                k += m
+                pass
+            r *= 2
+            pass
+        if g==n:
+            g = 1
+            while g==1:
+                ys = (ys*ys+c) % n
+                g = math.gcd(abs(x-ys), n)
+                pass
+            pass
+        if g!=n: return g
+        pass
+    pass
+
+#f prime_factors
+@lru_cache(maxsize=None)
+def prime_factors(n:int) -> tuple[int,...]:
+    """
+    Sorted distinct prime factors of n
+    """
+    if n<2: return ()
+    if is_prime(n): return (n,)
+    d = find_factor(n)
+    return tuple(sorted(set(prime_factors(d) + prime_factors(n//d))))
+
+#a GF(2) polynomial arithmetic
+#f gf2_mul
+def gf2_mul(a:int, b:int) -> int:
+    """
+    Carry-less multiply of two polynomials
+    """
+    r = 0
+    while b:
+        if b&1: r ^= a
+        a <<= 1
+        b >>= 1
+        pass
+    return r
+
+#f gf2_mod
+def gf2_mod(a:int, poly:int) -> int:
+    """
+    Remainder of a divided by poly
+    """
+    nbits = poly.bit_length()-1
+    for i in range(a.bit_length()-1, nbits-1, -1):
+        if (a>>i)&1: a ^= poly<<(i-nbits)
+        pass
+    return a
+
+#f gf2_divmod
+def gf2_divmod(a:int, b:int) -> tuple[int,int]:
+    """
+    Quotient and remainder of a divided by b
+    """
+    nbits = b.bit_length()-1
+    q = 0
+    for i in range(a.bit_length()-1, nbits-1, -1):
+        if (a>>i)&1:
+            a ^= b<<(i-nbits)
+            q |= 1<<(i-nbits)
+            pass
+        pass
+    return (q, a)
+
+#f gf2_gcd
+def gf2_gcd(a:int, b:int) -> int:
+    """
+    Greatest common divisor of two polynomials
+    """
+    while b:
+        (a, b) = (b, gf2_mod(a, b))
+        pass
+    return a
+
+#f gf2_mulmod
+def gf2_mulmod(a:int, b:int, poly:int) -> int:
+    """
+    Product of two reduced polynomials modulo poly
+    """
+    nbits = poly.bit_length()-1
+    top = 1<<nbits
+    r = 0
+    while b:
+        if b&1: r ^= a
+        b >>= 1
+        a <<= 1
+        if a & top: a ^= poly
+        pass
+    return r
+
+#f gf2_powmod
+def gf2_powmod(a:int, n:int, poly:int) -> int:
+    """
+    a^n modulo poly for n>=0, by square-and-multiply
+    """
+    r = 1
+    a = gf2_mod(a, poly)
+    while n>0:
+        if n&1: r = gf2_mulmod(r, a, poly)
+        a = gf2_mulmod(a, a, poly)
+        n >>= 1
+        pass
+    return gf2_mod(r, poly)
+
+#f gf2_xpow
+def gf2_xpow(n:int, poly:int) -> int:
+    """
+    x^n modulo poly; n may be negative if poly has a non-zero constant term
+    (as all CRC and LFSR polynomials do), in which case x is invertible
+    """
+    if n>=0: return gf2_powmod(2, n, poly)
+    assert poly&1, "x^n for negative n requires poly to have a constant term"
+    return gf2_powmod(poly>>1, -n, poly)
+
+#a Table-driven arithmetic modulo a fixed polynomial
+#v Byte to 16-bit table inserting a zero between each bit (squaring)
+_spread = [sum([((i>>b)&1)<<(2*b) for b in range(8)]) for i in range(256)]
+
+#c Gf2Modulus
+class Gf2Modulus:
+    """
+    Arithmetic modulo a fixed polynomial using an 8-bit reduction table and
+    byte-spread squaring; much faster than gf2_mulmod/gf2_powmod when many
+    operations are done with the same polynomial (such as order tests)
+    """
+    def __init__(self, poly:int):
+        self.poly = poly
+        self.nbits = nbits = poly.bit_length()-1
+        basis = []
+        v = poly ^ (1<<nbits)
+        for i in range(8):
+            basis.append(v)
+            v <<= 1
+            if v>>nbits: v ^= poly
+            pass
+        self.reduce_table = [0]*256
+        for i in range(1,256):
+            self.reduce_table[i] = self.reduce_table[i&(i-1)] ^ basis[(i&-i).bit_length()-1]
+            pass
+        self.shifts = list(range(((nbits-1)//8)*8, -1, -8))
+        pass
+    #f mod
+    def mod(self, a:int) -> int:
+        """
+        Reduce a value of up to 2*nbits bits
+        """
+        nbits = self.nbits
+        reduce_table = self.reduce_table
+        for sh in self.shifts:
+            hi = a>>(nbits+sh)
+            if hi: a ^= (hi<<(nbits+sh)) ^ (reduce_table[hi]<<sh)
+            pass
+        return a
+    #f sqr
+    def sqr(self, a:int) -> int:
+        r = 0
+        sh = 0
+        while a:
+            r |= _spread[a&0xff]<<sh
+            a >>= 8
+            sh += 16
+            pass
+        return self.mod(r)
+    #f mul
+    def mul(self, a:int, b:int) -> int:
+        """
+        Product of two reduced values, by a 4-bit window carry-less multiply
+        """
+        window = [0, a]
+        for i in range(2,16):
+            window.append((window[i>>1]<<1) if (i&1)==0 else (window[i-1]^a))
+            pass
+        r = 0
+        sh = 0
+        while b:
+            r ^= window[b&15]<<sh
+            b >>= 4
+            sh += 4
+            pass
+        return self.mod(r)
+    #f pow
+    def pow(self, a:int, n:int) -> int:
+        """
+        a^n for n>=0
+        """
+        r = 1
+        for bit in bin(n)[2:]:
+            r = self.sqr(r)
+            if bit=="1": r = self.mul(r, a)
+            pass
+        return self.mod(r)
+    #f inverse
+    def inverse(self, a:int) -> int:
+        """
+        Inverse of a modulo poly by the extended Euclidean algorithm; raises
+        ValueError if a and poly are not coprime
+        """
+        (r0, r1) = (self.poly, a)
+        (s0, s1) = (0, 1)
+        while r1:
+            while r0.bit_length() >= r1.bit_length() and r0:
+                sh = r0.bit_length() - r1.bit_length()
+                r0 ^= r1<<sh
+                s0 ^= s1<<sh
+                pass
+            (r0, r1) = (r1, r0)
+            (s0, s1) = (s1, s0)
+            pass
+        if r0!=1: raise ValueError("%x has no inverse modulo %x"%(a, self.poly))
+        return gf2_mod(s0, self.poly)
+    #f xpow
+    def xpow(self, n:int) -> int:
+        """
+        x^n for n>=0, by squaring and multiplying by x
+        """
+        r = 1
+        for bit in bin(n)[2:]:
+            r = self.sqr(r)
+            if bit=="1": r = self.mod(r<<1)
+            pass
+        return self.mod(r)
+    pass
+
+#a Order and primitivity
+#f order_dividing
+def order_dividing(poly:int, n:int) -> int:
+    """
+    Return the order of x modulo poly given that x^n is 1
+    """
+    m = Gf2Modulus(poly)
+    order = n
+    for q in prime_factors(order):
+        while order%q==0 and m.xpow(order//q)==1:
+            order //= q
+            pass
+        pass
+    return order
+
+#f gf2_order_of_x
+def gf2_order_of_x(poly:int) -> int:
+    """
+    Return the multiplicative order of x modulo poly (the length of the
+    LFSR sequence from 1), or 0 if x is not invertible (poly has no
+    constant term)
+
+    If x^(2^nbits-1) is 1 (as it is if poly is irreducible) the order
+    divides 2^nbits-1 and is found from its prime factors. Otherwise the
+    distinct irreducible factors of each degree d are split out (as the gcd
+    with x^(2^d)-x); the order modulo their product divides 2^d-1, and the
+    order modulo the squarefree part of poly is the lcm of these, L. The
+    order modulo poly is then L.2^t for the smallest t that makes x^(L.2^t)
+    one, as repeated factors only contribute powers of two
+    """
+    nbits = poly.bit_length()-1
+    if nbits<1 or (poly&1)==0: return 0
+    if Gf2Modulus(poly).xpow((1<<nbits)-1)==1:
+        return order_dividing(poly, (1<<nbits)-1)
+    order = 1
+    rest = poly
+    x_2d = 2
+    d = 0
+    while rest.bit_length()-1 >= 2*(d+1):
+        d += 1
+        x_2d = gf2_mulmod(x_2d, x_2d, rest)
+        g = gf2_gcd(rest, x_2d ^ 2)
+        if g==1: continue
+        order = math.lcm(order, order_dividing(g, (1<<d)-1))
+        while g!=1:
+            rest = gf2_divmod(rest, g)[0]
+            g = gf2_gcd(rest, g)
+            pass
+        x_2d = gf2_mod(x_2d, rest)
+        pass
+    if rest!=1:
+        order = math.lcm(order, order_dividing(rest, (1<<(rest.bit_length()-1))-1))
+        pass
+    m = Gf2Modulus(poly)
+    while m.xpow(order)!=1: order *= 2
+    return order
+
+#f gf2_is_primitive
+def gf2_is_primitive(poly:int) -> bool:
+    """
+    Return True if poly (including its top bit) is primitive, i.e. x has
+    order 2^nbits-1: x^(2^nbits-1) is 1, and x^((2^nbits-1)/q) is not 1
+    for any prime factor q of 2^nbits-1
+
+    The first test is done as x^(2^nbits)==x by nbits squarings, which
+    rejects most candidates cheaply
+    """
+    nbits = poly.bit_length()-1
+    if nbits<1 or (poly&1)==0: return False
+    if nbits==1: return True
+    m = Gf2Modulus(poly)
+    a = 2
+    for i in range(nbits): a = m.sqr(a)
+    if a!=2: return False
+    order = (1<<nbits)-1
+    for q in prime_factors(order):
+        if m.xpow(order//q)==1: return False
+        pass
+    return True
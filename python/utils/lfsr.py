@@ -16,7 +16,10 @@
 #
 
 #a Imports
+import sys
+from array import array
 from typing import Optional
+from .gf2 import gf2_mulmod, gf2_xpow, gf2_order_of_x, gf2_is_primitive
 
 #a Useful functions
 def int_of_bits(bits):
@@ -42,6 +45,48 @@ def poly_of_list(l):
         pass
     return v
 
+#a Step tables
+#v Cache of step tables keyed on (poly, nbits, steps)
+_step_tables = {}
+
+#f step_tables
+def step_tables(poly:int, nbits:int, steps:int) -> list[list[int]]:
+    """
+    Return the tables for advancing an LFSR (poly including its top bit) by
+    'steps' clocks at once, for steps of 8 or a multiple of 16 up to nbits;
+    generated on first use and then cached
+
+    Both the bits shifted out (the quotient) and the feedback (remainder)
+    depend only on the top 'steps' bits of the value, and linearly so; the
+    top bits are split into 8- or 16-bit slices, most significant first, and
+    XORing the slice table entries gives (feedback<<steps) | out where the
+    new value is ((value<<steps) & mask) ^ feedback
+    """
+    key = (poly, nbits, steps)
+    if key in _step_tables: return _step_tables[key]
+    slice_bits = min(steps, 16)
+    tables = []
+    for j in range(steps // slice_bits):
+        basis = []
+        for bit in range(slice_bits):
+            v = 1 << (nbits-slice_bits*(j+1)+bit)
+            out = 0
+            for i in range(steps):
+                out = (out<<1) | (v>>(nbits-1))
+                v <<= 1
+                if v>>nbits: v ^= poly
+                pass
+            basis.append((v<<steps) | out)
+            pass
+        table = [0] * (1<<slice_bits)
+        for u in range(1, 1<<slice_bits):
+            table[u] = table[u&(u-1)] ^ basis[(u&-u).bit_length()-1]
+            pass
+        tables.append(table)
+        pass
+    _step_tables[key] = tables
+    return tables
+
 #a Lfsr base class
 class Lfsr(object):
     init  : int = 0 # initial value
@@ -62,8 +107,7 @@ class Lfsr(object):
         self.poly = self.poly | (1<<self.nbits)
         if not self.validated:
             print("Validating",self.__class__.__name__)
-            l=self.find_length()
-            if (l+1)!=(1<<self.nbits): print("Not maximal",self.__class__.__name__)
+            if not self.is_maximal(): print("Not maximal",self.__class__.__name__)
             pass
         if value is not None:
             self.value = value
@@ -84,45 +128,165 @@ class Lfsr(object):
             pass
         pass
     def clk(self,n):
-        for i in range(n):
-            self.clk_once()
+        """
+        Equivalent to n calls of clk_once (or stepping backwards for
+        negative n), using x^n mod poly by square-and-multiply
+        """
+        self.value = gf2_mulmod(self.value, gf2_xpow(n, self.poly), self.poly)
+        pass
+    def fill(self, buffer) -> None:
+        """
+        Fill a writable buffer (bytearray, memoryview, numpy array...) with the
+        LFSR output bits, the bits shifted out of the top of the register as
+        clk_once is called, packed MSB first; the LFSR is left clocked past
+        the bits generated
+
+        The output sequence s obeys the recurrence of poly, and so also that
+        of poly(x)^(2^k) = poly(x^(2^k)): s[t+nbits.u] is the XOR of s[t+i.u]
+        for each other term x^i of poly, for u=2^k. With u a whole number of
+        bytes, the first nbits*u bytes are generated with fill_steps and the
+        rest a block at a time with big-integer XORs of earlier bytes
+        """
+        mv = memoryview(buffer).cast("B")
+        n = len(mv)
+        nbits = self.nbits
+        unit = 1
+        while unit<4096 and nbits*unit*2*8 <= n: unit *= 2
+        prefix = nbits*unit
+        if n < 2*prefix:
+            self.fill_steps(mv)
+            return
+        value = self.value
+        self.fill_steps(mv[:prefix])
+        terms = [i for i in range(nbits) if (self.poly>>i)&1]
+        chunk = (nbits - terms[-1]) * unit
+        m = prefix
+        while m < n:
+            c = min(chunk, n-m)
+            base = m - prefix
+            x = 0
+            for i in terms:
+                x ^= int.from_bytes(mv[base+i*unit:base+i*unit+c], "big")
+                pass
+            mv[m:m+c] = x.to_bytes(c, "big")
+            m += c
             pass
+        self.value = value
+        self.clk(8*n)
         pass
+    def fill_steps(self, buffer) -> None:
+        """
+        Fill a buffer as fill does, advancing the LFSR 64, 32, 16 or 8 clocks
+        at a time (as nbits permits) using step_tables
+        """
+        mv = memoryview(buffer).cast("B")
+        n = len(mv)
+        if self.nbits<8:
+            for i in range(n):
+                b = 0
+                for j in range(8):
+                    b = (b<<1) | (self.value>>(self.nbits-1))
+                    self.clk_once()
+                    pass
+                mv[i] = b
+                pass
+            return
+        done = 0
+        for (steps, typecode) in ((64,"Q"), (32,"I"), (16,"H"), (8,"B")):
+            if steps>self.nbits: continue
+            count = (n-done) // (steps//8)
+            if count==0: continue
+            tables = step_tables(self.poly, self.nbits, steps)
+            top = self.nbits - 16
+            low_mask = (1<<(self.nbits-steps))-1
+            out_mask = (1<<steps)-1
+            v = self.value
+            out = array(typecode, bytes(count*(steps//8)))
+            if steps==8:
+                t0 = tables[0]
+                for i in range(count):
+                    e = t0[v>>(self.nbits-8)]
+                    v = ((v & low_mask)<<8) ^ (e>>8)
+                    out[i] = e & 0xff
+                    pass
+                pass
+            elif steps==16:
+                t0 = tables[0]
+                for i in range(count):
+                    e = t0[v>>top]
+                    v = ((v & low_mask)<<16) ^ (e>>16)
+                    out[i] = e & 0xffff
+                    pass
+                pass
+            elif steps==32:
+                (t0, t1) = tables
+                for i in range(count):
+                    e = t0[v>>top] ^ t1[(v>>(top-16)) & 0xffff]
+                    v = ((v & low_mask)<<32) ^ (e>>32)
+                    out[i] = e & out_mask
+                    pass
+                pass
+            else:
+                (t0, t1, t2, t3) = tables
+                for i in range(count):
+                    e = (t0[v>>top] ^ t1[(v>>(top-16)) & 0xffff] ^
+                         t2[(v>>(top-32)) & 0xffff] ^ t3[(v>>(top-48)) & 0xffff])
+                    v = ((v & low_mask)<<64) ^ (e>>64)
+                    out[i] = e & out_mask
+                    pass
+                pass
+            self.value = v
+            if steps>8 and sys.byteorder=="little": out.byteswap()
+            mv[done:done+count*(steps//8)] = out.tobytes()
+            done += count*(steps//8)
+            pass
+        pass
+    def stream(self, count:int, bits_per_output:int=8):
+        """
+        Return the next count*bits_per_output LFSR output bits (as fill) as
+        bytes for bits_per_output of 8, an array('H') for 16, else a list of
+        integers
+        """
+        nbytes = (count*bits_per_output+7)//8
+        buffer = bytearray(nbytes)
+        self.fill(buffer)
+        if bits_per_output==8: return bytes(buffer)
+        if bits_per_output==16:
+            r = array("H", bytes(buffer))
+            if sys.byteorder=="little": r.byteswap()
+            return r
+        # Any left over bits in the final byte must be given back
+        spare = nbytes*8 - count*bits_per_output
+        if spare>0: self.clk(-spare)
+        v = int.from_bytes(buffer, "big") >> spare
+        mask = (1<<bits_per_output)-1
+        return [(v>>(bits_per_output*(count-1-i))) & mask for i in range(count)]
     def bit_reverse(self):
         x = bits_of_n(self.nbits, self.value)
         x.reverse()
         return int_of_bits(x)
+    def is_maximal(self) -> bool:
+        """
+        Return True if the polynomial is primitive, i.e. the LFSR has length
+        2^nbits-1; this uses the order of x, so is fast even for 64+ bits
+        """
+        return gf2_is_primitive(self.poly)
+    def cycles_to(self, value:int, max_table_entries:Optional[int]=None, cache_dir:Optional[str]=None) -> int:
+        """
+        Return the number of clk_once calls that would take the LFSR from its
+        current value to value, using a discrete log index (see lfsr_index)
+        rather than clocking; raises ValueError if value is not reachable
+        """
+        from .lfsr_index import LfsrIndex
+        index = LfsrIndex.of_poly(self.poly, max_table_entries, cache_dir)
+        return index.cycles_between(self.value, value)
     def find_length(self):
-        remainders = {}
-        remainders[0] = 0
-        remainders[1] = self.poly & self.mask
-        bits_per_tick = 14
-        if (self.nbits<bits_per_tick): bits_per_tick=self.nbits-1
-        p = self.poly
-        for i in range(1<<bits_per_tick):
-            if i in remainders:
-                p = remainders[i]
-                continue
-            p = remainders[i // 2]<<1
-            if (p>>self.nbits): p = p ^ self.poly
-            if (i&1): p = (p ^ self.poly) & self.mask
-            remainders[i] = p
-            pass
-        # for (k,v) in remainders.items():print(k,v,self.mask)
-        p = 1
-        n = 0
-        for i in range(((1<<self.nbits)-bits_per_tick) // bits_per_tick):
-            p = p<<bits_per_tick
-            p = (p ^ remainders[p>>self.nbits]) & self.mask
-            n += bits_per_tick
-            pass
-        self.value = p
-        while self.value!=1:
-            self.clk_once()
-            n+=1
-            if n>(1<<self.nbits): break
-            pass
-        return n
+        """
+        Return the length of the sequence starting from 1; this is the order
+        of x modulo poly (see gf2_order_of_x), or 0 if poly has no constant
+        term (so the sequence never returns to 1)
+        """
+        return gf2_order_of_x(self.poly)
     def __str__(self, msb_first=True):
         r = ""
         br = range(0,self.nbits)
@@ -134,369 +298,133 @@ class Lfsr(object):
     pass
 
 #a Maximal length LFSRs
-# Each is presented as max_lfsr_N
-# There may be a max_lfsr_N_2 which is a 2-tap LFSR (top tap is N)
-# There will be a max_lfsr_N_4 which is a 4-tap LFSR (top tap is N)
-# max_lfsr_N will be max_lfsr_N_2 if it exists, else max_lfsr_N_4
+# max_lfsr(N) is the LFSR class MaxLfsr_N, and max_lfsr(N,k) is MaxLfsr_N_k;
+# these are created on first use (including by 'from lfsr import MaxLfsr_N')
+# There may be a MaxLfsr_N_2 which is a 2-tap LFSR (top tap is N)
+# There will be a MaxLfsr_N_4 which is a 4-tap LFSR (top tap is N)
+# MaxLfsr_N will be MaxLfsr_N_2 if it exists, else MaxLfsr_N_4
 # data taken from http://courses.cse.tamu.edu/csce680/walker/lfsr_table.pdf
-
-#c Lfsr 2
-class MaxLfsr_2(Lfsr):
-    nbits = 2
-    poly  = poly_of_list([1,0])
-    pass
-
-#c Lfsr 3
-class MaxLfsr_3(Lfsr):
-    nbits = 3
-    poly  = poly_of_list([2,0])
-    pass
-
-#c Lfsr 4
-class MaxLfsr_4(Lfsr):
-    nbits = 4
-    poly  = poly_of_list([3,0]) # 4,3
-    pass
-
-#c Lfsr 5
-class MaxLfsr_5_2(Lfsr):
-    nbits = 5
-    poly  = poly_of_list([3,0]) # 5,3
-    pass
-
-class MaxLfsr_5_4(Lfsr):
-    nbits = 5
-    poly  = poly_of_list([4,3,2,0]) # 5,4,3,2
-    pass
-class MaxLfsr_5(MaxLfsr_5_2): pass
-
-#c Lfsr 6
-class MaxLfsr_6_2(Lfsr):
-    nbits = 6
-    poly  = poly_of_list([5,0])
-    pass
-
-class MaxLfsr_6_4(Lfsr):
-    nbits = 6
-    poly  = poly_of_list([5,3,2,0])
-    pass
-class MaxLfsr_6(MaxLfsr_6_2): pass
-
-#c Lfsr 7
-class MaxLfsr_7_2(Lfsr):
-    nbits = 7
-    poly  = poly_of_list([6,0])
-    pass
-
-class MaxLfsr_7_4(Lfsr):
-    nbits = 7
-    poly  = poly_of_list([6,5,4,0])
-    pass
-class MaxLfsr_7(MaxLfsr_7_2): pass
-
-#c Lfsr 8
-class MaxLfsr_8_4(Lfsr):
-    nbits = 8
-    poly  = poly_of_list([6,5,4,0])
-    pass
-class MaxLfsr_8(MaxLfsr_8_4): pass
-
-#c Lfsr 9
-class MaxLfsr_9_2(Lfsr):
-    nbits = 9
-    poly  = poly_of_list([5,0])
-    pass
-
-class MaxLfsr_9_4(Lfsr):
-    nbits = 9
-    poly  = poly_of_list([8,6,5,0])
-    pass
-class MaxLfsr_9(MaxLfsr_9_2): pass
-
-#c Lfsr 10
-class MaxLfsr_10_2(Lfsr):
-    nbits = 10
-    poly  = poly_of_list([7,0])
-    pass
-
-class MaxLfsr_10_4(Lfsr):
-    nbits = 10
-    poly  = poly_of_list([9,7,6,0])
-    pass
-class MaxLfsr_10(MaxLfsr_10_2): pass
-
-#c Lfsr 11
-class MaxLfsr_11_2(Lfsr):
-    nbits = 11
-    poly  = poly_of_list([9,0])
-    pass
-
-class MaxLfsr_11_4(Lfsr):
-    nbits = 11
-    poly  = poly_of_list([10,9,7,0])
-    pass
-class MaxLfsr_11(MaxLfsr_11_2): pass
-
-#c Lfsr 12
-class MaxLfsr_12_4(Lfsr):
-    nbits = 12
-    poly  = poly_of_list([11,8,6,0])
-    pass
-class MaxLfsr_12(MaxLfsr_12_4): pass
-
-#c Lfsr 13
-class MaxLfsr_13_4(Lfsr):
-    nbits = 13
-    poly  = poly_of_list([12,10,9,0])
-    pass
-class MaxLfsr_13(MaxLfsr_13_4): pass
-
-#c Lfsr 14
-class MaxLfsr_14_4(Lfsr):
-    nbits = 14
-    poly  = poly_of_list([13,11,9,0])
-    pass
-class MaxLfsr_14(MaxLfsr_14_4): pass
-
-#c Lfsr 15
-class MaxLfsr_15_2(Lfsr):
-    nbits = 15
-    poly  = poly_of_list([14,0])
-    pass
-
-class MaxLfsr_15_4(Lfsr):
-    nbits = 15
-    poly  = poly_of_list([14,13,11,0])
-    pass
-class MaxLfsr_15(MaxLfsr_15_2): pass
-
-#c Lfsr 16
-class MaxLfsr_16_4(Lfsr):
-    nbits = 16
-    poly  = poly_of_list([14,13,11,0])
-    pass
-class MaxLfsr_16(MaxLfsr_16_4): pass
-
-#c Lfsr 17
-class MaxLfsr_17_2(Lfsr):
-    nbits = 17
-    poly  = poly_of_list([14,0])
-    pass
-
-class MaxLfsr_17_4(Lfsr):
-    nbits = 17
-    poly  = poly_of_list([16,15,14,0])
-    pass
-class MaxLfsr_17(MaxLfsr_17_2): pass
-
-#c Lfsr 18
-class MaxLfsr_18_2(Lfsr):
-    nbits = 18
-    poly  = poly_of_list([11,0])
-    pass
-
-class MaxLfsr_18_4(Lfsr):
-    nbits = 18
-    poly  = poly_of_list([17,16,13,0])
-    pass
-class MaxLfsr_18(MaxLfsr_18_2): pass
-
-#c Lfsr 19
-class MaxLfsr_19_4(Lfsr):
-    nbits = 19
-    poly  = poly_of_list([18,17,14,0])
-    pass
-class MaxLfsr_19(MaxLfsr_19_4): pass
-
-#c Lfsr 20
-class MaxLfsr_20_2(Lfsr):
-    nbits = 20
-    poly  = poly_of_list([17,0])
-    pass
-
-class MaxLfsr_20_4(Lfsr):
-    nbits = 20
-    poly  = poly_of_list([19,16,14,0])
-    pass
-class MaxLfsr_20(MaxLfsr_20_2): pass
-
-#c Lfsr 21
-class MaxLfsr_21_2(Lfsr):
-    nbits = 21
-    poly  = poly_of_list([19,0])
-    pass
-
-class MaxLfsr_21_4(Lfsr):
-    nbits = 21
-    poly  = poly_of_list([20,19,16,0])
-    pass
-class MaxLfsr_21(MaxLfsr_21_2): pass
-
-#c Lfsr 22
-class MaxLfsr_22_2(Lfsr):
-    nbits = 22
-    poly  = poly_of_list([21,0])
-    pass
-
-class MaxLfsr_22_4(Lfsr):
-    nbits = 22
-    poly  = poly_of_list([19,18,17,0])
-    pass
-class MaxLfsr_22(MaxLfsr_22_2): pass
-
-#c Lfsr 23
-class MaxLfsr_23_2(Lfsr):
-    nbits = 23
-    poly  = poly_of_list([18,0])
-    pass
-
-class MaxLfsr_23_4(Lfsr):
-    nbits = 23
-    poly  = poly_of_list([22,20,18,0])
-    pass
-class MaxLfsr_23(MaxLfsr_23_2): pass
-
-#c Lfsr 24
-class MaxLfsr_24_4(Lfsr):
-    nbits = 24
-    poly  = poly_of_list([23,21,20,0])
-    pass
-class MaxLfsr_24(MaxLfsr_24_4): pass
-
-#c Lfsr 25
-class MaxLfsr_25_2(Lfsr):
-    nbits = 25
-    poly  = poly_of_list([22,0])
-    pass
-
-class MaxLfsr_25_4(Lfsr):
-    nbits = 25
-    poly  = poly_of_list([24,23,22,0])
-    pass
-class MaxLfsr_25(MaxLfsr_25_2): pass
-
-#c Lfsr 26
-class MaxLfsr_26_4(Lfsr):
-    nbits = 26
-    poly  = poly_of_list([25,24,20,0])
-    pass
-class MaxLfsr_26(MaxLfsr_26_4): pass
-
-#c Lfsr 27
-class MaxLfsr_27_4(Lfsr):
-    nbits = 27
-    poly  = poly_of_list([26,25,22,0])
-    pass
-class MaxLfsr_27(MaxLfsr_27_4): pass
-
-#c Lfsr 28
-class MaxLfsr_28_2(Lfsr):
-    nbits = 28
-    poly  = poly_of_list([25,0])
-    pass
-
-class MaxLfsr_28_4(Lfsr):
-    nbits = 28
-    poly  = poly_of_list([27,24,22,0])
-    pass
-class MaxLfsr_28(MaxLfsr_28_2): pass
-
-#c Lfsr 29
-class MaxLfsr_29_2(Lfsr):
-    nbits = 29
-    poly  = poly_of_list([27,0])
-    pass
-
-class MaxLfsr_29_4(Lfsr):
-    nbits = 29
-    poly  = poly_of_list([28,27,25,0])
-    pass
-class MaxLfsr_29(MaxLfsr_29_2): pass
-
-#c Lfsr 30
-class MaxLfsr_30_4(Lfsr):
-    nbits = 30
-    poly  = poly_of_list([29,26,24,0])
-    pass
-class MaxLfsr_30(MaxLfsr_30_4): pass
-
-#c Lfsr 31
-class MaxLfsr_31_2(Lfsr):
-    nbits = 31
-    poly  = poly_of_list([28,0])
-    pass
-
-class MaxLfsr_31_4(Lfsr):
-    nbits = 31
-    poly  = poly_of_list([30,29,28,0])
-    pass
-class MaxLfsr_31(MaxLfsr_31_2): pass
-
-#c Lfsr 32
-class MaxLfsr_32_4(Lfsr):
-    nbits = 32
-    poly  = poly_of_list([30,26,25,0])
-    pass
-class MaxLfsr_32(MaxLfsr_32_4): pass
-
-#c Lfsr 33
-class MaxLfsr_33_2(Lfsr):
-    nbits = 33
-    poly  = poly_of_list([20,0])
-    pass
-
-class MaxLfsr_33_4(Lfsr):
-    nbits = 33
-    poly  = poly_of_list([32,29,27,0])
-    pass
-class MaxLfsr_33(MaxLfsr_33_2): pass
-
-#c Lfsr 34
-class MaxLfsr_34_4(Lfsr):
-    nbits = 34
-    poly  = poly_of_list([31,30,26,0])
-    pass
-class MaxLfsr_34(MaxLfsr_34_4): pass
-
-#c Lfsr 35
-class MaxLfsr_35_2(Lfsr):
-    nbits = 35
-    poly  = poly_of_list([33,0])
-    validated = False
-    pass
-
-class MaxLfsr_35_4(Lfsr):
-    nbits = 35
-    poly  = poly_of_list([34,28,27,0])
-    validated = False
-    pass
-class MaxLfsr_35(MaxLfsr_35_2): pass
-
-#c Lfsr 36
-class MaxLfsr_36_2(Lfsr):
-    nbits = 36
-    poly  = poly_of_list([25,0])
-    validated = False
-    pass
-
-class MaxLfsr_36_4(Lfsr):
-    nbits = 36
-    poly  = poly_of_list([35, 29,28,0])
-    validated = False
-    pass
-class MaxLfsr_36(MaxLfsr_36_2): pass
-
-#c Lfsr 37
-class MaxLfsr_37_4(Lfsr):
-    nbits = 37
-    poly  = poly_of_list([36,33,31,0])
-    validated = False
-    pass
-class MaxLfsr_37(MaxLfsr_37_4): pass
-
-#a Test
-do_validation = False
-for c in Lfsr.__subclasses__():
-    if do_validation:
-        x=c()
-    pass
+# (38 to 64 bits from Xilinx XAPP052, with 4-tap variants found by search)
+# All are checked to be primitive by test/python/test_lfsr.py
+#v max_lfsr_taps
+# nbits: {number of taps: taps other than nbits and 0}
+max_lfsr_taps = {
+    2:  {2:[1]},
+    3:  {2:[2]},
+    4:  {2:[3]},
+    5:  {2:[3], 4:[4,3,2]},
+    6:  {2:[5], 4:[5,3,2]},
+    7:  {2:[6], 4:[6,5,4]},
+    8:  {4:[6,5,4]},
+    9:  {2:[5], 4:[8,6,5]},
+    10: {2:[7], 4:[9,7,6]},
+    11: {2:[9], 4:[10,9,7]},
+    12: {4:[11,8,6]},
+    13: {4:[12,10,9]},
+    14: {4:[13,11,9]},
+    15: {2:[14], 4:[14,13,11]},
+    16: {4:[14,13,11]},
+    17: {2:[14], 4:[16,15,14]},
+    18: {2:[11], 4:[17,16,13]},
+    19: {4:[18,17,14]},
+    20: {2:[17], 4:[19,16,14]},
+    21: {2:[19], 4:[20,19,16]},
+    22: {2:[21], 4:[19,18,17]},
+    23: {2:[18], 4:[22,20,18]},
+    24: {4:[23,21,20]},
+    25: {2:[22], 4:[24,23,22]},
+    26: {4:[25,24,20]},
+    27: {4:[26,25,22]},
+    28: {2:[25], 4:[27,24,22]},
+    29: {2:[27], 4:[28,27,25]},
+    30: {4:[29,26,24]},
+    31: {2:[28], 4:[30,29,28]},
+    32: {4:[30,26,25]},
+    33: {2:[20], 4:[32,29,27]},
+    34: {4:[31,30,26]},
+    35: {2:[33], 4:[34,28,27]},
+    36: {2:[25], 4:[35,29,28]},
+    37: {4:[36,33,31]},
+    38: {4:[6,5,1]},
+    39: {2:[35], 4:[38,37,14]},
+    40: {4:[38,21,19]},
+    41: {2:[38], 4:[40,39,38]},
+    42: {4:[41,20,19]},
+    43: {4:[42,38,37]},
+    44: {4:[43,18,17]},
+    45: {4:[44,42,41]},
+    46: {4:[45,26,25]},
+    47: {2:[42], 4:[46,45,16]},
+    48: {4:[47,21,20]},
+    49: {2:[40], 4:[48,47,13]},
+    50: {4:[49,24,23]},
+    51: {4:[50,36,35]},
+    52: {2:[49], 4:[51,50,41]},
+    53: {4:[52,38,37]},
+    54: {4:[53,18,17]},
+    55: {2:[31], 4:[54,53,49]},
+    56: {4:[55,35,34]},
+    57: {2:[50], 4:[56,55,46]},
+    58: {2:[39], 4:[57,56,23]},
+    59: {4:[58,38,37]},
+    60: {2:[59], 4:[59,58,16]},
+    61: {4:[60,46,45]},
+    62: {4:[61,6,5]},
+    63: {2:[62], 4:[62,61,11]},
+    64: {4:[63,61,60]},
+}
+
+#v Classes created by max_lfsr, by name
+_max_lfsr_classes = {}
+
+#f max_lfsr
+def max_lfsr(nbits:int, taps=None):
+    """
+    Return the maximal-length LFSR class for nbits; taps may be None for the
+    fewest-tap option (MaxLfsr_N), a number of taps (MaxLfsr_N_k), or a list
+    of taps other than nbits and 0 (MaxLfsr_N_taps_a_b...)
+
+    Classes are created on first use and then cached
+    """
+    if taps is None:
+        name = "MaxLfsr_%d"%nbits
+        if name not in _max_lfsr_classes:
+            if nbits not in max_lfsr_taps: raise ValueError("No maximal length LFSR of %d bits in the table"%nbits)
+            base = max_lfsr(nbits, min(max_lfsr_taps[nbits]))
+            _max_lfsr_classes[name] = type(name, (base,), {"__module__":__name__})
+            pass
+        return _max_lfsr_classes[name]
+    if isinstance(taps, int):
+        if taps not in max_lfsr_taps.get(nbits,{}):
+            raise ValueError("No maximal length %d-tap LFSR of %d bits in the table"%(taps, nbits))
+        name = "MaxLfsr_%d_%d"%(nbits, taps)
+        taps = max_lfsr_taps[nbits][taps]
+        pass
+    else:
+        taps = list(taps)
+        name = "MaxLfsr_%d_taps_%s"%(nbits, "_".join([str(t) for t in taps]))
+        pass
+    if name not in _max_lfsr_classes:
+        _max_lfsr_classes[name] = type(name, (Lfsr,), {"__module__":__name__,
+                                                       "nbits":nbits,
+                                                       "poly":poly_of_list(taps+[0]),
+                                                       })
+        pass
+    return _max_lfsr_classes[name]
+
+#f __getattr__
+def __getattr__(name:str):
+    """
+    Provide MaxLfsr_N and MaxLfsr_N_k as module attributes on demand
+    """
+    parts = name.split("_")
+    if parts[0]=="MaxLfsr" and len(parts) in (2,3) and all([p.isdigit() for p in parts[1:]]):
+        try:
+            if len(parts)==2: c = max_lfsr(int(parts[1]))
+            else: c = max_lfsr(int(parts[1]), int(parts[2]))
+            pass
+        except ValueError:
+            raise AttributeError("module %r has no attribute %r"%(__name__, name))
+        globals()[name] = c
+        return c
+    raise AttributeError("module %r has no attribute %r"%(__name__, name))
@@ -0,0 +1,185 @@
+#a Copyright
+#
+#  This file 'lfsr_bank.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# A bank of many LFSRs with the same polynomial but independent values,
+# held in a numpy uint64 array (so up to 64 bits) and stepped together.
+#
+# Clocking a value n times multiplies it by x^n mod poly, which for a given
+# n is a linear map; it is applied to every lane with one table gather per
+# byte of the value. Per-lane jumps apply x^(2^j) to the lanes whose count
+# has bit j set.
+#
+# The tables for the power-of-two steps of per-lane jumps are kept (there
+# are at most two per bit of a count); the tables for other multipliers are
+# kept for the max_multiply_tables most recently used.
+
+#a Imports
+import numpy as np
+from typing import Optional
+from .lfsr import Lfsr
+from .gf2 import gf2_xpow
+
+#a LfsrBank
+#c LfsrBank
+class LfsrBank:
+    """
+    N LFSR lanes of an Lfsr class; lane i behaves as lfsr_class(value=values[i])
+    """
+    max_multiply_tables : int = 16
+    #f __init__
+    def __init__(self, lfsr_class=Lfsr, values=1, nbits:Optional[int]=None, poly:Optional[int]=None):
+        """
+        values is either a number of lanes (all starting at lfsr_class.init)
+        or an array-like of starting values
+        """
+        self.nbits = lfsr_class.nbits if nbits is None else nbits
+        poly = lfsr_class.poly if poly is None else poly
+        assert self.nbits<=64
+        self.mask = (1<<self.nbits)-1
+        assert (poly & self.mask)==poly
+        self.poly = poly | (1<<self.nbits)
+        if isinstance(values, int):
+            self.value = np.full(values, lfsr_class.init, dtype=np.uint64)
+            pass
+        else:
+            self.value = np.array(values, dtype=np.uint64)
+            pass
+        self.multiply_tables = {}
+        self.step_tables = {}
+        pass
+    #f __len__
+    def __len__(self) -> int:
+        return len(self.value)
+    #f set
+    def set(self, values) -> None:
+        self.value[:] = values
+        pass
+    #f get
+    def get(self, mask:Optional[int]=None):
+        if mask is not None: return self.value & np.uint64(mask)
+        return self.value.copy()
+    #f clk_once
+    def clk_once(self) -> None:
+        """
+        Clock every lane once, as Lfsr.clk_once
+        """
+        top = (self.value >> np.uint64(self.nbits-1)) & np.uint64(1)
+        feedback = np.uint64(self.poly & self.mask)
+        self.value = ((self.value << np.uint64(1)) & np.uint64(self.mask)) ^ (top * feedback)
+        pass
+    #f build_multiply_table
+    def build_multiply_table(self, c:int) -> list:
+        """
+        Return the tables to multiply by c mod poly: one table of 256 per
+        byte of the value, whose entries are XORed together
+        """
+        basis = []
+        v = c
+        for i in range(self.nbits):
+            basis.append(v)
+            v <<= 1
+            if v>>self.nbits: v ^= self.poly
+            pass
+        tables = []
+        for k in range((self.nbits+7)//8):
+            b = basis[8*k:8*k+8]
+            t = [0]*256
+            for u in range(1, 1<<len(b)):
+                t[u] = t[u&(u-1)] ^ b[(u&-u).bit_length()-1]
+                pass
+            tables.append(np.array(t, dtype=np.uint64))
+            pass
+        return tables
+    #f multiply_table
+    def multiply_table(self, c:int) -> list:
+        """
+        Return the tables to multiply by c mod poly, keeping those of the
+        max_multiply_tables most recently used multipliers
+        """
+        tables = self.multiply_tables.pop(c, None)
+        if tables is None:
+            tables = self.build_multiply_table(c)
+            if len(self.multiply_tables)>=self.max_multiply_tables:
+                del self.multiply_tables[next(iter(self.multiply_tables))]
+                pass
+            pass
+        self.multiply_tables[c] = tables
+        return tables
+    #f step_table
+    def step_table(self, j:int, backwards:bool) -> list:
+        """
+        Return (and keep) the tables to clock 2^j times, backwards if required
+        """
+        key = (j, backwards)
+        if key not in self.step_tables:
+            self.step_tables[key] = self.build_multiply_table(gf2_xpow(-(1<<j) if backwards else (1<<j), self.poly))
+            pass
+        return self.step_tables[key]
+    #f multiply
+    def multiply(self, c:int, lanes=None) -> None:
+        """
+        Multiply the value of every lane (or those selected by index or
+        boolean array lanes) by c mod poly
+        """
+        self.apply_tables(self.multiply_table(c), lanes)
+        pass
+    #f apply_tables
+    def apply_tables(self, tables:list, lanes=None) -> None:
+        """
+        Multiply the value of every lane (or those selected by lanes) using
+        the tables of a multiplier
+        """
+        v = self.value if lanes is None else self.value[lanes]
+        r = np.zeros_like(v)
+        for (k, t) in enumerate(tables):
+            r ^= t[(v >> np.uint64(8*k)) & np.uint64(0xff)]
+            pass
+        if lanes is None:
+            self.value = r
+            pass
+        else:
+            self.value[lanes] = r
+            pass
+        pass
+    #f clk
+    def clk(self, n:int) -> None:
+        """
+        Clock every lane n times (backwards for negative n), as Lfsr.clk
+        """
+        self.multiply(gf2_xpow(n, self.poly))
+        pass
+    #f clk_lanes
+    def clk_lanes(self, counts) -> None:
+        """
+        Clock each lane by its own number of cycles (negative to step back)
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        magnitude = np.abs(counts).astype(np.uint64)
+        backwards = counts < 0
+        j = 0
+        while np.any(magnitude):
+            bit = (magnitude & np.uint64(1)).astype(bool)
+            forwards = bit & ~backwards
+            if np.any(forwards): self.apply_tables(self.step_table(j, False), forwards)
+            bit &= backwards
+            if np.any(bit): self.apply_tables(self.step_table(j, True), bit)
+            magnitude >>= np.uint64(1)
+            j += 1
+            pass
+        pass
+    pass
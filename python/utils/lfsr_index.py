@@ -0,0 +1,236 @@
+#a Copyright
+#
+#  This file 'lfsr_index.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Map an LFSR state to its position in the sequence (a discrete log).
+#
+# Clocking an LFSR k times multiplies its value by x^k mod poly, so the
+# number of cycles from seed to state is the k for which
+# x^k = state/seed mod poly. x has an order N (2^nbits-1 for a maximal
+# LFSR), and k is found modulo each prime power q^e dividing N
+# (Pohlig-Hellman) and the results combined. Each prime q needs a
+# discrete log in a group of order q, done by baby-step/giant-step with a
+# table of at most max_table_entries baby steps; this is O(sqrt(q)) when
+# the table fits, and the largest prime factor of 2^nbits-1 is usually far
+# smaller than 2^nbits.
+#
+# The table has more than sqrt(q) entries if that keeps the giant steps
+# within max_giant_steps; when the table is capped a prime q needs
+# q/max_table_entries giant steps, and an index whose order has a prime
+# factor needing more than max_giant_steps is refused (ValueError) rather
+# than taking hours. With
+# the defaults this excludes 49, 59 and 61 bit maximal LFSRs (2^61-1 is
+# prime, and 2^49-1 and 2^59-1 have 43- and 42-bit prime factors); the
+# slowest widths that are indexed are then 31 and 62 bits, with a
+# 46k-entry table.
+#
+# Baby-step tables of at least min_cached_entries are saved in cache_dir
+# (by default $LFSR_INDEX_CACHE_DIR or ~/.cache/lfsr_index), one file per
+# (poly, q, table size). A file is a header line giving the format
+# version, poly, q and table size, then the table entries (g^j) as
+# fixed-width little-endian integers; a file whose header, size or entries
+# do not check out is ignored and rewritten. No code is run from the
+# files (they are not pickles).
+
+#a Imports
+import os
+import math
+from typing import Optional
+from .gf2 import Gf2Modulus, gf2_order_of_x, prime_factors
+
+#a LfsrIndex
+#c LfsrIndex
+class LfsrIndex:
+    """
+    Discrete log index for an LFSR polynomial (including its top bit)
+    """
+    max_table_entries : int = 1<<20
+    max_giant_steps : int = 1<<20
+    #v Version of the cache file format, and the smallest table worth caching
+    cache_version : int = 1
+    min_cached_entries : int = 1<<10
+    #v Index objects by (poly, max_table_entries, cache_dir)
+    indices = {}
+    #f of_poly
+    @classmethod
+    def of_poly(cls, poly:int, max_table_entries:Optional[int]=None, cache_dir:Optional[str]=None):
+        """
+        Return a shared index for a polynomial
+        """
+        key = (poly, max_table_entries, cache_dir)
+        if key not in cls.indices:
+            cls.indices[key] = cls(poly, max_table_entries, cache_dir)
+            pass
+        return cls.indices[key]
+    #f __init__
+    def __init__(self, poly:int, max_table_entries:Optional[int]=None, cache_dir:Optional[str]=None):
+        self.poly = poly
+        self.nbits = poly.bit_length()-1
+        if max_table_entries is not None: self.max_table_entries = max_table_entries
+        if cache_dir is None:
+            cache_dir = os.environ.get("LFSR_INDEX_CACHE_DIR",
+                                       os.path.join(os.path.expanduser("~"), ".cache", "lfsr_index"))
+            pass
+        self.cache_dir = cache_dir
+        self.modulus = Gf2Modulus(poly)
+        self.order = gf2_order_of_x(poly)
+        if self.order==0:
+            raise ValueError("Polynomial %x has no constant term, so has no LFSR index"%poly)
+        q = max(prime_factors(self.order), default=1)
+        if self.giant_steps(q) > self.max_giant_steps:
+            raise ValueError("Polynomial %x has order with prime factor %d needing %d giant steps (max_giant_steps is %d); max_table_entries of %d would be required"%(
+                poly, q, self.giant_steps(q), self.max_giant_steps, (q+self.max_giant_steps-1)//self.max_giant_steps))
+        self.tables = {}
+        pass
+    #f table_size
+    def table_size(self, q:int) -> int:
+        """
+        Number of baby steps for the subgroup of prime order q: about
+        sqrt(q), or more if that would need over max_giant_steps giant
+        steps, but at most max_table_entries
+        """
+        m = max(math.isqrt(q-1)+1, (q+self.max_giant_steps-1)//self.max_giant_steps)
+        return min(m, self.max_table_entries)
+    #f giant_steps
+    def giant_steps(self, q:int) -> int:
+        """
+        Largest number of giant steps for the subgroup of prime order q
+        """
+        return (q+self.table_size(q)-1) // self.table_size(q)
+    #f cache_filename
+    def cache_filename(self, q:int, m:int) -> str:
+        return os.path.join(self.cache_dir, "lfsr_%d_%x_%x_%d.bin"%(self.nbits, self.poly, q, m))
+    #f cache_header
+    def cache_header(self, q:int, m:int) -> bytes:
+        return ("lfsr_index %d %x %x %d\n"%(self.cache_version, self.poly, q, m)).encode()
+    #f load
+    def load(self, q:int, m:int, g:int) -> Optional[list[int]]:
+        """
+        Read the baby steps of generator g for prime q from the cache,
+        returning None if there is no file or it does not check out (the
+        first, second and last steps are checked, and every log found is
+        checked by log)
+        """
+        header = self.cache_header(q, m)
+        nbytes = (self.nbits+7)//8
+        try:
+            with open(self.cache_filename(q, m),"rb") as f:
+                data = f.read()
+                pass
+            pass
+        except OSError:
+            return None
+        if not data.startswith(header) or len(data)!=len(header)+m*nbytes: return None
+        steps = [int.from_bytes(data[i:i+nbytes], "little") for i in range(len(header), len(data), nbytes)]
+        if steps[0]!=1 or max(steps)>>self.nbits or len(set(steps))!=m: return None
+        if m>1 and (steps[1]!=g or steps[-1]!=self.modulus.pow(g, m-1)): return None
+        return steps
+    #f save
+    def save(self, q:int, m:int, steps:list[int]) -> None:
+        """
+        Write the baby steps for prime q to the cache directory; failure to
+        write is not an error
+        """
+        nbytes = (self.nbits+7)//8
+        filename = self.cache_filename(q, m)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(filename+".tmp","wb") as f:
+                f.write(self.cache_header(q, m))
+                f.write(b"".join([v.to_bytes(nbytes, "little") for v in steps]))
+                pass
+            os.replace(filename+".tmp", filename)
+            pass
+        except OSError:
+            pass
+        pass
+    #f baby_steps
+    def baby_steps(self, q:int) -> tuple[int, dict[int,int]]:
+        """
+        Return (m, {g^j:j for j<m}) for g the generator x^(order/q) of the
+        subgroup of order q
+        """
+        if q in self.tables: return self.tables[q]
+        m = self.table_size(q)
+        g = self.modulus.xpow(self.order // q)
+        steps = None
+        if m>=self.min_cached_entries: steps = self.load(q, m, g)
+        if steps is None:
+            steps = []
+            v = 1
+            for j in range(m):
+                steps.append(v)
+                v = self.modulus.mul(v, g)
+                pass
+            if m>=self.min_cached_entries: self.save(q, m, steps)
+            pass
+        self.tables[q] = (m, {v:j for (j,v) in enumerate(steps)})
+        return self.tables[q]
+    #f log_prime
+    def log_prime(self, q:int, h:int) -> int:
+        """
+        Return d<q such that g^d=h for g=x^(order/q), by baby-step/giant-step
+        """
+        (m, table) = self.baby_steps(q)
+        g = self.modulus.xpow(self.order // q)
+        giant = self.modulus.pow(self.modulus.inverse(g), m)
+        for i in range((q+m-1)//m):
+            if h in table: return i*m + table[h]
+            h = self.modulus.mul(h, giant)
+            pass
+        raise ValueError("Value is not in the subgroup of order %d"%q)
+    #f log
+    def log(self, h:int) -> int:
+        """
+        Return k (0<=k<order) such that x^k = h mod poly
+        """
+        mod = self.modulus
+        k = 0
+        n = 1
+        for q in prime_factors(self.order):
+            e = 0
+            while (self.order // q**e) % q == 0: e += 1
+            # Find k mod q^e a base-q digit at a time
+            qe = q**e
+            g = mod.xpow(self.order // qe)
+            hq = mod.pow(h, self.order // qe)
+            g_inv = mod.inverse(g)
+            kq = 0
+            for i in range(e):
+                t = mod.mul(hq, mod.pow(g_inv, kq))
+                d = self.log_prime(q, mod.pow(t, q**(e-1-i)))
+                kq += d * q**i
+                pass
+            # Chinese remainder: k mod n, kq mod qe
+            k = k + n * (((kq - k) * pow(n, -1, qe)) % qe)
+            n *= qe
+            pass
+        if mod.xpow(k)!=mod.mod(h):
+            raise ValueError("Value is not in the sequence")
+        return k
+    #f cycles_between
+    def cycles_between(self, seed:int, value:int) -> int:
+        """
+        Return the number of clk_once calls (0 to order-1) that take an LFSR
+        from seed to value; raises ValueError if value is not on the cycle
+        """
+        if seed==0 or value==0:
+            if seed==value: return 0
+            raise ValueError("Value is not in the sequence")
+        h = self.modulus.mul(value, self.modulus.inverse(seed))
+        return self.log(h)
+    pass
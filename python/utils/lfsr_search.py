@@ -0,0 +1,147 @@
+#a Copyright
+#
+#  This file 'lfsr_search.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Search for maximal-length LFSR tap sets, and write them out as a
+# max_lfsr_taps table in the form used in lfsr.py.
+#
+# Tap sets are as in lfsr.py: an N-bit LFSR with k taps has a top tap of N
+# and k-1 further taps, so max_lfsr(N,k) has poly_of_list(taps+[0]). Each
+# candidate is checked with gf2_is_primitive, and the candidates are split
+# by their largest tap across a process pool.
+#
+# Options are ordered by their cost for an LFSR advancing 'steps' bits per
+# clock: the largest number of terms XORed into any next-state bit (the
+# XOR fan-in), then the total number of terms. A table can be written with
+#   write_table("lfsr_table.py", range(2,65), (2,4), steps=8)
+
+#a Imports
+from itertools import combinations
+from typing import Optional, Iterable
+from .gf2 import gf2_is_primitive
+from .lfsr import Lfsr, poly_of_list
+from .parallel_xor import XorEquations
+
+#a Search
+#f taps_with_top_tap
+def taps_with_top_tap(nbits:int, top:int, ntaps:int) -> list[tuple[int,...]]:
+    """
+    Return all primitive tap sets (excluding nbits and 0, largest first)
+    for an nbits LFSR with ntaps taps, whose largest tap below nbits is top
+    """
+    result = []
+    for rest in combinations(range(top-1,0,-1), ntaps-2):
+        taps = (top,) + rest
+        if gf2_is_primitive(poly_of_list(taps+(0,)) | (1<<nbits)):
+            result.append(taps)
+            pass
+        pass
+    return result
+
+#f tap_cost
+def tap_cost(nbits:int, taps:Iterable[int], steps:int=1) -> tuple[int,int]:
+    """
+    Cost of a tap set for an LFSR advancing steps bits per clock; this is
+    (largest XOR fan-in of a next-state bit, total XOR terms)
+    """
+    class L(Lfsr):
+        pass
+    L.nbits = nbits
+    L.poly = poly_of_list(list(taps)+[0])
+    x = XorEquations.of_lfsr(L, steps)
+    sizes = [len(e) for e in x.equations[:nbits]]
+    return (max(sizes), sum(sizes))
+
+#f search_taps
+def search_taps(nbits:int, ntaps:int, steps:int=1, processes:Optional[int]=None, pool=None) -> list[tuple[int,...]]:
+    """
+    Return every maximal-length tap set for an nbits LFSR with ntaps taps,
+    cheapest first; processes is the number of worker processes (None for
+    one per CPU, 1 to search in this process)
+    """
+    if nbits<2 or ntaps<2 or ntaps>nbits: return []
+    # A polynomial with an even number of terms is divisible by x+1
+    if ntaps%2==1: return []
+    tops = list(range(nbits-1, ntaps-2, -1))
+    if processes==1 and pool is None:
+        found = [taps_with_top_tap(nbits, t, ntaps) for t in tops]
+        pass
+    elif pool is not None:
+        found = pool.map(taps_with_top_tap, [nbits]*len(tops), tops, [ntaps]*len(tops))
+        pass
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=processes) as p:
+            found = list(p.map(taps_with_top_tap, [nbits]*len(tops), tops, [ntaps]*len(tops)))
+            pass
+        pass
+    result = [taps for f in found for taps in f]
+    result.sort(key=lambda taps:(tap_cost(nbits, taps, steps), [-t for t in taps]))
+    return result
+
+#a Table output
+#f table_source
+def table_source(options:dict[tuple[int,int],list[tuple[int,...]]], steps:int=1) -> str:
+    """
+    Return Python source for a max_lfsr_taps table (as in lfsr.py) using
+    the cheapest option for each (N, k), with every other valid option
+    listed in a comment
+    """
+    r = []
+    r.append("#v max_lfsr_taps")
+    r.append("# Generated by lfsr_search.write_table; options ordered by cost at %d bits per clock"%steps)
+    r.append("# nbits: {number of taps: taps other than nbits and 0}")
+    r.append("max_lfsr_taps = {")
+    for nbits in sorted(set([n for (n,_) in options])):
+        entries = []
+        for ntaps in sorted([k for (n,k) in options if n==nbits]):
+            taps_list = options[(nbits,ntaps)]
+            if len(taps_list)==0: continue
+            entries.append("%d:[%s]"%(ntaps, ",".join([str(t) for t in taps_list[0]])))
+            if len(taps_list)>1:
+                r.append("    # %d bits %d taps also: %s"%(nbits, ntaps, " ".join(["[%s]"%(",".join([str(t) for t in taps])) for taps in taps_list[1:]])))
+                pass
+            pass
+        if entries:
+            r.append("    %-4s{%s},"%("%d:"%nbits, ", ".join(entries)))
+            pass
+        pass
+    r.append("}")
+    return "\n".join(r)+"\n"
+
+#f write_table
+def write_table(filename:str, widths:Iterable[int], tap_counts:Iterable[int]=(2,4), steps:int=1, processes:Optional[int]=None, max_options:Optional[int]=None) -> None:
+    """
+    Search every width and tap count (sharing one process pool) and write
+    the resulting table to filename; max_options limits the number of
+    options listed for each width and tap count
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    options = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for nbits in widths:
+            for ntaps in tap_counts:
+                found = search_taps(nbits, ntaps, steps=steps, pool=pool)
+                if max_options is not None: found = found[:max_options]
+                options[(nbits,ntaps)] = found
+                pass
+            pass
+        pass
+    with open(filename,"w") as f:
+        f.write(table_source(options, steps))
+        pass
+    pass
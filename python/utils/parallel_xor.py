@@ -0,0 +1,277 @@
+#a Copyright
+#
+#  This file 'parallel_xor.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Generate the XOR equations for a CRC or LFSR that advances several bits
+# per clock, and emit them as a combinatorial CDL module.
+#
+# The serial models (crc.clk_once/do_crc and Lfsr.clk_once) are run
+# symbolically for k steps: each register bit is held as a bitmask of the
+# input bits (state and data) whose XOR it is, which is a row of the GF(2)
+# state-transition matrix for k steps. Common pairs of terms are then shared
+# between the equations (greedy pair extraction, Paar's algorithm),
+# preferring pairs whose inputs are shallow to keep the depth down.
+#
+# For example:
+#   x = XorEquations.of_crc(crc, 8)
+#   x.share_subexpressions()
+#   x.check_against_serial()
+#   open("crc32_x8.cdl","w").write(x.as_cdl("crc32_x8"))
+
+#a Imports
+from random import Random
+from typing import Optional
+
+#a XorEquations
+#c XorEquations
+class XorEquations:
+    """
+    Set of outputs each of which is the XOR of some of the inputs and
+    shared terms; inputs are (name, width) vectors, and terms are numbered
+    with the input bits first, then shared terms in order of creation
+    """
+    inputs  : list[tuple[str,int]]
+    outputs : list[tuple[str,int]]
+    terms   : list[tuple[int,int]]
+    equations : list[set[int]]
+    #f __init__
+    def __init__(self, inputs:list[tuple[str,int]], outputs:list[tuple[str,int]], masks:list[int], serial=None):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.num_inputs = sum([w for (_,w) in inputs])
+        self.terms = []
+        self.depth = [0] * self.num_inputs
+        self.equations = []
+        for m in masks:
+            s = set()
+            i = 0
+            while m:
+                if m&1: s.add(i)
+                m >>= 1
+                i += 1
+                pass
+            self.equations.append(s)
+            pass
+        self.serial = serial
+        pass
+    #f of_crc
+    @classmethod
+    def of_crc(cls, crc_class, data_bits:int):
+        """
+        Equations for a crc class taking data_bits of data per clock, with
+        data[data_bits-1] presented first (as do_crc_bytes does for a byte)
+        """
+        nbits = crc_class.nbits
+        reg = [1<<i for i in range(nbits)]
+        for j in range(data_bits-1,-1,-1):
+            reg[nbits-1] ^= 1<<(nbits+j)
+            reg = cls.symbolic_clk(reg, crc_class.poly)
+            pass
+        def serial(state, data):
+            c = crc_class(state)
+            c.do_crc([(data>>j)&1 for j in range(data_bits-1,-1,-1)])
+            return [c.value]
+        return cls(inputs=[("state",nbits), ("data",data_bits)],
+                   outputs=[("next_state",nbits)],
+                   masks=reg,
+                   serial=serial)
+    #f of_lfsr
+    @classmethod
+    def of_lfsr(cls, lfsr_class, steps:int):
+        """
+        Equations for an LFSR class advancing steps per clock; as well as the
+        next state, out gives the bits shifted out of the top of the
+        register, the first of which is out[steps-1]
+        """
+        nbits = lfsr_class.nbits
+        poly = lfsr_class.poly & ((1<<nbits)-1)
+        reg = [1<<i for i in range(nbits)]
+        out = []
+        for j in range(steps):
+            out.insert(0, reg[nbits-1])
+            reg = cls.symbolic_clk(reg, poly)
+            pass
+        def serial(state):
+            l = lfsr_class(value=state)
+            out = 0
+            for j in range(steps):
+                out = (out<<1) | ((l.value>>(nbits-1))&1)
+                l.clk_once()
+                pass
+            return [l.value, out]
+        return cls(inputs=[("state",nbits)],
+                   outputs=[("next_state",nbits), ("out",steps)],
+                   masks=reg+out,
+                   serial=serial)
+    #f symbolic_clk
+    @staticmethod
+    def symbolic_clk(reg:list[int], poly:int) -> list[int]:
+        """
+        One clk_once of a register whose bits are term masks; poly is without
+        its top bit
+        """
+        top = reg[-1]
+        reg = [0] + reg[:-1]
+        for i in range(len(reg)):
+            if (poly>>i)&1: reg[i] ^= top
+            pass
+        return reg
+    #f share_subexpressions
+    def share_subexpressions(self) -> None:
+        """
+        Repeatedly replace the most common pair of terms (ties broken by the
+        smaller resulting depth) with a new shared term
+        """
+        while True:
+            counts = {}
+            for e in self.equations:
+                t = sorted(e)
+                for i in range(len(t)):
+                    for j in range(i+1,len(t)):
+                        p = (t[i],t[j])
+                        counts[p] = counts.get(p,0) + 1
+                        pass
+                    pass
+                pass
+            best = None
+            best_key = None
+            for (p,n) in counts.items():
+                if n<2: continue
+                key = (n, -max(self.depth[p[0]], self.depth[p[1]]), -p[0], -p[1])
+                if best_key is None or key>best_key:
+                    best = p
+                    best_key = key
+                    pass
+                pass
+            if best is None: break
+            t = self.num_inputs + len(self.terms)
+            self.terms.append(best)
+            self.depth.append(1+max(self.depth[best[0]], self.depth[best[1]]))
+            for e in self.equations:
+                if best[0] in e and best[1] in e:
+                    e.discard(best[0])
+                    e.discard(best[1])
+                    e.add(t)
+                    pass
+                pass
+            pass
+        pass
+    #f num_xors
+    def num_xors(self) -> int:
+        """
+        Number of two-input XOR gates required
+        """
+        return len(self.terms) + sum([max(len(e)-1,0) for e in self.equations])
+    #f max_depth
+    def max_depth(self) -> int:
+        """
+        Depth of two-input XOR gates, with each output a balanced tree
+        """
+        d = 0
+        for e in self.equations:
+            ds = sorted([self.depth[t] for t in e])
+            while len(ds)>1:
+                ds = sorted([1+max(ds[0],ds[1])] + ds[2:])
+                pass
+            if ds: d = max(d, ds[0])
+            pass
+        return d
+    #f term_name
+    def term_name(self, t:int) -> str:
+        if t >= self.num_inputs: return "xor_%d"%(t-self.num_inputs)
+        for (name, width) in self.inputs:
+            if t<width: return "%s[%d]"%(name,t)
+            t -= width
+            pass
+        pass
+    #f evaluate
+    def evaluate(self, *values:int) -> list[int]:
+        """
+        Evaluate the equations for input values (one integer per input),
+        returning one integer per output
+        """
+        bits = []
+        for ((name, width), v) in zip(self.inputs, values):
+            bits += [(v>>i)&1 for i in range(width)]
+            pass
+        for (a,b) in self.terms:
+            bits.append(bits[a]^bits[b])
+            pass
+        results = []
+        n = 0
+        for (name, width) in self.outputs:
+            v = 0
+            for i in range(width):
+                for t in self.equations[n+i]:
+                    v ^= bits[t]<<i
+                    pass
+                pass
+            results.append(v)
+            n += width
+            pass
+        return results
+    #f check_against_serial
+    def check_against_serial(self, trials:int=1000, seed:int=0) -> bool:
+        """
+        Compare evaluate() against the serial model for random inputs
+        """
+        rng = Random(seed)
+        for i in range(trials):
+            values = [rng.getrandbits(w) for (_,w) in self.inputs]
+            if self.evaluate(*values) != self.serial(*values): return False
+            pass
+        return True
+    #f as_cdl
+    def as_cdl(self, module_name:str, documentation:Optional[str]=None) -> str:
+        """
+        Return a combinatorial CDL module for the equations
+        """
+        if documentation is None:
+            documentation = "Parallel XOR equations (%d two-input XORs, depth %d)"%(self.num_xors(), self.max_depth())
+            pass
+        ports = ["input bit[%d] %s"%(w,n) for (n,w) in self.inputs]
+        ports += ["output bit[%d] %s"%(w,n) for (n,w) in self.outputs]
+        r = []
+        r.append("/*a Module */")
+        r.append("module %s( %s )"%(module_name, (",\n"+" "*(len(module_name)+9)).join(ports)))
+        r.append('"""')
+        r.append(documentation)
+        r.append('"""')
+        r.append("{")
+        for i in range(len(self.terms)):
+            r.append("    comb bit xor_%d;"%i)
+            pass
+        r.append("")
+        r.append("    /*b Equations */")
+        r.append("    xor_equations: {")
+        for (i,(a,b)) in enumerate(self.terms):
+            r.append("        xor_%d = %s ^ %s;"%(i, self.term_name(a), self.term_name(b)))
+            pass
+        n = 0
+        for (name, width) in self.outputs:
+            for i in range(width):
+                e = sorted(self.equations[n+i])
+                rhs = " ^ ".join([self.term_name(t) for t in e])
+                if rhs=="": rhs = "0"
+                r.append("        %s[%d] = %s;"%(name, i, rhs))
+                pass
+            n += width
+            pass
+        r.append("    }")
+        r.append("}")
+        return "\n".join(r)+"\n"
+    pass
@@ -0,0 +1,90 @@
+#a Copyright
+#
+#  This file 'bench_crc.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Benchmark of the table-driven CRC (crc.do_crc_bytes) against the
+# bit-serial crc.do_crc, for some of the CRC catalogue; run with the
+# python directory on PYTHONPATH (see 'make crc_bench'):
+#
+#   bench_crc.py [--size BYTES] [--min-speedup N]
+#
+# The bit-serial time is measured on a slice of the buffer and scaled (it
+# is linear in the length). Exits with status 1 if any speedup is below
+# min-speedup.
+
+#a Imports
+import os
+import sys
+import time
+import argparse
+from utils.crc import crc, crc_catalogue, bits_of_n
+
+#a Benchmark
+#f bits_of_bytes
+def bits_of_bytes(data:bytes, lsb_first:bool=False) -> list[int]:
+    """
+    Bits of data as crc.do_crc takes them, each byte MSB first (LSB first
+    for a reflect_in CRC)
+    """
+    bits = []
+    for b in data:
+        byte_bits = bits_of_n(8, b)
+        if not lsb_first: byte_bits.reverse()
+        bits.extend(byte_bits)
+        pass
+    return bits
+
+#f time_of
+def time_of(fn, *args) -> float:
+    t = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t
+
+#f main
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark table-driven CRC against bit-serial")
+    parser.add_argument("--size", type=int, default=1<<18, help="Bytes of data to CRC")
+    parser.add_argument("--serial-size", type=int, default=1<<13, help="Bytes of data to CRC bit-serially")
+    parser.add_argument("--min-speedup", type=float, default=0, help="Fail if any speedup is below this")
+    args = parser.parse_args()
+
+    data = os.urandom(args.size)
+    worst = None
+    for name in ["CRC-32/MPEG-2", "CRC-32/ISCSI", "CRC-16/XMODEM", "CRC-8/SMBUS", "CRC-64/ECMA-182"]:
+        cls = crc_catalogue[name]
+        (serial, table) = (cls(), cls())
+        bits = bits_of_bytes(data[:args.serial_size], cls.reflect_in)
+        t_serial = time_of(serial.do_crc, bits) * args.size / args.serial_size
+        cls().do_crc_bytes(data) # Build the tables (and import numpy) outside the timing
+        t_table = time_of(table.do_crc_bytes, data)
+        check = cls()
+        check.do_crc_bytes(data[:args.serial_size])
+        if check.value!=serial.value:
+            print("%s: table-driven and bit-serial CRCs differ"%name)
+            return 1
+        speedup = t_serial / t_table
+        print("%-16s %8.1f ms bit-serial %8.2f ms table-driven %7.1fx"%(name, t_serial*1000, t_table*1000, speedup))
+        if worst is None or speedup<worst: worst = speedup
+        pass
+    if worst<args.min_speedup:
+        print("Worst speedup %.1fx is below %.1fx"%(worst, args.min_speedup))
+        return 1
+    return 0
+
+#a Toplevel
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#a Copyright
+#
+#  This file 'bench_dprintf.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Benchmark of dprintf_decode against the byte by byte decoder it
+# replaced, for single messages and for buffers of t_dprintf_req_4
+# requests; run with the python directory on PYTHONPATH (see 'make
+# dprintf_bench'):
+#
+#   bench_dprintf.py [--requests N]
+#
+# A single message is timed both with its plan compiled (the format seen
+# before) and with the plan cache empty (a format seen for the first time).
+
+#a Imports
+import sys
+import time
+import argparse
+from random import Random
+from utils import dprintf
+from utils.dprintf import Dprintf, dprintf_decode
+
+#a Reference
+#f decode_bytewise
+def decode_bytewise(data:bytes) -> bytes:
+    """
+    The byte by byte decoder that dprintf_decode replaced
+    """
+    hex = b"0123456789ABCDEF"
+    output = bytearray()
+    data_len = len(data)
+    n = 0
+    while n < data_len:
+        c = data[n]
+        if c==0:
+            n += 1
+            pass
+        elif c<128:
+            output.append(c)
+            n += 1
+            pass
+        elif c<0xc0:
+            nybbles = (c & 0x1f)+1
+            num_data_bytes = (nybbles + 1) // 2
+            for i in range(num_data_bytes):
+                v = data[n+1+i] if n+1+i < data_len else 255
+                if i>0 or (nybbles%2)==0: output.append(hex[(v >> 4) & 0xf])
+                output.append(hex[v & 0xf])
+                pass
+            n += 1+num_data_bytes
+            pass
+        elif c<255:
+            num_data_bytes = ((c&3)+ 1)
+            pad_to = (c>>2) & 15
+            value = 0
+            for i in range(num_data_bytes):
+                value = value*256 + (data[n+1+i] if n+1+i < data_len else 255)
+                pass
+            s = str(value)
+            if pad_to >= 1: output += b" "*(pad_to+1-len(s))
+            output += s.encode()
+            n += 1+num_data_bytes
+            pass
+        else:
+            break
+        pass
+    return bytes(output)
+
+#a Benchmark
+#f time_per_call
+def time_per_call(fn, *args, repeat:int=2000) -> float:
+    t = time.perf_counter()
+    for i in range(repeat): fn(*args)
+    return (time.perf_counter() - t) / repeat
+
+#f decode_cold
+def decode_cold(data:bytes) -> bytes:
+    dprintf._dprintf_plans.clear()
+    return dprintf_decode(data)
+
+#f main
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark dprintf_decode against the byte by byte decoder")
+    parser.add_argument("--requests", type=int, default=900, help="Requests in each buffer")
+    args = parser.parse_args()
+
+    rng = Random(1)
+    formats = ["Hello world", "val=%08x n=%5d", "%3x|%hhu|%hx", "%llx %10u", "addr %04x data %016llx"]
+    messages = [Dprintf.format(0, fmt, *[rng.getrandbits(64) for i in range(fmt.count("%"))]).data for fmt in formats]
+    for (fmt, data) in zip(formats, messages):
+        if dprintf_decode(data)!=decode_bytewise(data):
+            print("%r: dprintf_decode and the byte by byte decoder differ"%fmt)
+            return 1
+        t_bytewise = time_per_call(decode_bytewise, data)
+        t_cold = time_per_call(decode_cold, data) - time_per_call(dprintf._dprintf_plans.clear)
+        t_warm = time_per_call(dprintf_decode, data)
+        print("%-24r %6.2f us byte by byte %6.2f us first seen %5.1fx %6.2f us compiled %5.1fx"%(
+            fmt, t_bytewise*1e6, t_cold*1e6, t_bytewise/t_cold, t_warm*1e6, t_bytewise/t_warm))
+        pass
+
+    requests = [Dprintf.format(0, fmt, *[rng.getrandbits(64) for i in range(fmt.count("%"))]).data.ljust(32, b"\xff") for fmt in formats]
+    for (name, buffer_requests) in [("one format", requests[1:2]*args.requests),
+                                    ("three interleaved", [requests[i%3+1] for i in range(args.requests)])]:
+        buffer = b"".join(buffer_requests)
+        if dprintf_decode(buffer, 32)!=b"".join([decode_bytewise(r) for r in buffer_requests]):
+            print("%s: dprintf_decode and the byte by byte decoder differ"%name)
+            return 1
+        t_bytewise = time_per_call(lambda :[decode_bytewise(r) for r in buffer_requests], repeat=10)
+        t_decode = time_per_call(dprintf_decode, buffer, 32, repeat=10)
+        print("%d requests, %-17s %8.2f ms byte by byte %8.2f ms %5.1fx"%(
+            args.requests, name, t_bytewise*1e3, t_decode*1e3, t_bytewise/t_decode))
+        pass
+    return 0
+
+#a Toplevel
+if __name__=="__main__":
+    sys.exit(main())
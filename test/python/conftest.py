@@ -0,0 +1,42 @@
+#a Copyright
+#
+#  This file 'conftest.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# pytest setup for the pure-Python unit tests (see 'make unit'): the
+# python directory is made importable as the 'regress' package, as
+# cdl_regress does with --package-dir, and the CDL simulation tests are
+# not collected if cdl is not installed (they are run by cdl_regress)
+
+#a Imports
+import os
+import sys
+import types
+import importlib.util
+
+#a Package setup
+if "regress" not in sys.modules:
+    regress = types.ModuleType("regress")
+    regress.__path__ = [os.path.join(os.path.dirname(__file__), "..", "..", "python")]
+    sys.modules["regress"] = regress
+    pass
+
+#v Tests needing a CDL simulation
+collect_ignore = []
+if importlib.util.find_spec("cdl") is None:
+    collect_ignore = ["test_async.py", "test_byte_fifo_multiaccess.py", "test_clock_divider.py",
+                      "test_dbg_dprintf.py", "test_dprintf.py", "test_fifo.py"]
+    pass
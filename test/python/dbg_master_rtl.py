@@ -0,0 +1,503 @@
+#a Copyright
+#
+#  This file 'dbg_master_rtl.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# Register-by-register Python transcriptions of dbg_master_mux.cdl,
+# dbg_master_fifo_sink.cdl (with fifo_sink.cdl) and
+# dbg_master_sram_access.cdl, clocked once per cycle, so that the
+# DbgMaster drivers, models and estimators can be checked without a
+# simulator.
+#
+# Each target computes its combinatorial response with comb(req) and
+# updates its registers with clock(); the mux ORs the target responses
+# as the hardware does. DbgMasterRtl provides the signals DbgMaster
+# drives and samples, and a bfm_wait that clocks the mux and records the
+# request driven in each cycle.
+
+#a Imports
+from collections import deque
+from typing import Callable, Optional
+from regress.utils.dbg_master import t_dbg_master_op, t_dbg_master_resp_type
+from regress.utils.fifo_status import FifoStatus
+
+#v Op and response type values
+op_idle        = t_dbg_master_op["dbg_op_idle"]
+op_start       = t_dbg_master_op["dbg_op_start"]
+op_start_clear = t_dbg_master_op["dbg_op_start_clear"]
+op_data        = t_dbg_master_op["dbg_op_data"]
+op_data_last   = t_dbg_master_op["dbg_op_data_last"]
+resp_idle        = t_dbg_master_resp_type["dbg_resp_idle"]
+resp_running     = t_dbg_master_resp_type["dbg_resp_running"]
+resp_completed   = t_dbg_master_resp_type["dbg_resp_completed"]
+resp_poll_failed = t_dbg_master_resp_type["dbg_resp_poll_failed"]
+resp_errored     = t_dbg_master_resp_type["dbg_resp_errored"]
+idle_request = (op_idle, 0, 0)
+
+#a Targets
+#c DbgMasterIfRtl
+class DbgMasterIfRtl:
+    """
+    The dbg_if_state of a target: busy, completed and the registered
+    script data (up to max_bytes bytes)
+    """
+    #f __init__
+    def __init__(self, max_bytes:int):
+        self.max_bytes = max_bytes
+        self.busy = 0
+        self.completed = 0
+        self.resp = resp_idle
+        self.data = 0
+        self.num_data_valid = 0
+        self.data_is_last = 0
+        pass
+    #f started
+    def started(self, req:tuple) -> bool:
+        return (not self.busy) and (not self.completed) and (req[0] in (op_start, op_start_clear))
+    #f resp_type
+    def resp_type(self) -> int:
+        if self.busy: return resp_running
+        if self.completed: return self.resp
+        return resp_idle
+    #f clock
+    def clock(self, req:tuple, completed:bool, poll_failed:bool, errored:bool, bytes_consumed:int) -> None:
+        if self.busy:
+            if completed:
+                (self.busy, self.completed, self.resp) = (0, 1, resp_completed)
+                if poll_failed: self.resp = resp_poll_failed
+                if errored: self.resp = resp_errored
+                pass
+            if req[0] in (op_data, op_data_last):
+                self.data = req[2] & ((1<<(8*self.max_bytes))-1)
+                self.num_data_valid = min(req[1], self.max_bytes)
+                self.data_is_last = int(req[0]==op_data_last)
+                pass
+            if bytes_consumed>0:
+                (self.num_data_valid, self.data_is_last) = (0, 0)
+                pass
+            pass
+        elif self.completed:
+            self.completed = 0
+            pass
+        elif req[0] in (op_start, op_start_clear):
+            (self.busy, self.num_data_valid, self.data_is_last) = (1, 0, 0)
+            pass
+        pass
+    pass
+
+#c DbgMasterFifoSinkRtl
+class DbgMasterFifoSinkRtl:
+    """
+    dbg_master_fifo_sink and its fifo_sink, popping 256-bit entries from
+    fifo (a deque); pop_rdy and data_valid are functions of no arguments
+    giving the FIFO handshake each cycle
+    """
+    #f __init__
+    def __init__(self, fifo:deque, size:int=515, pop_rdy:Callable[[],int]=lambda :1, data_valid:Callable[[],int]=lambda :1):
+        self.fifo = fifo
+        self.size = size
+        self.pop_rdy = pop_rdy
+        self.data_valid = data_valid
+        self.dbg_if = DbgMasterIfRtl(3)
+        self.fsm_state = "idle"
+        self.error_on_empty = 0
+        self.sink_state = "idle"
+        self.bytes_remaining = 0
+        self.byte_count = 0
+        self.word_count = 0
+        self.data = [0]*8
+        self.resp_valid = 0
+        self.resp_bytes_valid = 0
+        self.resp_data = 0
+        self.resp_empty = 0
+        self.resp_last = 0
+        self.pop_pending = 0
+        pass
+    #f comb
+    def comb(self, req:tuple) -> tuple:
+        """
+        Decode the state, returning (resp_type, bytes_consumed, bytes_valid, data)
+        """
+        dbg_if = self.dbg_if
+        opcode = dbg_if.data & 0xff
+        opcode_class = opcode>>6
+        bytes_required = 1 if opcode_class==0 else 3
+        (action, bytes_consumed, completed, poll_failed, errored) = ("none", 0, 0, 0, 0)
+        if self.fsm_state=="idle":
+            if dbg_if.started(req): action = "start"
+            pass
+        elif self.fsm_state=="wait_for_op":
+            if dbg_if.num_data_valid>=bytes_required:
+                bytes_consumed = bytes_required
+                action = "do_status" if opcode_class==0 else "capture_pop_req"
+                pass
+            elif dbg_if.data_is_last:
+                (action, completed, errored) = ("complete", 1, int(dbg_if.num_data_valid!=0))
+                pass
+            pass
+        elif self.fsm_state=="wait_for_data":
+            if self.resp_valid:
+                action = "take_last" if self.resp_last else "take_next"
+                if self.resp_empty: (action, completed, poll_failed) = ("complete", 1, self.error_on_empty)
+                pass
+            pass
+        elif self.fsm_state=="request_next_data":
+            action = "request_next"
+            pass
+        sink_request = {"do_status":"get_status", "capture_pop_req":"read_data", "request_next":"read_data"}.get(action)
+
+        self.handshake = (self.pop_rdy(), self.data_valid())
+        data_valid = self.handshake[1] and len(self.fifo)>0
+        (sink_action, pop) = ("none", 0)
+        if self.sink_state=="idle":
+            if sink_request=="get_status": sink_action = "read_status"
+            elif sink_request=="read_data":
+                if self.bytes_remaining!=0: sink_action = "read_next"
+                elif len(self.fifo)==0: sink_action = "read_empty"
+                else: sink_action = "pop_request"
+                pass
+            pass
+        elif self.sink_state=="req_pop":
+            pop = 1
+            if self.handshake[0]: sink_action = "pop_capture" if data_valid else "wait_dv"
+            pass
+        elif self.sink_state=="wait_dv":
+            if data_valid: sink_action = "pop_capture"
+            pass
+        elif self.sink_state=="data":
+            sink_action = "read_next"
+            pass
+        elif self.sink_state=="completed":
+            sink_action = "completed"
+            pass
+        self.decoded = (action, bytes_consumed, completed, poll_failed, errored, sink_action, pop)
+        bytes_valid = self.resp_bytes_valid if self.resp_valid else 0
+        data = self.resp_data if self.resp_valid else 0
+        return (dbg_if.resp_type(), bytes_consumed, bytes_valid, data)
+    #f clock
+    def clock(self, req:tuple) -> None:
+        (action, bytes_consumed, completed, poll_failed, errored, sink_action, pop) = self.decoded
+        opcode = self.dbg_if.data & 0xff
+        num_data = (self.dbg_if.data>>8) & 0xffff
+        self.dbg_if.clock(req, completed, poll_failed, errored, bytes_consumed)
+        if action=="start":             self.fsm_state = "wait_for_op"
+        elif action=="do_status":       (self.fsm_state, self.error_on_empty) = ("wait_for_data", 0)
+        elif action=="capture_pop_req": (self.fsm_state, self.error_on_empty) = ("wait_for_data", int(opcode>>6==2))
+        elif action=="request_next":    self.fsm_state = "wait_for_data"
+        elif action=="take_last":       self.fsm_state = "wait_for_op"
+        elif action=="take_next":       self.fsm_state = "request_next_data"
+        elif action=="complete":        self.fsm_state = "idle"
+
+        (self.resp_valid, self.resp_bytes_valid) = (0, 0)
+        if sink_action=="completed":
+            self.sink_state = "idle"
+            pass
+        elif sink_action=="read_status":
+            status = FifoStatus(self.size, len(self.fifo))
+            self.sink_state = "completed"
+            (self.resp_valid, self.resp_bytes_valid, self.resp_data) = (1, 4, status.as_csr32())
+            (self.resp_empty, self.resp_last) = (int(status.empty), 1)
+            pass
+        elif sink_action=="pop_request":
+            self.sink_state = "req_pop"
+            self.bytes_remaining = self.byte_count
+            if action=="capture_pop_req":
+                self.byte_count = ((opcode&63)+1) & 63
+                self.bytes_remaining = self.byte_count
+                self.word_count = (num_data+1) & 0xffff
+                pass
+            pass
+        elif sink_action=="wait_dv":
+            self.sink_state = "wait_dv"
+            pass
+        elif sink_action=="pop_capture":
+            self.sink_state = "data"
+            self.data = [(self.fifo[0]>>(32*i)) & 0xffffffff for i in range(8)]
+            pass
+        elif sink_action=="read_next":
+            self.sink_state = "completed"
+            (self.resp_valid, self.resp_data, self.resp_empty, self.resp_last) = (1, self.data[0], 0, 0)
+            if self.bytes_remaining<=4:
+                self.resp_bytes_valid = self.bytes_remaining & 7
+                if self.word_count<=1: self.resp_last = 1
+                self.bytes_remaining = 0
+                self.word_count = (self.word_count-1) & 0xffff
+                pass
+            else:
+                self.resp_bytes_valid = 4
+                self.bytes_remaining -= 4
+                pass
+            self.data = self.data[1:]+self.data[-1:]
+            pass
+        elif sink_action=="read_empty":
+            self.sink_state = "completed"
+            (self.resp_valid, self.resp_bytes_valid, self.resp_empty, self.resp_last) = (1, 0, 1, 1)
+            pass
+
+        do_pop = 0
+        (pop_rdy, data_valid) = self.handshake
+        if self.pop_pending and data_valid: (self.pop_pending, do_pop) = (0, 1)
+        if pop and pop_rdy:
+            if data_valid: do_pop = 1
+            else: self.pop_pending = 1
+            pass
+        if do_pop: self.fifo.popleft()
+        pass
+    pass
+
+#c DbgMasterSramAccessRtl
+class DbgMasterSramAccessRtl:
+    """
+    dbg_master_sram_access reading words (a list of 65536 64-bit words)
+    through an SRAM that acks every request and has a one-cycle read
+    """
+    #f __init__
+    def __init__(self, words:list):
+        self.words = words
+        self.dbg_if = DbgMasterIfRtl(7)
+        self.fsm_state = "idle"
+        self.count = 0
+        self.byte_count = 0
+        self.word_count = 0
+        self.data = 0
+        self.data_bytes_valid = 0
+        self.sram_valid = 0
+        self.sram_address = 0
+        self.sram_read = 0
+        self.sram_data = 0
+        pass
+    #f comb
+    def comb(self, req:tuple) -> tuple:
+        dbg_if = self.dbg_if
+        (action, bytes_consumed, completed, errored) = ("none", 0, 0, 0)
+        if self.fsm_state=="idle":
+            if dbg_if.started(req): action = "start"
+            pass
+        elif self.fsm_state=="wait_for_op":
+            if dbg_if.num_data_valid>=5:
+                (action, bytes_consumed) = ("do_read", 5)
+                pass
+            elif dbg_if.data_is_last:
+                (action, completed, errored) = ("complete", 1, int(dbg_if.num_data_valid!=0))
+                pass
+            pass
+        elif self.fsm_state=="issuing_read":
+            if self.sram_valid: action = "wait_for_data"
+            pass
+        elif self.fsm_state=="wait_for_data":
+            if self.sram_read: action = "start_data"
+            pass
+        elif self.fsm_state=="read_data":
+            action = "read_data_gap"
+            pass
+        elif self.fsm_state=="read_data_gap":
+            action = "read_next_data"
+            if self.count<4: action = "read_data_gap_last" if self.word_count==0 else "read_data_gap_last_more_words"
+            pass
+        self.decoded = (action, bytes_consumed, completed, errored)
+        return (dbg_if.resp_type(), bytes_consumed, self.data_bytes_valid, self.data & 0xffffffff)
+    #f clock
+    def clock(self, req:tuple) -> None:
+        (action, bytes_consumed, completed, errored) = self.decoded
+        dbg_if_data = self.dbg_if.data
+        opcode = dbg_if_data & 0xff
+        read_data_bytes_valid = 4 if self.count>=4 else (self.count&7)+1
+        sram_read = self.sram_valid
+        sram_data = self.words[self.sram_address & 0xffff] if sram_read else self.sram_data
+        self.dbg_if.clock(req, completed, 0, errored, bytes_consumed)
+        self.data_bytes_valid = 0
+        if action=="start":
+            self.fsm_state = "wait_for_op"
+            pass
+        elif action=="do_read":
+            self.fsm_state = "issuing_read"
+            (self.count, self.byte_count) = (opcode&15, opcode&15)
+            self.word_count = (dbg_if_data>>24) & 0xffff
+            (self.sram_valid, self.sram_address) = (1, (dbg_if_data>>8) & 0xffff)
+            pass
+        elif action=="wait_for_data":
+            self.fsm_state = "wait_for_data"
+            (self.sram_valid, self.sram_address, self.count) = (0, self.sram_address+1, self.byte_count)
+            pass
+        elif action=="start_data":
+            self.fsm_state = "read_data"
+            (self.data_bytes_valid, self.data) = (read_data_bytes_valid, self.sram_data)
+            pass
+        elif action=="read_next_data":
+            self.fsm_state = "read_data"
+            (self.data_bytes_valid, self.count) = (read_data_bytes_valid, self.count-4)
+            self.data = (self.data & ~0xffffffff) | (self.sram_data>>32)
+            pass
+        elif action=="read_data_gap":
+            self.fsm_state = "read_data_gap"
+            pass
+        elif action=="read_data_gap_last_more_words":
+            self.fsm_state = "issuing_read"
+            (self.count, self.word_count, self.sram_valid) = (self.byte_count, self.word_count-1, 1)
+            pass
+        elif action=="read_data_gap_last":
+            self.fsm_state = "wait_for_op"
+            pass
+        elif action=="complete":
+            (self.fsm_state, self.data) = ("idle", 0)
+            pass
+        (self.sram_read, self.sram_data) = (sram_read, sram_data)
+        pass
+    pass
+
+#a Mux
+#c DbgMasterMuxRtl
+class DbgMasterMuxRtl:
+    """
+    dbg_master_mux with targets, a dict of select to target; resp is the
+    registered (resp_type, bytes_consumed, bytes_valid, data) response
+    """
+    #f __init__
+    def __init__(self, targets:dict):
+        self.targets = targets
+        self.fsm_state = "idle"
+        self.ds_req = idle_request
+        self.resp = (resp_idle, 0, 0, 0)
+        self.select = 0
+        pass
+    #f clock
+    def clock(self, req:tuple) -> None:
+        (resp_type, bytes_consumed, bytes_valid, data) = (0, 0, 0, 0)
+        for (select, target) in self.targets.items():
+            target_resp = target.comb(self.ds_req if select==self.select else idle_request)
+            resp_type      |= target_resp[0]
+            bytes_consumed |= target_resp[1]
+            bytes_valid    |= target_resp[2]
+            data           |= target_resp[3]
+            pass
+        for (select, target) in self.targets.items():
+            target.clock(self.ds_req if select==self.select else idle_request)
+            pass
+
+        (op, num_data_valid, req_data) = req
+        last = op==op_data_last
+        us_bytes_valid = num_data_valid if op in (op_data, op_data_last) else 0
+        (action, us_consumed) = ("none", 0)
+        state = self.fsm_state
+        if state=="idle":
+            if op==op_start_clear: action = "select"
+            elif op==op_start:     action = "ds_start"
+            else: return
+            pass
+        elif state=="select":
+            (action, us_consumed) = ("ds_start", 1)
+            if last and us_bytes_valid<2: (action, us_consumed) = ("completed_error", 0)
+            elif us_bytes_valid==0: (action, us_consumed) = ("none", 0)
+            pass
+        elif state=="ds_start":
+            action = "ds_data_gap"
+            pass
+        elif state in ("ds_data_gap", "ds_data", "ds_data_consumed", "ds_data_complete"):
+            if state=="ds_data_gap":
+                action = "ds_data_complete" if (last and us_bytes_valid==0) else "ds_data"
+                pass
+            elif state=="ds_data":
+                if bytes_consumed: (action, us_consumed) = ("ds_data_consumed", bytes_consumed)
+                if last and us_bytes_valid==0: action = "ds_data_complete"
+                pass
+            elif state=="ds_data_consumed":
+                action = "ds_data_gap"
+                pass
+            if resp_type==resp_idle: action = "completed_error"
+            elif resp_type!=resp_running: action = "ds_completed"
+            pass
+        elif state in ("ds_completed", "completed_error"):
+            action = "finish"
+            pass
+        elif state=="finished":
+            action = "idle"
+            pass
+
+        us_resp_type = self.resp[0]
+        ds_data = self.ds_req[2]
+        if action=="idle":               (self.fsm_state, us_resp_type, self.ds_req) = ("idle", resp_idle, (op_idle, 0, ds_data))
+        elif action=="select":           (self.fsm_state, us_resp_type) = ("select", resp_running)
+        elif action=="ds_start":
+            (self.fsm_state, self.select) = ("ds_start", req_data & 7)
+            self.ds_req = (op_start, self.ds_req[1], ds_data)
+            pass
+        elif action=="ds_data_gap":      (self.fsm_state, self.ds_req) = ("ds_data_gap", (op_data, 0, ds_data))
+        elif action=="ds_data":          (self.fsm_state, self.ds_req) = ("ds_data", req)
+        elif action=="ds_data_consumed": (self.fsm_state, self.ds_req) = ("ds_data_consumed", (op_data, 0, ds_data))
+        elif action=="ds_data_complete": (self.fsm_state, self.ds_req) = ("ds_data_complete", (op_data_last, 0, ds_data))
+        elif action=="ds_completed":     (self.fsm_state, self.ds_req, us_resp_type) = ("ds_completed", (op_idle, 0, ds_data), resp_type)
+        elif action=="completed_error":  (self.fsm_state, self.ds_req, us_resp_type) = ("completed_error", (op_idle, 0, ds_data), resp_errored)
+        elif action=="finish":           (self.fsm_state, self.ds_req) = ("finished", (op_idle, 0, ds_data))
+        self.resp = (us_resp_type, us_consumed, bytes_valid, data)
+        pass
+    pass
+
+#a DbgMasterRtl
+#c DbgMasterRtlSignal
+class DbgMasterRtlSignal:
+    """
+    A signal a DbgMaster drives or samples
+    """
+    def __init__(self):
+        self.current = 0
+        pass
+    def drive(self, value:int) -> None:
+        self.current = value
+        pass
+    def value(self) -> int:
+        return self.current
+    pass
+
+#c DbgMasterRtl
+class DbgMasterRtl:
+    """
+    A DbgMasterMuxRtl with a FIFO sink (select 1) and an SRAM access
+    (select 2), and the signals for DbgMaster(rtl, "req", "resp")
+
+    bfm_wait clocks the mux, recording the (op, num_data_valid, data)
+    request of each cycle in trace, then calls on_clock (if set) with the
+    cycle number
+    """
+    #f __init__
+    def __init__(self, fifo_entries:list=[], fifo_size:int=515, words:Optional[list]=None, **kwargs):
+        self.fifo = deque(fifo_entries)
+        self.words = words if words is not None else [0]*65536
+        self.fifo_sink = DbgMasterFifoSinkRtl(self.fifo, fifo_size, **kwargs)
+        self.sram_access = DbgMasterSramAccessRtl(self.words)
+        self.mux = DbgMasterMuxRtl({1:self.fifo_sink, 2:self.sram_access})
+        for name in ["op", "num_data_valid", "data"]:
+            setattr(self, "req__"+name, DbgMasterRtlSignal())
+            pass
+        for name in ["resp_type", "bytes_consumed", "bytes_valid", "data"]:
+            setattr(self, "resp__"+name, DbgMasterRtlSignal())
+            pass
+        self.trace = []
+        self.cycles = 0
+        self.on_clock = None
+        pass
+    #f bfm_wait
+    def bfm_wait(self, n:int) -> None:
+        for i in range(n):
+            req = (self.req__op.current, self.req__num_data_valid.current, self.req__data.current)
+            self.trace.append(req)
+            self.mux.clock(req)
+            (self.resp__resp_type.current, self.resp__bytes_consumed.current,
+             self.resp__bytes_valid.current, self.resp__data.current) = self.mux.resp
+            self.cycles += 1
+            if self.on_clock is not None: self.on_clock(self.cycles)
+            pass
+        pass
+    pass
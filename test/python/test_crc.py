@@ -0,0 +1,270 @@
+#a Copyright
+#
+#  This file 'test_crc.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import tempfile
+import unittest
+import zlib
+from random import Random
+from regress.utils import crc as crc_module
+from regress.utils.crc import crc, crc_bytes, bits_of_n, crc_catalogue, Crc32_IsoHdlc, Crc32_Iscsi, Crc16_Modbus
+
+#a Useful functions
+#f bits_of_bytes
+def bits_of_bytes(data:bytes, lsb_first:bool=False) -> list[int]:
+    bits = []
+    for b in data:
+        byte_bits = bits_of_n(8, b)
+        if not lsb_first: byte_bits.reverse()
+        bits.extend(byte_bits)
+        pass
+    return bits
+
+#f crc_class
+def crc_class(poly:int, nbits:int, init:int=0, reflect_in:bool=False):
+    class c(crc): pass
+    (c.poly, c.nbits, c.init, c.reflect_in) = (poly, nbits, init, reflect_in)
+    return c
+
+#a Tests
+#c CrcBytesTest
+class CrcBytesTest(unittest.TestCase):
+    """
+    The table-driven CRC against the bit-serial crc.do_crc
+    """
+    polys = [(0x04C11DB7,32), (0x1EDC6F41,32), (0x1021,16), (0x07,8), (0x3,5), (0x80F,12),
+             (0x42F0E1EBA9EA3693,64), (0x1B,64), ((1<<70)|0x3,72)]
+    def check(self, data:bytes, poly:int, nbits:int, init:int, reflect_in:bool=False) -> None:
+        cls = crc_class(poly, nbits, init, reflect_in)
+        serial = cls()
+        serial.do_crc(bits_of_bytes(data, reflect_in))
+        table = cls()
+        table.do_crc_bytes(data)
+        self.assertEqual(table.value, serial.value, "poly %x nbits %d length %d reflect_in %s"%(poly, nbits, len(data), reflect_in))
+        pass
+    def test_lengths(self) -> None:
+        rng = Random(1)
+        for (poly, nbits) in self.polys:
+            for length in [0, 1, 7, 8, 9, 31, 100]:
+                data = bytes(rng.randrange(256) for i in range(length))
+                self.check(data, poly, nbits, rng.getrandbits(nbits))
+                self.check(data, poly, nbits, rng.getrandbits(nbits), reflect_in=True)
+                pass
+            pass
+        pass
+    def test_block_parallel(self) -> None:
+        """
+        Buffers over crc_block_threshold (if numpy is present)
+        """
+        rng = Random(2)
+        data = bytes(rng.randrange(256) for i in range(crc_module.crc_block_threshold+1001))
+        for (poly, nbits) in self.polys:
+            self.check(data, poly, nbits, rng.getrandbits(nbits))
+            pass
+        self.check(data, 0x1EDC6F41, 32, 0xffffffff, reflect_in=True)
+        pass
+    def test_block_parallel_serial(self) -> None:
+        """
+        Block-parallel CRC against the slice-by-8 path
+        """
+        if crc_module._numpy() is None: self.skipTest("numpy not installed")
+        rng = Random(3)
+        threshold = crc_module.crc_block_threshold
+        try:
+            crc_module.crc_block_threshold = 1<<62
+            for length in [16, 1000, 4099, 65536]:
+                data = bytes(rng.randrange(256) for i in range(length))
+                for (poly, nbits) in self.polys:
+                    if nbits<8 or nbits>64: continue
+                    value = rng.getrandbits(nbits)
+                    self.assertEqual(crc_module.crc_bytes_blocks(value, data, poly, nbits),
+                                     crc_bytes(value, data, poly, nbits))
+                    pass
+                pass
+            pass
+        finally:
+            crc_module.crc_block_threshold = threshold
+            pass
+        pass
+    pass
+
+#c CrcStreamTest
+class CrcStreamTest(unittest.TestCase):
+    """
+    Streaming update, combine and file CRCs against a single do_crc_bytes
+    """
+    def test_update_chunks(self) -> None:
+        rng = Random(4)
+        data = bytes(rng.randrange(256) for i in range(3000))
+        for cls in [crc, crc_class(0x1021,16,0xffff), crc_class(0x80F,12,0x5)]:
+            whole = cls()
+            whole.do_crc_bytes(data)
+            c = cls()
+            i = 0
+            while i<len(data):
+                n = rng.randrange(0, 300)
+                self.assertIs(c.update(data[i:i+n]), c)
+                i += n
+                pass
+            self.assertEqual(c.value, whole.value)
+            pass
+        pass
+    def test_combine(self) -> None:
+        rng = Random(5)
+        for cls in [crc, crc_class(0x1021,16,0xffff), crc_class(0x42F0E1EBA9EA3693,64,12345)]:
+            for (len_a, len_b) in [(0,0), (0,10), (10,0), (1,1), (100,37), (17,1000)]:
+                a = bytes(rng.randrange(256) for i in range(len_a))
+                b = bytes(rng.randrange(256) for i in range(len_b))
+                self.assertEqual(cls.combine(cls().update(a).value, cls().update(b).value, len_b),
+                                 cls().update(a+b).value)
+                pass
+            pass
+        pass
+    def test_of_file(self) -> None:
+        rng = Random(6)
+        data = bytes(rng.randrange(256) for i in range(10000))
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            for cls in [crc, crc_class(0x1021,16,0xffff)]:
+                expected = cls().update(data).value
+                self.assertEqual(cls.of_file(f.name).value, expected)
+                self.assertEqual(cls.of_file(f.name, chunk_size=999).value, expected)
+                self.assertEqual(cls.of_file(f.name, processes=2, chunk_size=3000).value, expected)
+                pass
+            pass
+        pass
+    pass
+
+#c CrcCatalogueTest
+class CrcCatalogueTest(unittest.TestCase):
+    """
+    The CRC catalogue models against their check values and zlib
+    """
+    def test_check_values(self) -> None:
+        for (name, cls) in crc_catalogue.items():
+            self.assertEqual(cls().update(b"123456789").result(), cls.check, name)
+            self.assertTrue(cls.validate(), name)
+            pass
+        pass
+    def test_bit_serial(self) -> None:
+        """
+        do_crc with the bits of each byte LSB first for reflect_in models
+        """
+        for (name, cls) in crc_catalogue.items():
+            c = cls()
+            c.do_crc(bits_of_bytes(b"123456789", cls.reflect_in))
+            self.assertEqual(c.result(), cls.check, name)
+            pass
+        pass
+    def test_zlib(self) -> None:
+        rng = Random(7)
+        for length in [0, 1, 100, 5000, 70000]:
+            data = bytes(rng.randrange(256) for i in range(length))
+            self.assertEqual(Crc32_IsoHdlc().update(data).result(), zlib.crc32(data))
+            pass
+        pass
+    def test_of_file_reflected(self) -> None:
+        """
+        Process-pool file CRCs of reflected models against the serial path
+        (and zlib for CRC-32/ISO-HDLC)
+        """
+        rng = Random(8)
+        data = bytes(rng.randrange(256) for i in range(40000))
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            for cls in [Crc32_IsoHdlc, Crc32_Iscsi, Crc16_Modbus]:
+                serial = cls.of_file(f.name).result()
+                self.assertEqual(cls.of_file(f.name, processes=4, chunk_size=7000).result(), serial, cls.name)
+                self.assertEqual(cls().update(data).result(), serial, cls.name)
+                pass
+            self.assertEqual(Crc32_IsoHdlc.of_file(f.name, processes=4, chunk_size=7000).result(), zlib.crc32(data))
+            pass
+        pass
+    pass
+
+#c CrcClkTest
+class CrcClkTest(unittest.TestCase):
+    """
+    crc.clk against repeated clk_once
+    """
+    def test_clk(self) -> None:
+        rng = Random(9)
+        for cls in [crc, crc_class(0x1021,16), crc_class(0x3,5), crc_class(0x42F0E1EBA9EA3693,64)]:
+            c = cls(rng.getrandbits(cls.nbits))
+            for n in [0, 1, 2, 7, 64, 100, 333]:
+                start = c.value
+                for i in range(n): c.clk_once()
+                stepped = c.value
+                c.value = start
+                c.clk(n)
+                self.assertEqual(c.value, stepped)
+                c.clk(-n)
+                self.assertEqual(c.value, start)
+                c.value = stepped
+                pass
+            pass
+        pass
+    pass
+
+#c CrcBatchTest
+class CrcBatchTest(unittest.TestCase):
+    """
+    crc.batch against the result of each packet on its own
+    """
+    def setUp(self) -> None:
+        if crc_module._numpy() is None: self.skipTest("numpy not installed")
+        pass
+    def test_list(self) -> None:
+        rng = Random(10)
+        packets = [bytes(rng.randrange(256) for i in range(rng.randrange(0, 100))) for j in range(50)]
+        for (name, cls) in list(crc_catalogue.items()) + [("5-bit", crc_class(0x3,5,0x1f))]:
+            expected = [cls().update(p).result() for p in packets]
+            self.assertEqual([int(r) for r in cls.batch(packets)], expected, name)
+            pass
+        pass
+    def test_array(self) -> None:
+        np = crc_module._numpy()
+        rng = Random(11)
+        data = np.array([[rng.randrange(256) for i in range(64)] for j in range(20)], dtype=np.uint8)
+        lengths = [rng.randrange(0, 65) for j in range(20)]
+        for cls in [Crc32_IsoHdlc, Crc16_Modbus, crc_catalogue["CRC-64/XZ"]]:
+            expected = [cls().update(bytes(data[j,:lengths[j]])).result() for j in range(20)]
+            self.assertEqual([int(r) for r in cls.batch(data, lengths)], expected, cls.name)
+            expected = [cls().update(bytes(data[j])).result() for j in range(20)]
+            self.assertEqual([int(r) for r in cls.batch(data)], expected, cls.name)
+            pass
+        pass
+    def test_empty(self) -> None:
+        np = crc_module._numpy()
+        for cls in [Crc32_IsoHdlc, crc_class(0x3,5,0x1f), crc_catalogue["CRC-64/XZ"]]:
+            dtype = np.uint32 if cls.nbits<=32 else np.uint64
+            for packets in [[], np.zeros((0, 16), dtype=np.uint8), np.zeros(0, dtype=np.uint8)]:
+                r = cls.batch(packets)
+                self.assertEqual((r.shape, r.dtype), ((0,), dtype))
+                pass
+            self.assertEqual(cls.batch(np.zeros((0, 16), dtype=np.uint8), []).shape, (0,))
+            self.assertEqual([int(r) for r in cls.batch([b""]*3)], [cls().result()]*3)
+            pass
+        pass
+    def test_too_wide(self) -> None:
+        with self.assertRaises(ValueError):
+            crc_class((1<<70)|0x3, 72).batch([b"123"])
+            pass
+        pass
+    pass
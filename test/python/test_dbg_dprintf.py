@@ -19,6 +19,8 @@
 from random import Random
 from queue import Queue
 from regress.utils import t_dprintf_req_4, t_dprintf_byte, Dprintf, t_dbg_master_request, t_dbg_master_response, DprintfBus, SramAccessBus, SramAccessRead, SramAccessWrite, DbgMaster, DbgMasterMuxScript, DbgMasterSramScript, DbgMasterFifoScript, FifoStatus, t_sram_access_req, t_sram_access_resp
+from regress.utils import DbgFifoDrain, DbgMasterBufferSink
+from regress.utils import DbgFifoModel, DbgSramModel, DbgMasterFifoSinkModel, DbgMasterSramAccessModel, DbgMasterMuxModel, DbgMasterModelCheck
 from cdl.utils   import csr
 from cdl.sim     import ThExecFile, LogEventParser
 from cdl.sim     import HardwareThDut
@@ -44,6 +46,29 @@ class SramScript(DbgMasterMuxScript):
         pass
     pass
 
+#a Model of the test harness
+#c DbgDprintfModel
+class DbgDprintfModel(DbgMasterMuxModel):
+    """
+    Model of tb_dbg_dprintf_fifo: the FIFO sink on select 1 and the SRAM
+    access on select 2, with every SRAM access pushing a dprintf to the FIFO
+    """
+    def __init__(self):
+        self.fifo = DbgFifoModel(515)
+        self.sram = DbgSramModel(on_access=self.sram_dprintf)
+        super().__init__({FifoScript.select: DbgMasterFifoSinkModel(self.fifo),
+                          SramScript.select: DbgMasterSramAccessModel(self.sram)})
+        pass
+    def sram_dprintf(self, read_not_write:bool, address:int, write_data:int) -> None:
+        if read_not_write:
+            self.fifo.push([0x52643a2083, address, -1, -1])
+            pass
+        else:
+            self.fifo.push([0x57723a2083, (address<<48) | 0x203d2087, write_data<<32, -1])
+            pass
+        pass
+    pass
+
 #a DprintfTest
 #c DprintfTest_Base
 class DprintfTest_Base(ThExecFile):
@@ -305,6 +330,69 @@ class SramTest_0(DprintfTest_Base):
         ]
     pass
 
+#c DprintfTest_ModelCheck
+class DprintfTest_ModelCheck(DprintfTest_Base):
+    """
+    The scripts of DprintfTest_0 then DprintfTest_1, each also run on a
+    DbgDprintfModel kept in step with the requests driven; the test fails
+    if the model and the hardware differ for any script
+    """
+    data_and_scripts_to_run = DprintfTest_0.data_and_scripts_to_run + DprintfTest_1.data_and_scripts_to_run
+    #f drive_dprintf_req
+    def drive_dprintf_req(self, d):
+        super().drive_dprintf_req(d)
+        self.model.fifo.push_dprintf(d)
+        pass
+    #f perform_sram_req
+    def perform_sram_req(self, s):
+        self.model.sram.access(s)
+        super().perform_sram_req(s)
+        pass
+    #f run__init
+    def run__init(self) -> None:
+        super().run__init()
+        self.model = DbgDprintfModel()
+        self.dbg_master = DbgMasterModelCheck(self.dbg_master, self.model)
+        pass
+    #f run__finalize
+    def run__finalize(self) -> None:
+        for m in self.dbg_master.mismatches: self.verbose.error(m)
+        self.compare_expected("Scripts where the model differs from the hardware", 0, len(self.dbg_master.mismatches))
+        super().run__finalize()
+        pass
+    pass
+
+#c DprintfTest_Drain
+class DprintfTest_Drain(DprintfTest_Base):
+    """
+    Dprintf a number of requests, then drain the FIFO with a DbgFifoDrain
+    and check the first 16 bytes of every request arrive in order
+    """
+    random_seed = "drain"
+    dprintfs = [Dprintf(0x0, b"drain entry %02d"%i) for i in range(40)]
+    #f run
+    def run(self) -> None:
+        self.bfm_wait(4)
+        self.die_event.reset()
+        self.dprintf.invalid()
+        self.bfm_wait(4)
+        for d in self.dprintfs:
+            self.drive_dprintf_req(d)
+            pass
+        expected = b"".join([d.data_list[0].to_bytes(8,"little") + d.data_list[1].to_bytes(8,"little") for d in self.dprintfs])
+        buffer = bytearray(len(expected))
+        sink = DbgMasterBufferSink(buffer)
+        drain = DbgFifoDrain(self.dbg_master, self.bfm_wait_toggling_rdy_dv, sink, select=FifoScript.select, entry_bits=128)
+        drain.run(20*1000, until_empty=True)
+        self.verbose.info(drain.report())
+        self.compare_expected("Bytes drained", len(expected), sink.length)
+        self.compare_expected("Data drained", expected.hex(), bytes(buffer).hex())
+        self.bfm_wait_until_test_done(100)
+        self.die_event.fire()
+        self.bfm_wait(10)
+        pass
+    pass
+
 #a Hardware and test instantiation
 #c DbgDprintfHardware
 class DbgDprintfHardware(HardwareThDut):
@@ -331,6 +419,8 @@ class TestDbgDprintf(TestCase):
     hw = DbgDprintfHardware
     _tests = {"0": (DprintfTest_0, 2*1000, {}),
               "1": (DprintfTest_1, 2*1000, {}),
+              "drain": (DprintfTest_Drain, 30*1000, {}),
+              "model_check": (DprintfTest_ModelCheck, 4*1000, {}),
               "smoke": (DprintfTest_0, 2*1000, {}),
     }
 
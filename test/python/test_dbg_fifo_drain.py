@@ -0,0 +1,159 @@
+#a Copyright
+#
+#  This file 'test_dbg_fifo_drain.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# DbgFifoDrain draining DbgMasterRtl, the cycle transcription of the CDL,
+# while entries are pushed at various rates; as DprintfTest_Drain, every
+# entry must arrive in order with none lost
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.dbg_master import DbgMaster, DbgMasterBufferSink
+from regress.utils.dbg_master_cost import DbgMasterCostEstimator
+from regress.utils.dbg_fifo_drain import DbgFifoDrain
+from dbg_master_rtl import DbgMasterRtl
+
+#a Useful functions
+#f entry_data
+def entry_data(entries:list, entry_bits:int) -> bytes:
+    """
+    The bytes a drain of entry_bits reads from the entries
+    """
+    return b"".join([e.to_bytes(32, "little")[:entry_bits//8] for e in entries])
+
+#a Tests
+#c DbgFifoDrainTest
+class DbgFifoDrainTest(unittest.TestCase):
+    """
+    DbgFifoDrain against DbgMasterRtl
+    """
+    def drain(self, target:DbgMasterRtl, size:int, **kwargs) -> tuple:
+        """
+        A drain of 128-bit entries from select 1 of the target, into a
+        buffer of size bytes
+        """
+        buffer = bytearray(size)
+        sink = DbgMasterBufferSink(buffer)
+        drain = DbgFifoDrain(DbgMaster(target, "req", "resp"), target.bfm_wait, sink, select=1, entry_bits=128, **kwargs)
+        return (drain, sink, buffer)
+    def test_until_empty(self) -> None:
+        """
+        A filled FIFO drained with the handshake toggling, as
+        DprintfTest_Drain
+        """
+        rng = Random(1)
+        entries = [rng.getrandbits(256) for i in range(40)]
+        target = DbgMasterRtl(entries, pop_rdy=lambda :rng.randrange(2), data_valid=lambda :rng.randrange(2))
+        (drain, sink, buffer) = self.drain(target, 40*16)
+        self.assertEqual(drain.run(20*1000, until_empty=True), 40)
+        self.assertEqual(sink.length, 40*16)
+        self.assertEqual(bytes(buffer).hex(), entry_data(entries, 128).hex())
+        self.assertEqual(len(target.fifo), 0)
+        self.assertEqual(drain.entries, 0)
+        self.assertLess(drain.cycles, 20*1000)
+        pass
+    def test_rates(self) -> None:
+        """
+        Entries pushed in random bursts at average rates from well below
+        to above what the drain sustains, without overflowing the FIFO
+        """
+        for (seed, rate) in enumerate([0.001, 0.01, 0.05, 0.2, 1.0]):
+            rng = Random(seed)
+            target = DbgMasterRtl([])
+            pushed = []
+            def push(cycle:int) -> None:
+                if producing and rng.random()<rate:
+                    for i in range(rng.randrange(1, 4)):
+                        if len(target.fifo)>=515: break
+                        pushed.append(rng.getrandbits(256))
+                        target.fifo.append(pushed[-1])
+                        pass
+                    pass
+                pass
+            target.on_clock = push
+            (drain, sink, buffer) = self.drain(target, 20*1000*16)
+            producing = True
+            drain.run(10*1000)
+            producing = False
+            drain.run(10*1000, until_empty=True)
+            self.assertGreater(len(pushed), 0)
+            self.assertEqual(drain.entries_read, len(pushed), rate)
+            self.assertEqual(bytes(buffer[:sink.length]).hex(), entry_data(pushed, 128).hex(), rate)
+            self.assertEqual(len(target.fifo), 0)
+            self.assertIn(str(drain.entries_read), drain.report())
+            self.assertEqual(drain.queue.scripts_run, drain.scripts)
+            self.assertIn("%d scripts"%drain.scripts, drain.queue.report())
+            pass
+        pass
+    def test_entry_bits(self) -> None:
+        """
+        Entries of every width are read with the responses the FIFO script
+        returns for them
+        """
+        for entry_bits in [8, 24, 32, 64, 72, 200, 256]:
+            rng = Random(entry_bits)
+            entries = [rng.getrandbits(256) for i in range(20)]
+            target = DbgMasterRtl(entries)
+            buffer = bytearray(20*32)
+            sink = DbgMasterBufferSink(buffer)
+            drain = DbgFifoDrain(DbgMaster(target, "req", "resp"), target.bfm_wait, sink, select=1, entry_bits=entry_bits)
+            self.assertEqual(drain.run(20*1000, until_empty=True), 20, entry_bits)
+            self.assertEqual(bytes(buffer[:sink.length]).hex(), entry_data(entries, entry_bits).hex(), entry_bits)
+            pass
+        pass
+    def test_fill_rate(self) -> None:
+        """
+        A steady producer is measured, and the drain waits for bursts of
+        about target_burst entries rather than polling
+        """
+        target = DbgMasterRtl([])
+        def push(cycle:int) -> None:
+            if cycle%10==0: target.fifo.append(cycle)
+            pass
+        target.on_clock = push
+        (drain, sink, buffer) = self.drain(target, 4000*16, target_burst=32)
+        drain.run(20*1000)
+        self.assertAlmostEqual(drain.fill_rate, 0.1, delta=0.02)
+        self.assertLess(drain.scripts, 2000/16)
+        self.assertLess(drain.empty_polls, 10)
+        self.assertEqual(bytes(buffer[:sink.length]), entry_data(range(10, 10*drain.entries_read+1, 10), 128))
+        pass
+    def test_best_burst(self) -> None:
+        """
+        The default burst is the smallest power of two within efficiency
+        of the longest burst
+        """
+        target = DbgMasterRtl([])
+        (drain, sink, buffer) = self.drain(target, 0)
+        estimator = DbgMasterCostEstimator(start_gap=0)
+        rate = lambda n:estimator.estimate(drain.script(n)).bytes_per_cycle()
+        burst = drain.target_burst
+        self.assertGreaterEqual(rate(burst), drain.efficiency*rate(drain.max_burst))
+        self.assertLess(rate(burst//2), drain.efficiency*rate(drain.max_burst))
+        self.assertEqual(self.drain(target, 0, max_burst=4)[0].target_burst, 4)
+        pass
+    def test_errors(self) -> None:
+        """
+        A script that does not complete ok stops the drain
+        """
+        target = DbgMasterRtl([1, 2])
+        buffer = bytearray(64)
+        drain = DbgFifoDrain(DbgMaster(target, "req", "resp"), target.bfm_wait, DbgMasterBufferSink(buffer), select=3)
+        with self.assertRaises(RuntimeError): drain.poll()
+        pass
+    pass
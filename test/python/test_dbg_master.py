@@ -0,0 +1,404 @@
+#a Copyright
+#
+#  This file 'test_dbg_master.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# DbgMaster feeds scripts from a cursor and yields responses to sinks; these
+# tests check that it drives exactly the request sequence, and returns the
+# same results, as the original byte-popping invoke_script_bytes (transcribed
+# here as invoke_script_bytes_reference), both against a target responding
+# at random and against DbgMasterRtl
+
+#a Imports
+import io
+import os
+import sys
+import subprocess
+import unittest
+from random import Random
+from regress.utils.dbg_master import DbgMaster, DbgMasterQueue, DbgMasterBufferSink, DbgMasterFileSink
+from regress.utils.dbg_master import DbgMasterMuxScript, DbgMasterFifoScript, DbgMasterSramScript
+from regress.utils.dbg_master import t_dbg_master_op, t_dbg_master_resp_type
+from regress.utils.fifo_status import FifoStatus
+from dbg_master_rtl import DbgMasterRtl, DbgMasterRtlSignal
+
+#a Reference
+#f invoke_script_bytes_reference
+def invoke_script_bytes_reference(self:DbgMaster, bytes_to_run:bytes, bfm_wait, inter_data_idle, cycles_to_run:int=1000):
+    """
+    The original DbgMaster.invoke_script_bytes
+    """
+    bytes_to_run = bytearray(bytes_to_run)
+    if (self.resp_type.value() != t_dbg_master_resp_type["dbg_resp_idle"]):
+        return ("Not idle", [])
+    if self.resp_data.value() != 0:
+        return("Data not zero when idle",[])
+    if self.resp_bytes_valid.value() != 0:
+        return("bytes valid not zero when idle",[])
+
+    self.req_num_data_valid.drive(0)
+    self.req_op.drive(t_dbg_master_op["dbg_op_start_clear"] )
+    bfm_wait(1)
+    self.req_op.drive(t_dbg_master_op["dbg_op_idle"] )
+    bfm_wait(1)
+    completion = "ok"
+    data_returned = []
+    do_idle_cnt = inter_data_idle()
+    while cycles_to_run > 0:
+        bv = self.resp_bytes_valid.value()
+        data = self.resp_data.value()
+        if bv == 1: data_returned.append(data&0xff)
+        if bv == 2: data_returned.append(data&0xffff)
+        if bv == 3: data_returned.append(data&0xffffff)
+        if bv == 4: data_returned.append(data&0xffffffff)
+        if self.resp_type.value() != t_dbg_master_resp_type["dbg_resp_running"]:
+            break
+        bytes_consumed = self.resp_bytes_consumed.value()
+        for i in range(bytes_consumed):
+            if len(bytes_to_run)>0:
+                bytes_to_run.pop(0)
+                pass
+            do_idle_cnt = inter_data_idle()
+            pass
+
+        if do_idle_cnt > 0:
+            self.req_op.drive(t_dbg_master_op["dbg_op_idle"] )
+            self.req_data.drive(0xdeadbeef)
+            self.req_num_data_valid.drive(do_idle_cnt&7)
+            bfm_wait(1)
+            do_idle_cnt -= 1
+            continue
+            pass
+
+        n = len(bytes_to_run)
+        self.req_op.drive(t_dbg_master_op["dbg_op_data"] )
+        if n<=6:
+            self.req_op.drive(t_dbg_master_op["dbg_op_data_last"] )
+            pass
+        else:
+            n = 6
+            pass
+        data = 0
+        for i in range(n):
+            data = data | (bytes_to_run[i] << (8*i))
+            pass
+        self.req_data.drive(data)
+        self.req_num_data_valid.drive(n)
+        bfm_wait(1)
+        cycles_to_run -= 1
+        pass
+    self.req_num_data_valid.drive(0)
+    self.req_op.drive(t_dbg_master_op["dbg_op_idle"] )
+    completion = "unexpected"
+    if self.resp_type.value() == t_dbg_master_resp_type["dbg_resp_completed"]:
+        completion = "ok"
+        pass
+    if self.resp_type.value() == t_dbg_master_resp_type["dbg_resp_errored"]:
+        completion = "errored"
+        pass
+    if self.resp_type.value() == t_dbg_master_resp_type["dbg_resp_poll_failed"]:
+        completion = "poll_failed"
+        pass
+    return (completion, data_returned)
+
+#a Random target
+#c DbgMasterRandomTarget
+class DbgMasterRandomTarget:
+    """
+    A target consuming any number of the bytes offered (never in
+    back-to-back cycles), presenting random response data and completing
+    at random once the last data is offered
+    """
+    #f __init__
+    def __init__(self, seed:int):
+        self.rng = Random(seed)
+        for name in ["op", "num_data_valid", "data"]:
+            setattr(self, "req__"+name, DbgMasterRtlSignal())
+            pass
+        for name in ["resp_type", "bytes_consumed", "bytes_valid", "data"]:
+            setattr(self, "resp__"+name, DbgMasterRtlSignal())
+            pass
+        self.trace = []
+        pass
+    #f bfm_wait
+    def bfm_wait(self, n:int) -> None:
+        running = t_dbg_master_resp_type["dbg_resp_running"]
+        for i in range(n):
+            req = (self.req__op.current, self.req__num_data_valid.current, self.req__data.current)
+            self.trace.append(req)
+            (resp_type, bytes_consumed) = (self.resp__resp_type.current, 0)
+            if req[0]==t_dbg_master_op["dbg_op_start_clear"]:
+                resp_type = running
+                pass
+            elif resp_type==running:
+                if (req[0] in (t_dbg_master_op["dbg_op_data"], t_dbg_master_op["dbg_op_data_last"]) and
+                    self.resp__bytes_consumed.current==0 and req[1]>0 and self.rng.random()<0.7):
+                    bytes_consumed = self.rng.randrange(1, req[1]+1)
+                    pass
+                if req[0]==t_dbg_master_op["dbg_op_data_last"] and self.rng.random()<0.05:
+                    resp_type = self.rng.randrange(2, 5)
+                    pass
+                pass
+            self.resp__resp_type.current = resp_type
+            self.resp__bytes_consumed.current = bytes_consumed
+            self.resp__bytes_valid.current = self.rng.randrange(8)
+            self.resp__data.current = self.rng.getrandbits(32)
+            pass
+        pass
+    pass
+
+#a Useful functions
+#f random_idles
+def random_idles(seed:int, choices:list):
+    """
+    An inter_data_idle function returning a seeded random choice each call
+    """
+    rng = Random(seed)
+    return lambda : rng.choice(choices)
+
+#f random_script
+def random_script(rng:Random) -> bytes:
+    """
+    A random FIFO or SRAM script, sometimes truncated
+    """
+    if rng.randrange(2)==0:
+        ops = []
+        for i in range(rng.randrange(1, 6)):
+            ops.append(rng.choice(["status",
+                                   ("read", 8*rng.randrange(1, 33), rng.randrange(6)),
+                                   ("read_err", 8*rng.randrange(1, 33), rng.randrange(6))]))
+            pass
+        script = DbgMasterMuxScript(1, rng.randrange(2)==0, DbgMasterFifoScript(ops)).as_bytes()
+        pass
+    else:
+        ops = [("read", 8*rng.randrange(1, 9), rng.randrange(0x10000), rng.randrange(1, 5)) for i in range(rng.randrange(1, 4))]
+        script = DbgMasterMuxScript(2, False, DbgMasterSramScript(ops)).as_bytes()
+        pass
+    if rng.randrange(5)==0: script = script[:rng.randrange(len(script)+1)]
+    return script
+
+#a Tests
+#c DbgMasterTest
+class DbgMasterTest(unittest.TestCase):
+    """
+    DbgMaster against the original drive sequence
+    """
+    def check_same(self, make_target, script:bytes, idles:list, cycles_to_run:int=1000, seed:int=0):
+        """
+        Run the script with the reference and the DbgMaster on identical
+        targets, and check the requests and results match; returns the
+        result
+        """
+        results = []
+        for invoke in [invoke_script_bytes_reference, DbgMaster.invoke_script_bytes]:
+            target = make_target()
+            dbg_master = DbgMaster(target, "req", "resp")
+            result = invoke(dbg_master, script, target.bfm_wait, random_idles(seed, idles), cycles_to_run)
+            results.append((result, target.trace))
+            pass
+        self.assertEqual(results[1][1], results[0][1], script.hex())
+        self.assertEqual(results[1][0], results[0][0], script.hex())
+        self.assertEqual(dbg_master.completion, results[1][0][0])
+        return results[1][0]
+    def test_random_target(self) -> None:
+        """
+        Any number of bytes consumed, including beyond the script end
+        """
+        rng = Random(1)
+        for seed in range(300):
+            script = rng.randbytes(rng.randrange(200))
+            idles = rng.choice([[0], [0, 0, 0, 1, 2], [3]])
+            self.check_same(lambda :DbgMasterRandomTarget(seed), script, idles, rng.randrange(1, 400), seed)
+            pass
+        pass
+    def test_rtl(self) -> None:
+        rng = Random(2)
+        completions = set()
+        for i in range(200):
+            entries = [rng.getrandbits(256) for j in range(rng.randrange(12))]
+            words = [rng.getrandbits(64) for j in range(0x10000)] if i%20==0 else None
+            script = random_script(rng)
+            idles = rng.choice([[0], [0, 0, 1], [1], [0, 2]])
+            (completion, data) = self.check_same(lambda :DbgMasterRtl(entries, words=words), script, idles, seed=i)
+            completions.add(completion)
+            pass
+        self.assertEqual(completions, {"ok", "errored", "poll_failed", "unexpected"})
+        pass
+    def test_long_script(self) -> None:
+        """
+        A script longer than the cycles run, and one that completes
+        """
+        script = DbgMasterMuxScript(1, False, DbgMasterFifoScript(["status"]*3000)).as_bytes()
+        (completion, data) = self.check_same(lambda :DbgMasterRtl([1, 2, 3]), script, [0], 1000)
+        self.assertEqual(completion, "unexpected")
+        (completion, data) = self.check_same(lambda :DbgMasterRtl([1, 2, 3]), script, [0], 20000)
+        self.assertEqual(completion, "ok")
+        self.assertEqual(data, [FifoStatus(515, 3).as_csr32()]*3000)
+        pass
+    def test_start_gap(self) -> None:
+        """
+        start_gap idle cycles follow the start, for sinks as for data
+        returned
+        """
+        script = DbgMasterMuxScript(1, False, DbgMasterFifoScript([("read", 64, 2), "status"])).as_bytes()
+        for start_gap in [0, 1, 3]:
+            target = DbgMasterRtl([5, 6, 7])
+            result = DbgMaster(target, "req", "resp").invoke_script_bytes(script, target.bfm_wait, lambda :0, start_gap=start_gap)
+            trace = target.trace
+            target = DbgMasterRtl([5, 6, 7])
+            responses = []
+            self.assertEqual(DbgMaster(target, "req", "resp").invoke_script_sink(script, target.bfm_wait, lambda :0, responses.append, start_gap=start_gap),
+                             (result[0], len(result[1])))
+            self.assertEqual(result, ("ok", [5, 0, 6, 0, FifoStatus(515, 1).as_csr32()]))
+            self.assertEqual([r.value for r in responses], result[1])
+            self.assertEqual(target.trace, trace)
+            self.assertEqual([req[0] for req in trace[:start_gap+2]], [t_dbg_master_op["dbg_op_start_clear"]]+[t_dbg_master_op["dbg_op_idle"]]*start_gap+[t_dbg_master_op["dbg_op_data_last"]])
+            pass
+        pass
+    def test_not_idle(self) -> None:
+        for (signal, completion) in [("resp_type", "Not idle"), ("data", "Data not zero when idle"), ("bytes_valid", "bytes valid not zero when idle")]:
+            target = DbgMasterRtl()
+            getattr(target, "resp__"+signal).drive(1)
+            self.assertEqual(DbgMaster(target, "req", "resp").invoke_script_bytes(b"\x01\x00", target.bfm_wait, lambda :0), (completion, []))
+            self.assertEqual(target.trace, [])
+            pass
+        pass
+    def test_sinks(self) -> None:
+        """
+        Buffer and file sinks receive the data returned, little-endian
+        """
+        rng = Random(3)
+        for i in range(50):
+            entries = [rng.getrandbits(256) for j in range(rng.randrange(12))]
+            script = random_script(rng)
+            target = DbgMasterRtl(entries)
+            dbg_master = DbgMaster(target, "req", "resp")
+            responses = list(dbg_master.script_responses(script, target.bfm_wait, lambda :0))
+            result = (dbg_master.completion, len(responses))
+            expected = b"".join([r.value.to_bytes(r.num_bytes, "little") for r in responses])
+            target = DbgMasterRtl(entries)
+            self.assertEqual(DbgMaster(target, "req", "resp").invoke_script_bytes(script, target.bfm_wait, lambda :0),
+                             (result[0], [r.value for r in responses]))
+            target = DbgMasterRtl(entries)
+            sink = DbgMasterBufferSink(bytearray(len(expected)+8))
+            self.assertEqual(DbgMaster(target, "req", "resp").invoke_script_sink(script, target.bfm_wait, lambda :0, sink), result)
+            self.assertEqual(bytes(sink.buffer[:sink.length]), expected)
+            target = DbgMasterRtl(entries)
+            f = io.BytesIO()
+            sink = DbgMasterFileSink(f)
+            self.assertEqual(DbgMaster(target, "req", "resp").invoke_script_sink(script, target.bfm_wait, lambda :0, sink), result)
+            self.assertEqual((f.getvalue(), sink.length), (expected, len(expected)))
+            if len(expected)>0:
+                target = DbgMasterRtl(entries)
+                sink = DbgMasterBufferSink(bytearray(len(expected)-1))
+                with self.assertRaises(ValueError):
+                    DbgMaster(target, "req", "resp").invoke_script_sink(script, target.bfm_wait, lambda :0, sink)
+                    pass
+                pass
+            pass
+        pass
+    pass
+
+#c DbgMasterQueueTest
+class DbgMasterQueueTest(unittest.TestCase):
+    """
+    DbgMasterQueue against running the same scripts one at a time
+    """
+    def fifo_script(self, ops) -> bytes:
+        return DbgMasterMuxScript(1, False, DbgMasterFifoScript(ops)).as_bytes()
+    def test_results(self) -> None:
+        """
+        Queued scripts return what they return run one at a time, in
+        fewer cycles
+        """
+        rng = Random(1)
+        entries = [rng.getrandbits(256) for i in range(40)]
+        scripts = [self.fifo_script(rng.choice([["status"], [("read", 64, 3)], [("read_err", 32, 2), "status"]])) for i in range(30)]
+        target = DbgMasterRtl(entries)
+        dbg_master = DbgMaster(target, "req", "resp")
+        expected = []
+        for script in scripts:
+            while target.resp__resp_type.value()!=t_dbg_master_resp_type["dbg_resp_idle"]: target.bfm_wait(1)
+            expected.append(dbg_master.invoke_script_bytes(script, target.bfm_wait, lambda :0))
+            pass
+        sequential_cycles = target.cycles
+        target = DbgMasterRtl(entries)
+        queue = DbgMasterQueue(DbgMaster(target, "req", "resp"), target.bfm_wait)
+        futures = [queue.submit(script) for script in scripts]
+        self.assertEqual(queue.run(), len(scripts))
+        self.assertEqual([f.result() for f in futures], expected)
+        self.assertIn("poll_failed", [e[0] for e in expected])
+        self.assertEqual(queue.cycles, target.cycles)
+        self.assertLess(queue.cycles, sequential_cycles)
+        self.assertTrue(queue.report().startswith("%d scripts in %d cycles"%(len(scripts), target.cycles)))
+        pass
+    def test_callbacks(self) -> None:
+        """
+        A polling loop: each status result submits a read of the entries
+        it reports, which submits the next status, until the FIFO is
+        empty; scripts may be callables and objects with as_bytes
+        """
+        target = DbgMasterRtl(list(range(100, 123)))
+        queue = DbgMasterQueue(DbgMaster(target, "req", "resp"), target.bfm_wait)
+        data = []
+        def read_done(future):
+            data.extend(future.result()[1][0::2])
+            submit_status()
+            pass
+        def status_done(future):
+            num = FifoStatus.of_csr32(future.result()[1][0], 515).entries_full
+            if num>0:
+                queue.submit(lambda :DbgMasterMuxScript(1, False, DbgMasterFifoScript([("read", 64, min(num, 5))]))).add_done_callback(read_done)
+                pass
+            pass
+        def submit_status():
+            queue.submit(DbgMasterMuxScript(1, False, DbgMasterFifoScript(["status"]))).add_done_callback(status_done)
+            pass
+        submit_status()
+        self.assertEqual(queue.run(), 1+2*5)
+        self.assertEqual(data, list(range(100, 123)))
+        pass
+    def test_errors(self) -> None:
+        """
+        A script that raises fails its future only; a cancelled script is
+        not run
+        """
+        target = DbgMasterRtl([1, 2])
+        queue = DbgMasterQueue(DbgMaster(target, "req", "resp"), target.bfm_wait)
+        failed = queue.submit(lambda :1/0)
+        cancelled = queue.submit(self.fifo_script([("read", 32, 1)]))
+        status = queue.submit(self.fifo_script(["status"]))
+        self.assertTrue(cancelled.cancel())
+        self.assertEqual(queue.run(), 1)
+        self.assertIsInstance(failed.exception(), ZeroDivisionError)
+        self.assertEqual(status.result(), ("ok", [FifoStatus(515, 2).as_csr32()]))
+        pass
+    pass
+
+#c UtilsImportTest
+class UtilsImportTest(unittest.TestCase):
+    def test_lazy_imports(self) -> None:
+        """
+        Importing dprintf and dbg_master does not import the slow typing,
+        re or concurrent.futures (see 'make import_time')
+        """
+        python_dir = os.path.join(os.path.dirname(__file__), "..", "..", "python")
+        check = ("import sys; from utils import Dprintf, DbgMaster, FifoStatus; "+
+                 "print(' '.join([m for m in ['typing', 're', 'concurrent.futures'] if m in sys.modules]))")
+        output = subprocess.run([sys.executable, "-S", "-c", check], cwd=python_dir, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "")
+        pass
+    pass
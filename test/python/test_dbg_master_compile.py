@@ -0,0 +1,264 @@
+#a Copyright
+#
+#  This file 'test_dbg_master_compile.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# compile_fifo_ops and compile_sram_ops merge and split reads; these tests
+# check them against the original one-opcode-per-op encoders, by the reads
+# each script performs and by the data the scripts return from
+# DbgMasterRtl and the models
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.dbg_master import DbgMaster, DbgMasterMuxScript, DbgMasterFifoScript, DbgMasterSramScript
+from regress.utils.dbg_master import compile_fifo_ops, compile_sram_ops, max_fifo_read_count, max_sram_read_count
+from regress.utils.dbg_master_model import DbgFifoModel, DbgSramModel, DbgMasterFifoSinkModel, DbgMasterSramAccessModel, DbgMasterMuxModel
+from dbg_master_rtl import DbgMasterRtl
+
+#a Reference encoders
+#f fifo_ops_reference
+def fifo_ops_reference(ops) -> bytes:
+    """
+    The original DbgMasterFifoScript.as_bytes
+    """
+    r = bytearray()
+    for op in ops:
+        if op == "status": # Read fifo status
+            r.append(0)
+            pass
+        elif op[0] == "read":
+            r.append(64 + (op[1]//8-1))
+            r.append((op[2]-1) &0xff)
+            r.append(((op[2]-1)>>8) &0xff)
+            pass
+        elif op[0] == "read_err":
+            r.append(128 + (op[1]//8-1))
+            r.append((op[2]-1) &0xff)
+            r.append(((op[2]-1)>>8) &0xff)
+            pass
+        pass
+    return bytes(r)
+
+#f sram_ops_reference
+def sram_ops_reference(ops) -> bytes:
+    """
+    The original DbgMasterSramScript.as_bytes
+    """
+    r = bytearray()
+    for op in ops:
+        if op[0] == "read":
+            r.append(64 + (op[1]//8-1))
+            r.append((op[2]) &0xff)
+            r.append(((op[2])>>8) &0xff)
+            r.append((op[3]-1) &0xff)
+            r.append(((op[3]-1)>>8) &0xff)
+            pass
+        pass
+    return bytes(r)
+
+#a Useful functions
+#f fifo_reads
+def fifo_reads(script:bytes) -> list:
+    """
+    The opcode of each status or entry read by a FIFO script, in order
+    """
+    reads = []
+    n = 0
+    while n<len(script):
+        if script[n]==0:
+            reads.append(0)
+            n += 1
+            continue
+        reads += [script[n]] * (int.from_bytes(script[n+1:n+3], "little")+1)
+        n += 3
+        pass
+    return reads
+
+#f sram_reads
+def sram_reads(script:bytes) -> list:
+    """
+    The (opcode, address) of each word read by an SRAM script, in order
+    """
+    reads = []
+    for n in range(0, len(script), 5):
+        address = int.from_bytes(script[n+1:n+3], "little")
+        reads += [(script[n], address+i) for i in range(int.from_bytes(script[n+3:n+5], "little")+1)]
+        pass
+    return reads
+
+#f random_fifo_ops
+def random_fifo_ops(rng:Random, max_count:int=6) -> list:
+    widths = rng.sample([8, 16, 32, 64, 256], 2)
+    ops = []
+    for i in range(rng.randrange(1, 12)):
+        ops.append(rng.choice(["status", ("read", rng.choice(widths), rng.randrange(1, max_count)),
+                               ("read", rng.choice(widths), rng.randrange(1, max_count)),
+                               ("read_err", rng.choice(widths), rng.randrange(1, max_count))]))
+        pass
+    return ops
+
+#f random_sram_ops
+def random_sram_ops(rng:Random) -> list:
+    ops = []
+    address = rng.randrange(0x10000)
+    for i in range(rng.randrange(1, 10)):
+        (bits, count) = (rng.choice([32, 64]), rng.randrange(1, 5))
+        if rng.randrange(3)==0: address = rng.randrange(0x10000)
+        if address+count>0x10000: address = 0x10000-count
+        ops.append(("read", bits, address, count))
+        address += count
+        pass
+    return ops
+
+#a Tests
+#c DbgMasterCompileTest
+class DbgMasterCompileTest(unittest.TestCase):
+    """
+    compile_fifo_ops and compile_sram_ops against the original encoders
+    """
+    def test_fifo_merge(self) -> None:
+        """
+        The same reads in the same order, with no two adjacent ops the
+        same unless the first is full
+        """
+        rng = Random(1)
+        for i in range(500):
+            ops = random_fifo_ops(rng, 6 if i%25 else 40000)
+            script = compile_fifo_ops(tuple(ops))
+            reference = fifo_ops_reference(ops)
+            self.assertEqual(fifo_reads(script), fifo_reads(reference))
+            self.assertLessEqual(len(script), len(reference))
+            n = 0
+            while n<len(script):
+                if script[n]!=0:
+                    if script[n+3:n+4]==script[n:n+1]: self.assertEqual(script[n+1:n+3], b"\xfe\xff")
+                    n += 3
+                    continue
+                n += 1
+                pass
+            pass
+        self.assertEqual(compile_fifo_ops((("read", 32, 1),)*4 + ("status", ("read", 32, 2), ("read_err", 32, 2))),
+                         b"\x43\x03\x00\x00\x43\x01\x00\x83\x01\x00")
+        pass
+    def test_fifo_split(self) -> None:
+        self.assertEqual(max_fifo_read_count, 65535)
+        script = compile_fifo_ops((("read", 64, 3*65535+4),))
+        self.assertEqual(script, b"\x47\xfe\xff"*3 + b"\x47\x03\x00")
+        self.assertEqual(len(fifo_reads(script)), 3*65535+4)
+        self.assertEqual(compile_fifo_ops((("read", 64, 65535),)), fifo_ops_reference([("read", 64, 65535)]))
+        self.assertEqual(compile_fifo_ops((("read", 64, 0), "status", ("read", 64, 0))), b"\x00")
+        for op in [("read", 0, 1), ("read", 12, 1), ("read", 264, 1), ("read", 32, -1), ("write", 32, 1)]:
+            with self.assertRaises(ValueError, msg=repr(op)): compile_fifo_ops((op,))
+            pass
+        pass
+    def test_sram_merge(self) -> None:
+        """
+        The same words read in the same order, merging only contiguous
+        reads of the same width
+        """
+        rng = Random(2)
+        for i in range(500):
+            ops = random_sram_ops(rng)
+            script = compile_sram_ops(tuple(ops))
+            reference = sram_ops_reference(ops)
+            self.assertEqual(sram_reads(script), sram_reads(reference))
+            self.assertLessEqual(len(script), len(reference))
+            for n in range(5, len(script), 5):
+                previous = sram_reads(script[n-5:n])[-1]
+                self.assertNotEqual((script[n], int.from_bytes(script[n+1:n+3], "little")), (previous[0], previous[1]+1))
+                pass
+            pass
+        self.assertEqual(compile_sram_ops((("read", 32, 0x10, 2), ("read", 32, 0x12, 3), ("read", 64, 0x15, 1), ("read", 64, 0x17, 1))),
+                         b"\x43\x10\x00\x04\x00" + b"\x47\x15\x00\x00\x00" + b"\x47\x17\x00\x00\x00")
+        pass
+    def test_sram_limits(self) -> None:
+        self.assertEqual(max_sram_read_count, 0x10000)
+        self.assertEqual(compile_sram_ops((("read", 8, 0, 0x8000), ("read", 8, 0x8000, 0x8000))), b"\x40\x00\x00\xff\xff")
+        self.assertEqual(compile_sram_ops((("read", 8, 0, 0x8000), ("read", 8, 0x8000, 0x8001))), b"\x40\x00\x00\xff\x7f\x40\x00\x80\x00\x80")
+        self.assertEqual(compile_sram_ops((("read", 8, 5, 0),)), b"")
+        for op in [("read", 72, 0, 1), ("read", 32, 0x10000, 1), ("read", 32, -1, 1), ("read", 32, 0, 0x10001), ("write", 32, 0, 1)]:
+            with self.assertRaises(ValueError, msg=repr(op)): compile_sram_ops((op,))
+            pass
+        pass
+    def test_data(self) -> None:
+        """
+        Compiled and reference scripts return the same data from
+        DbgMasterRtl and the models, including when the FIFO empties
+        """
+        rng = Random(3)
+        words = [rng.getrandbits(64) for i in range(0x10000)]
+        for i in range(60):
+            entries = [rng.getrandbits(256) for j in range(rng.randrange(30))]
+            if i%2==0:
+                ops = random_fifo_ops(rng)
+                scripts = [DbgMasterMuxScript(1, False, DbgMasterFifoScript(ops)).as_bytes(), bytes([1])+fifo_ops_reference(ops)]
+                pass
+            else:
+                ops = random_sram_ops(rng)
+                scripts = [DbgMasterMuxScript(2, False, DbgMasterSramScript(ops)).as_bytes(), bytes([2])+sram_ops_reference(ops)]
+                pass
+            results = []
+            for script in scripts:
+                target = DbgMasterRtl(entries, words=words)
+                results.append(DbgMaster(target, "req", "resp").invoke_script_bytes(script, target.bfm_wait, lambda :0, 10000))
+                fifo = DbgFifoModel()
+                fifo.entries.extend(entries)
+                sram = DbgSramModel(width=64)
+                sram.words = list(words)
+                results.append(DbgMasterMuxModel({1:DbgMasterFifoSinkModel(fifo), 2:DbgMasterSramAccessModel(sram)}).run_script(script))
+                pass
+            self.assertEqual(results[1:], results[:1]*3, ops)
+            pass
+        pass
+    def test_cache(self) -> None:
+        """
+        Equal op tuples compile once; scripts memoize their bytes until
+        their ops, select or clear change
+        """
+        ops = [["read", 32, 4], "status"]
+        self.assertIs(compile_fifo_ops((("read", 32, 4), "status")), compile_fifo_ops((("read", 32, 4), "status")))
+        script = DbgMasterFifoScript(ops)
+        compiled = script.as_bytes()
+        self.assertEqual(compiled, fifo_ops_reference(ops))
+        self.assertIs(script.as_bytes(), compiled)
+        self.assertIs(DbgMasterFifoScript(list(ops)).as_bytes(), compiled)
+        script.ops = (("read", 32, 5),)
+        self.assertEqual(script.as_bytes(), fifo_ops_reference(script.ops))
+        mux = DbgMasterMuxScript(1, True, script)
+        self.assertIs(mux.as_bytes(), mux.as_bytes())
+        self.assertEqual(mux.as_bytes(), b"\x81"+script.as_bytes())
+        sram = DbgMasterSramScript([("read", 64, 10, 2)])
+        self.assertIs(sram.as_bytes(), sram.as_bytes())
+        self.assertEqual(sram.as_bytes(), sram_ops_reference(sram.ops))
+        mux.select = 2
+        self.assertEqual(mux.as_bytes(), b"\x82"+script.as_bytes())
+        mux.clear = False
+        self.assertEqual(mux.as_bytes(), b"\x02"+script.as_bytes())
+        mux.subscript = sram
+        self.assertEqual(mux.as_bytes(), b"\x02"+sram.as_bytes())
+        sram.ops = [["read", 64, 10, 2]]
+        sram.as_bytes()
+        sram.ops.append(["read", 32, 0, 1])
+        sram.ops[0][3] = 3
+        self.assertEqual(sram.as_bytes(), sram_ops_reference(sram.ops))
+        self.assertEqual(mux.as_bytes(), b"\x02"+sram_ops_reference(sram.ops))
+        script.ops = [("read", 32, 5)]
+        script.as_bytes()
+        script.ops.append("status")
+        self.assertEqual(script.as_bytes(), fifo_ops_reference(script.ops))
+        pass
+    pass
@@ -0,0 +1,130 @@
+#a Copyright
+#
+#  This file 'test_dbg_master_cost.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# DbgMasterCostEstimator against the cycles, responses and bytes of
+# scripts run by DbgMaster on DbgMasterRtl, the cycle transcription of
+# the CDL
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.dbg_master import DbgMaster, DbgMasterMuxScript, DbgMasterFifoScript, DbgMasterSramScript
+from regress.utils.dbg_master_cost import DbgMasterCostEstimator, recovery_cycles
+from dbg_master_rtl import DbgMasterRtl
+from test_dbg_master_compile import random_fifo_ops, random_sram_ops
+
+#a Tests
+#c DbgMasterCostTest
+class DbgMasterCostTest(unittest.TestCase):
+    """
+    Estimates against DbgMasterRtl
+    """
+    words = [Random(0).getrandbits(64) for i in range(0x10000)]
+    def check(self, script, entries:list, idles:list=[], start_gap:int=1, **kwargs) -> str:
+        """
+        Check the estimate of the script matches the hardware; return the
+        completion
+        """
+        target = DbgMasterRtl(entries, words=self.words)
+        dbg_master = DbgMaster(target, "req", "resp")
+        idle = iter(idles)
+        responses = list(dbg_master.script_responses(script.as_bytes() if hasattr(script, "as_bytes") else script,
+                                                     target.bfm_wait, lambda :next(idle, 0), 400, start_gap))
+        idle = iter(idles)
+        estimator = DbgMasterCostEstimator(lambda :next(idle, 0), fifo_entries=len(entries), start_gap=start_gap, **kwargs)
+        cost = estimator.estimate(script)
+        self.assertEqual((cost.completion, cost.responses, cost.bytes_returned),
+                         (dbg_master.completion, len(responses), sum([r.num_bytes for r in responses])), script)
+        if cost.completion!="unexpected": self.assertEqual(cost.cycles, target.cycles, script)
+        return cost.completion
+    def test_fifo(self) -> None:
+        rng = Random(1)
+        completions = set()
+        for i in range(200):
+            entries = [rng.getrandbits(256) for j in range(rng.randrange(30))]
+            script = DbgMasterMuxScript(1, False, DbgMasterFifoScript(random_fifo_ops(rng)))
+            completions.add(self.check(script, entries, start_gap=rng.randrange(1, 4)))
+            pass
+        self.assertEqual(completions, {"ok", "poll_failed"})
+        pass
+    def test_sram(self) -> None:
+        rng = Random(2)
+        for i in range(100):
+            script = DbgMasterMuxScript(2, False, DbgMasterSramScript(random_sram_ops(rng)))
+            self.assertEqual(self.check(script, [], start_gap=rng.randrange(1, 4)), "ok")
+            pass
+        pass
+    def test_idles(self) -> None:
+        """
+        Single-cycle inter-data idles cost nothing; longer ones stall the
+        script unless it is at its end
+        """
+        rng = Random(3)
+        completions = set()
+        for i in range(200):
+            entries = [rng.getrandbits(256) for j in range(rng.randrange(30))]
+            if i%2==0:
+                script = DbgMasterMuxScript(1, False, DbgMasterFifoScript(random_fifo_ops(rng)))
+                pass
+            else:
+                script = DbgMasterMuxScript(2, False, DbgMasterSramScript(random_sram_ops(rng)))
+                pass
+            idles = [rng.choice([0, 1] if i%4<2 else [0, 0, 0, 1, 2, 3]) for j in range(100)]
+            completions.add(self.check(script, entries, idles))
+            pass
+        self.assertEqual(completions, {"ok", "poll_failed", "unexpected"})
+        pass
+    def test_bytes(self) -> None:
+        """
+        Scripts given as bytes use the targets mapping; too short or
+        unmapped scripts are errored
+        """
+        script = DbgMasterMuxScript(2, False, DbgMasterSramScript([("read", 64, 0, 4)])).as_bytes()
+        self.assertEqual(self.check(script, [], targets={2:"sram"}), "ok")
+        self.assertEqual(self.check(b"\x01", [1]), "errored")
+        self.assertEqual(self.check(b"\x05\x00", [1]), "errored")
+        self.assertEqual(DbgMasterCostEstimator().estimate(script).completion, "errored")
+        pass
+    def test_period(self) -> None:
+        """
+        The mux is idle again recovery_cycles after the completion
+        """
+        script = DbgMasterMuxScript(1, False, DbgMasterFifoScript([("read", 64, 3)]))
+        cost = DbgMasterCostEstimator(fifo_entries=5).estimate(script)
+        target = DbgMasterRtl([1, 2, 3, 4, 5])
+        DbgMaster(target, "req", "resp").invoke_script_bytes(script.as_bytes(), target.bfm_wait, lambda :0)
+        target.bfm_wait(recovery_cycles-1)
+        self.assertNotEqual(target.resp__resp_type.value(), 0)
+        target.bfm_wait(1)
+        self.assertEqual(target.resp__resp_type.value(), 0)
+        self.assertEqual(target.cycles, cost.period())
+        self.assertEqual(cost.bytes_per_cycle(), 24/cost.period())
+        pass
+    def test_default_targets(self) -> None:
+        """
+        Estimators do not share a default targets mapping
+        """
+        (a, b) = (DbgMasterCostEstimator(), DbgMasterCostEstimator())
+        a.targets[1] = "fifo"
+        self.assertEqual(b.targets, {})
+        targets = {2:"sram"}
+        c = DbgMasterCostEstimator(targets=targets)
+        c.targets[1] = "fifo"
+        self.assertEqual(targets, {2:"sram"})
+        pass
+    pass
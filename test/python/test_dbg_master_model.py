@@ -0,0 +1,173 @@
+#a Copyright
+#
+#  This file 'test_dbg_master_model.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# The transaction-level models of dbg_master_model.py against
+# DbgMasterRtl, the cycle transcription of the CDL, for well-formed,
+# truncated and random scripts
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.dbg_master import DbgMaster, DbgMasterMuxScript, DbgMasterFifoScript, DbgMasterSramScript
+from regress.utils.dbg_master_model import DbgFifoModel, DbgSramModel, DbgMasterFifoSinkModel, DbgMasterSramAccessModel
+from regress.utils.dbg_master_model import DbgMasterMuxModel, DbgMasterModelCheck
+from regress.utils.fifo_status import FifoStatus
+from dbg_master_rtl import DbgMasterRtl
+
+#a Useful functions
+#f model_of
+def model_of(entries:list, words:list) -> DbgMasterMuxModel:
+    """
+    Model of a DbgMasterRtl with the FIFO entries and SRAM words
+    """
+    fifo = DbgFifoModel()
+    fifo.entries.extend(entries)
+    sram = DbgSramModel(width=64)
+    sram.words = list(words)
+    return DbgMasterMuxModel({1:DbgMasterFifoSinkModel(fifo), 2:DbgMasterSramAccessModel(sram)})
+
+#f random_fifo_script
+def random_fifo_script(rng:Random) -> bytes:
+    """
+    FIFO ops of any size and count (including 0 for 65536), or random
+    bytes, sometimes truncated
+    """
+    if rng.randrange(4)==0:
+        return bytes([1]) + rng.randbytes(rng.randrange(12))
+    script = bytearray([rng.choice([1, 0x81])])
+    for i in range(rng.randrange(1, 6)):
+        if rng.randrange(3)==0:
+            script.append(rng.randrange(64))
+            continue
+        script.append(rng.randrange(64, 256))
+        script += rng.choice([rng.randrange(8), 0xffff]).to_bytes(2, "little")
+        pass
+    if rng.randrange(5)==0: script = script[:rng.randrange(len(script)+1)]
+    return bytes(script)
+
+#f random_sram_script
+def random_sram_script(rng:Random) -> bytes:
+    """
+    SRAM reads of any opcode, sometimes truncated
+    """
+    script = bytearray([2])
+    for i in range(rng.randrange(1, 4)):
+        script.append(rng.randrange(256))
+        script += rng.randrange(0x10000).to_bytes(2, "little")
+        script += rng.randrange(6).to_bytes(2, "little")
+        pass
+    if rng.randrange(5)==0: script = script[:rng.randrange(len(script)+1)]
+    return bytes(script)
+
+#a Tests
+#c DbgMasterModelTest
+class DbgMasterModelTest(unittest.TestCase):
+    """
+    DbgMasterMuxModel against DbgMasterRtl
+    """
+    def check(self, entries:list, words:list, script:bytes) -> tuple:
+        """
+        Run the script on both, checking the results and the FIFO entries
+        left match; returns the result
+        """
+        target = DbgMasterRtl(entries, words=words)
+        result = DbgMaster(target, "req", "resp").invoke_script_bytes(script, target.bfm_wait, lambda :0, 100000)
+        model = model_of(entries, words)
+        self.assertEqual(model.run_script(script), result, script.hex())
+        self.assertEqual(model.completion, result[0])
+        self.assertEqual(list(model.targets[1].fifo.entries), list(target.fifo), script.hex())
+        return result
+    def test_fifo(self) -> None:
+        rng = Random(1)
+        completions = set()
+        for i in range(400):
+            entries = [rng.getrandbits(256) for j in range(rng.randrange(20))]
+            completions.add(self.check(entries, [], random_fifo_script(rng))[0])
+            pass
+        self.assertEqual(completions, {"ok", "errored", "poll_failed"})
+        pass
+    def test_sram(self) -> None:
+        rng = Random(2)
+        words = [rng.getrandbits(64) for j in range(0x10000)]
+        completions = set()
+        for i in range(200):
+            completions.add(self.check([], words, random_sram_script(rng))[0])
+            pass
+        self.assertEqual(completions, {"ok", "errored"})
+        pass
+    def test_hand_computed(self) -> None:
+        """
+        Results worked out from the opcode descriptions
+        """
+        entries = [0x0123456789abcdef_fedcba9876543210_1111111122222222_3333333344444444, 5]
+        words = [0]*0x10000
+        words[0x10:0x12] = [0x0102030405060708, 0x1112131415161718]
+        for (script, result) in [
+                (DbgMasterMuxScript(1, False, DbgMasterFifoScript([("read", 32, 1), "status"])), ("ok", [0x44444444, FifoStatus(515, 1).as_csr32()])),
+                (DbgMasterMuxScript(1, False, DbgMasterFifoScript([("read", 72, 1)])),           ("ok", [0x44444444, 0x33333333, 0x22])),
+                (DbgMasterMuxScript(1, False, DbgMasterFifoScript([("read", 64, 3)])),           ("ok", [0x44444444, 0x33333333, 5, 0])),
+                (DbgMasterMuxScript(1, False, DbgMasterFifoScript([("read_err", 64, 3)])),       ("poll_failed", [0x44444444, 0x33333333, 5, 0])),
+                (DbgMasterMuxScript(2, False, DbgMasterSramScript([("read", 24, 0x10, 2)])),     ("ok", [0x060708, 0x161718])),
+                (DbgMasterMuxScript(2, False, DbgMasterSramScript([("read", 64, 0x11, 1)])),     ("ok", [0x15161718, 0x11121314])),
+                (DbgMasterMuxScript(2, False, DbgMasterSramScript([("read", 40, 0x10, 1)])),     ("ok", [0x05060708, 0x01020304])),
+                ]:
+            self.assertEqual(self.check(entries, words, script.as_bytes()), result)
+            pass
+        pass
+    def test_mux(self) -> None:
+        """
+        Scripts too short to select, or selecting no target, are errored
+        """
+        for script in [b"", b"\x01", b"\x02", b"\x03\x00", b"\x05\x00\x00\x00"]:
+            self.assertEqual(self.check([1], [0]*0x10000, script), ("errored", []))
+            pass
+        self.assertEqual(self.check([], [0]*0x10000, b"\x01\x00"), ("ok", [FifoStatus(515, 0).as_csr32()]))
+        pass
+    def test_fifo_model(self) -> None:
+        fifo = DbgFifoModel(3)
+        self.assertEqual([fifo.push([i, 2*i, 3*i, 4*i, 5*i]) for i in range(4)], [True]*3+[False])
+        self.assertEqual(len(fifo), 3)
+        self.assertEqual(fifo.pop(), 0)
+        self.assertEqual(fifo.pop(), 1 | (2<<64) | (3<<128) | (4<<192))
+        self.assertEqual(fifo.status().as_csr32(), FifoStatus(3, 1).as_csr32())
+        fifo.pop()
+        self.assertIsNone(fifo.pop())
+        pass
+    def test_sram_model(self) -> None:
+        accesses = []
+        sram = DbgSramModel(size=16, width=8, on_access=lambda *a:accesses.append(a))
+        sram.write(17, 0x1234)
+        self.assertEqual(sram.read(1), 0x34)
+        self.assertEqual(accesses, [(False, 1, 0x1234), (True, 1, 0)])
+        pass
+    def test_model_check(self) -> None:
+        """
+        Mismatches are recorded, and the hardware result returned
+        """
+        script = DbgMasterMuxScript(1, False, DbgMasterFifoScript([("read", 32, 2)])).as_bytes()
+        target = DbgMasterRtl([1, 2, 3])
+        check = DbgMasterModelCheck(DbgMaster(target, "req", "resp"), model_of([1, 2, 3], []))
+        self.assertEqual(check.invoke_script_bytes(script, target.bfm_wait, lambda :0), ("ok", [1, 2]))
+        self.assertEqual(check.mismatches, [])
+        check.model.targets[1].fifo.pop()
+        target.bfm_wait(4)
+        self.assertEqual(check.invoke_script_bytes(script, target.bfm_wait, lambda :0), ("ok", [3]))
+        self.assertEqual((check.scripts, check.completion, len(check.mismatches)), (2, "ok", 1))
+        self.assertIn("Script 2", check.mismatches[0])
+        pass
+    pass
@@ -181,6 +181,55 @@ class DprintfTest_DecimalPadded(DprintfTest_Base):
                      (  0x300, (0xe302625a00, 0xe717d78400,
                                 0xe7ee6b2800, 0xe7ffffffff,), " 40000000 40000000040000000004294967295"),
     ]
+#c DprintfTest_Timing
+class DprintfTest_Timing(DprintfTest_Base):
+    """
+    Check the cycle of every byte and of the end of each request against
+    the DprintfTiming model; requests are presented one at a time with a
+    direct connection (test_ctl 0)
+    """
+    data_to_test = (DprintfTest_1.data_to_test +
+                    DprintfTest_Hex.data_to_test +
+                    DprintfTest_DecimalUnpadded.data_to_test +
+                    DprintfTest_DecimalPadded.data_to_test)
+    #f run
+    def run(self) -> None:
+        self.bfm_wait(4)
+        self.test_ctl.drive(self.cfg_test_ctl)
+        self.bfm_wait(4)
+        for (address, data, result) in self.data_to_test:
+            timing = Dprintf(address, bytes(), data).timing()
+            assert(timing.output() == result.encode())
+            self.dprintf_req__valid.drive(1)
+            self.dprintf_req__address.drive(address)
+            self.dprintf_req__data_0.drive(data[0])
+            self.dprintf_req__data_1.drive(data[1])
+            self.dprintf_req__data_2.drive(data[2])
+            self.dprintf_req__data_3.drive(data[3])
+            self.bfm_wait(1)
+            cycle = 1
+            self.compare_expected("Request taken in cycle 0",1,self.dprintf_ack.value())
+            self.dprintf_req__valid.drive(0)
+            output = []
+            last_cycle = None
+            while last_cycle is None and cycle<=timing.cycles+10:
+                if self.dprintf_byte__valid.value():
+                    if self.dprintf_byte__last.value():
+                        last_cycle = cycle
+                        pass
+                    else:
+                        output.append((cycle, self.dprintf_byte__address.value(), self.dprintf_byte__data.value()))
+                        pass
+                    pass
+                self.bfm_wait(1)
+                cycle += 1
+                pass
+            self.compare_expected("Byte timing for '%s'"%result, timing.bytes, output)
+            self.compare_expected("Cycles for '%s'"%result, timing.cycles, last_cycle)
+            self.bfm_wait(4)
+            pass
+        pass
+    pass
 
 #a Hardware and test instantiation
 #c DprintfHardware
@@ -222,5 +271,6 @@ class TestDprintf(TestCase):
               "small_0": (DprintfTest_Small, 1*5000,   {"th_args":{"test_ctl":0}}),
               "small_1": (DprintfTest_Small, 1*5000,   {"th_args":{"test_ctl":1}}),
               "small_2": (DprintfTest_Small, 1*5000,   {"th_args":{"test_ctl":2}}),
+              "timing": (DprintfTest_Timing, 1*20000,  {"th_args":{"test_ctl":0}}),
     }
 
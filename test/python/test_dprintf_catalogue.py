@@ -0,0 +1,133 @@
+#a Copyright
+#
+#  This file 'test_dprintf_catalogue.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import os
+import tempfile
+import unittest
+from random import Random
+from regress.utils.dprintf import Dprintf, dprintf_decode, dprintf_tokens
+from regress.utils.dprintf_catalogue import DprintfCatalogue
+
+#a Useful functions
+#f field_data
+def field_data(data:bytes) -> bytes:
+    """
+    The data of the fields of full dprintf data, without the field bytes
+    """
+    return b"".join([token[1:] for (token, _) in dprintf_tokens(data) if token[0]>=0x80])
+
+#a Tests
+#c DprintfCatalogueTest
+class DprintfCatalogueTest(unittest.TestCase):
+    """
+    Catalogue records against the full dprintf requests of their formats
+    """
+    formats = ["Hello world", "val=%08x n=%5d", "%3x|%hhu|%hx", "%llx %10u", "addr %04x data %016llx"]
+    def random_args(self, rng:Random, catalogue:DprintfCatalogue, message_id:int) -> list:
+        return [rng.getrandbits(64) for f in catalogue.entry(message_id).fields]
+    def test_records(self) -> None:
+        """
+        A record is the id and the field data of the full request, and
+        decodes to its output
+        """
+        rng = Random(1)
+        catalogue = DprintfCatalogue(self.formats)
+        self.assertEqual(sorted(catalogue.entries.keys()), list(range(1, len(self.formats)+1)))
+        for (i, fmt) in enumerate(self.formats):
+            message_id = catalogue.add(fmt)
+            self.assertEqual(message_id, i+1)
+            for j in range(20):
+                args = self.random_args(rng, catalogue, message_id)
+                full = Dprintf.format(0, fmt, *args)
+                record = catalogue.record(fmt, *args)
+                self.assertEqual(record, message_id.to_bytes(2, "big") + field_data(full.data))
+                [(decoded_id, decoded_args, output)] = catalogue.decode(record)
+                self.assertEqual(decoded_id, message_id)
+                self.assertEqual(output, dprintf_decode(full.data))
+                self.assertEqual(catalogue.entry(message_id).dprintf(0, decoded_args).data, full.data)
+                pass
+            pass
+        pass
+    def test_pack(self) -> None:
+        """
+        Records packed into requests decode in order, and expand to the
+        full requests
+        """
+        rng = Random(2)
+        catalogue = DprintfCatalogue(self.formats)
+        for words in [2, 4]:
+            messages = []
+            for i in range(200):
+                message_id = rng.randrange(1, len(self.formats)+1)
+                messages.append((message_id, self.random_args(rng, catalogue, message_id)))
+                pass
+            records = [catalogue.record(m, *args) for (m, args) in messages]
+            requests = catalogue.pack(records, words=words)
+            (count, room) = (0, 0)
+            for r in records:
+                if len(r)>room: (count, room) = (count+1, 8*words)
+                room -= len(r)
+                pass
+            self.assertEqual(len(requests), count)
+            for r in requests: self.assertLessEqual(len(r.data), 8*words)
+            decoded = catalogue.decode_requests(requests)
+            self.assertEqual([d[0] for d in decoded], [m for (m, _) in messages])
+            expected = [Dprintf.format(0, catalogue.entry(m).fmt, *args) for (m, args) in messages]
+            self.assertEqual([d[2] for d in decoded], [bytes(e.output) for e in expected])
+            data = b"".join([b"".join([d.to_bytes(8, "big") for d in r.data_list]) for r in requests])
+            expanded = catalogue.expand(0x100, data, words)
+            self.assertEqual([e.data for e in expanded], [e.data for e in expected])
+            self.assertEqual(expanded[1].address, 0x100+len(expected[0].output))
+            pass
+        pass
+    def test_errors(self) -> None:
+        catalogue = DprintfCatalogue()
+        self.assertEqual(catalogue.add("x=%d", name="x"), 1)
+        self.assertEqual(catalogue.add("y=%d", message_id=10), 10)
+        self.assertEqual(catalogue.add("z"), 11)
+        for (fmt, name, message_id) in [("a", "x", None), ("a", None, 10), ("a", None, 0), ("a", None, 0x10000)]:
+            with self.assertRaises(ValueError): catalogue.add(fmt, name=name, message_id=message_id)
+            pass
+        with self.assertRaises(TypeError): catalogue.record("x", 1, 2)
+        with self.assertRaises(ValueError): catalogue.decode(b"\x00\x05")
+        with self.assertRaises(ValueError): catalogue.decode(b"\x00\x01\x00")
+        with self.assertRaises(ValueError): catalogue.pack([bytes(33)])
+        self.assertEqual(catalogue.decode(b"\x00\x0b\x00\x00\x00\x0b"), [(11, (), b"z")])
+        pass
+    def test_save_load(self) -> None:
+        catalogue = DprintfCatalogue()
+        catalogue.add("val=%08x", name="val")
+        catalogue.add("n=%5d */ end", name="count", message_id=7)
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "catalogue.json")
+            catalogue.save(filename)
+            loaded = DprintfCatalogue.load(filename)
+            header = os.path.join(d, "catalogue.h")
+            catalogue.write_header(header)
+            with open(header) as f: source = f.read()
+            pass
+        self.assertEqual([(e.message_id, e.name, e.fmt) for e in loaded.entries.values()],
+                         [(e.message_id, e.name, e.fmt) for e in catalogue.entries.values()])
+        self.assertEqual(source, catalogue.header_source())
+        self.assertIn("constant integer dprintf_msg_val = 1;", source)
+        self.assertIn("constant integer dprintf_msg_count_bytes = 6;", source)
+        self.assertNotIn("*/ end", source)
+        catalogue.add("%d", name="not valid")
+        with self.assertRaises(ValueError): catalogue.write_header(os.devnull)
+        pass
+    pass
@@ -0,0 +1,178 @@
+#a Copyright
+#
+#  This file 'test_dprintf_decode.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils import dprintf
+from regress.utils.dprintf import Dprintf, DprintfPlan, dprintf_decode, dprintf_interpret
+
+#a Useful functions
+#f decode_bytewise
+def decode_bytewise(data:bytes) -> bytes:
+    """
+    The byte by byte decoder that dprintf_decode replaced (with field
+    bytes 0x90 to 0xbf as hex, as dprintf.cdl formats them)
+    """
+    hex = b"0123456789ABCDEF"
+    output = bytearray()
+    data_len = len(data)
+    n = 0
+    while n < data_len:
+        c = data[n]
+        if c==0:
+            n += 1
+            pass
+        elif c<128:
+            output.append(c)
+            n += 1
+            pass
+        elif c<0xc0:
+            nybbles = (c & 0x1f)+1
+            num_data_bytes = (nybbles + 1) // 2
+            for i in range(num_data_bytes):
+                v = data[n+1+i] if n+1+i < data_len else 255
+                if i>0 or (nybbles%2)==0: output.append(hex[(v >> 4) & 0xf])
+                output.append(hex[v & 0xf])
+                pass
+            n += 1+num_data_bytes
+            pass
+        elif c<255:
+            num_data_bytes = ((c&3)+ 1)
+            pad_to = (c>>2) & 15
+            value = 0
+            for i in range(num_data_bytes):
+                value = value*256 + (data[n+1+i] if n+1+i < data_len else 255)
+                pass
+            s = str(value)
+            if pad_to >= 1: output += b" "*(pad_to+1-len(s))
+            output += s.encode()
+            n += 1+num_data_bytes
+            pass
+        else:
+            break
+        pass
+    return bytes(output)
+
+#f random_message
+def random_message(rng:Random, length:int) -> bytes:
+    """
+    Random dprintf data: characters, zeros, hex fields and decimal fields
+    padded to at most 10 characters, possibly ended by 0xff
+    """
+    data = bytearray()
+    while len(data)<length:
+        kind = rng.randrange(10)
+        if kind<5:
+            data.append(rng.randrange(1, 128))
+            pass
+        elif kind==5:
+            data.append(0)
+            pass
+        elif kind<8:
+            c = 0x80 + rng.randrange(0x40)
+            data.append(c)
+            data += bytes([rng.randrange(256) for i in range(((c&0x1f)+2)//2)])
+            pass
+        elif kind<9:
+            c = 0xc0 | (rng.randrange(10)<<2) | rng.randrange(4)
+            data.append(c)
+            data += bytes([rng.randrange(256) for i in range((c&3)+1)])
+            pass
+        else:
+            data.append(0xff)
+            pass
+        pass
+    return bytes(data[:length])
+
+#a Tests
+#c DprintfDecodeTest
+class DprintfDecodeTest(unittest.TestCase):
+    """
+    dprintf_decode (and its plans) against the byte by byte decoder
+    """
+    def setUp(self) -> None:
+        dprintf._dprintf_plans.clear()
+        pass
+    def test_vectors(self) -> None:
+        for (data, output) in [(b"Hello\x00 world", b"Hello world"),
+                               (b"x=\x87\x12\x34\x56\x78!\xff junk", b"x=12345678!"),
+                               (b"\x84\x12\x34\x56", b"23456"),
+                               (b"[\xe7\x00\x00\x00\x7b]", b"[       123]"),
+                               (b"\xc1\xff\xff", b"65535"),
+                               (b"\x87\x12", b"12FFFFFF"),
+                               ]:
+            self.assertEqual(dprintf_decode(data), output)
+            self.assertEqual(decode_bytewise(data), output)
+            self.assertEqual(bytes(Dprintf(0, data).output), output)
+            pass
+        pass
+    def test_random_messages(self) -> None:
+        rng = Random(1)
+        for i in range(2000):
+            data = random_message(rng, rng.randrange(40))
+            self.assertEqual(dprintf_decode(data), decode_bytewise(data), data.hex())
+            self.assertEqual(dprintf_interpret(data, 0, len(data)), decode_bytewise(data), data.hex())
+            pass
+        pass
+    def test_buffers(self) -> None:
+        """
+        Buffers of requests, of repeated and of interleaved formats, so
+        that plans are built and then match or fail to match
+        """
+        rng = Random(2)
+        skeletons = [random_message(rng, 32) for i in range(6)]
+        def request(skeleton:bytes) -> bytes:
+            data = bytearray(skeleton)
+            n = 0
+            while n<32:
+                c = data[n]
+                if c==0xff: break
+                num_data_bytes = 0 if c<0x80 else (((c&0x1f)+2)//2 if c<0xc0 else (c&3)+1)
+                for j in range(n+1, min(n+1+num_data_bytes, 32)): data[j] = rng.randrange(256)
+                n += 1+num_data_bytes
+                pass
+            return bytes(data)
+        for formats in [1, 2, 6]:
+            requests = [request(skeletons[rng.randrange(formats)]) for i in range(300)]
+            requests.insert(150, random_message(rng, 32))
+            buffer = b"".join(requests)
+            expected = b"".join([decode_bytewise(r) for r in requests])
+            self.assertEqual(dprintf_decode(buffer, 32), expected)
+            self.assertEqual(dprintf_decode(buffer, 32), expected)
+            truncated = b"".join([decode_bytewise(r) for r in requests[:-1]]) + decode_bytewise(requests[-1][:-5])
+            self.assertEqual(dprintf_decode(buffer[:-5], 32), truncated)
+            pass
+        self.assertTrue(any([isinstance(p, DprintfPlan) for p in dprintf._dprintf_plans.values()]))
+        pass
+    def test_plan_limit(self) -> None:
+        """
+        The plan cache is bounded, dropping the oldest entries first
+        """
+        for i in range(dprintf.max_dprintf_plans+10):
+            data = b"m%d \x83\x01\x02"%i
+            self.assertEqual(dprintf_decode(data), b"m%d 0102"%i)
+            self.assertEqual(dprintf_decode(data), b"m%d 0102"%i)
+            self.assertLessEqual(len(dprintf._dprintf_plans), dprintf.max_dprintf_plans)
+            pass
+        self.assertEqual(len(dprintf._dprintf_plans), dprintf.max_dprintf_plans)
+        keys = [k[1] for k in dprintf._dprintf_plans.keys()]
+        self.assertEqual(keys[0], b"m10 \x83")
+        self.assertEqual(keys[-1], b"m%d \x83"%(dprintf.max_dprintf_plans+9))
+        self.assertTrue(all([isinstance(p, DprintfPlan) for p in dprintf._dprintf_plans.values()]))
+        pass
+    pass
@@ -0,0 +1,130 @@
+#a Copyright
+#
+#  This file 'test_dprintf_display.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import os
+import tempfile
+import unittest
+from random import Random
+from regress.utils.dprintf import Dprintf, DprintfByte
+from regress.utils.dprintf_display import DprintfDisplay, pack_capture
+
+#a Useful functions
+#f random_records
+def random_records(rng:Random, num_strings:int) -> list:
+    """
+    (address, data, last, valid) records of strings at random addresses,
+    some wrapping at 16 bits, with the odd invalid or out of sequence
+    record
+    """
+    records = []
+    for i in range(num_strings):
+        address = rng.choice([rng.randrange(0x10000), 0xfff0, 75, 158])
+        for j in range(rng.randrange(1, 40)):
+            if rng.randrange(20)==0: records.append((rng.randrange(0x10000), 0x41, False, False))
+            if rng.randrange(30)==0: address = rng.randrange(0x10000)
+            records.append((address, rng.randrange(32, 127), False, True))
+            address = (address+1) & 0xffff
+            pass
+        records.append((0, 0, True, True))
+        pass
+    return records
+
+#f screen_of_records
+def screen_of_records(records:list, columns:int, rows:int) -> bytearray:
+    """
+    Screen written one record at a time
+    """
+    screen = bytearray(b" "*(columns*rows))
+    for (address, data, last, valid) in records:
+        if valid and not last: screen[(address & 0xffff) % len(screen)] = data
+        pass
+    return screen
+
+#a Tests
+#c DprintfDisplayTest
+class DprintfDisplayTest(unittest.TestCase):
+    """
+    DprintfDisplay against writing the screen a record at a time
+    """
+    def check_updates(self, display:DprintfDisplay, updates:list, records:list) -> None:
+        """
+        The updates, applied in order to a blank screen, give the screen;
+        there is one update per string (last record)
+        """
+        screen = bytearray(b" "*display.size)
+        for (address, data) in updates:
+            self.assertLessEqual(address % display.columns + len(data), display.columns)
+            screen[address:address+len(data)] = data
+            pass
+        self.assertEqual(bytes(screen), bytes(display.screen))
+        self.assertEqual(display.strings, len([r for r in records if r[2] and r[3]]))
+        pass
+    def test_consume(self) -> None:
+        rng = Random(1)
+        for (columns, rows) in [(80, None), (16, 8), (100, 3)]:
+            display = DprintfDisplay(columns, rows)
+            records = [r for r in random_records(rng, 200) if r[3]]
+            updates = []
+            display.consume([r[:3] for r in records], lambda a,d:updates.append((a,d)))
+            self.assertEqual(bytes(display.screen), bytes(screen_of_records(records, columns, display.rows)))
+            self.assertEqual(display.bytes_written, len([r for r in records if not r[2]]))
+            self.check_updates(display, updates, records)
+            pass
+        pass
+    def test_capture(self) -> None:
+        """
+        Captures as buffers (in small chunks) and memory mapped files
+        """
+        rng = Random(2)
+        records = random_records(rng, 300)
+        capture = pack_capture([DprintfByte(a, d, l, v) for (a, d, l, v) in records])
+        self.assertEqual(capture[:4], bytes([records[0][0] & 0xff, records[0][0]>>8, records[0][1], 2*records[0][3]+records[0][2]]))
+        expected = bytes(screen_of_records(records, 80, (0x10000+79)//80))
+        for chunk_records in [1, 7, 1<<16]:
+            display = DprintfDisplay()
+            display.chunk_records = chunk_records
+            updates = []
+            display.consume_capture(capture+b"\x00", lambda a,d:updates.append((a,d)))
+            self.assertEqual(bytes(display.screen), expected)
+            self.check_updates(display, updates, records)
+            pass
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "capture.bin")
+            with open(filename, "wb") as f: f.write(capture)
+            display = DprintfDisplay()
+            display.consume_capture(filename)
+            self.assertEqual(bytes(display.screen), expected)
+            with open(filename, "wb") as f: pass
+            DprintfDisplay().consume_capture(filename)
+            pass
+        pass
+    def test_dprintf_bytes(self) -> None:
+        """
+        The bytes of Dprintf messages display their output
+        """
+        display = DprintfDisplay(columns=40, rows=4)
+        records = []
+        for (address, text) in [(0, b"first line"), (40, b"x=\x87\x12\x34\x56\x78"), (45, b"!")]:
+            records += [(b.address, b.data, b.last) for b in Dprintf(address, text).as_dprintf_bytes()]
+            pass
+        display.consume(records)
+        self.assertEqual(str(display), "first line\nx=123!5678")
+        self.assertEqual(list(display.updates()), [(0, b"first line"), (40, b"x=123!5678")])
+        self.assertEqual(list(display.updates()), [])
+        pass
+    pass
@@ -0,0 +1,97 @@
+#a Copyright
+#
+#  This file 'test_dprintf_format.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.dprintf import Dprintf, dprintf_format, dprintf_decode, dprintf_pack
+
+#a Tests
+#c DprintfFormatTest
+class DprintfFormatTest(unittest.TestCase):
+    """
+    Dprintf.format against hand-assembled field bytes, the decoder and
+    Python %-formatting
+    """
+    def test_hand_assembled(self) -> None:
+        """
+        Formats give the bytes test_dprintf.py assembles by hand
+        """
+        for (fmt, args, data) in [("val=%08x n=%5d", (0x1234abcd, 42), b"val=\x87\x12\x34\xab\xcd n=\xd3\x00\x00\x00\x2a\xff"),
+                                  ("%2x%hhd", (0x1ff, 300), b"\x81\xff\xc0\x2c\xff"),
+                                  ("%3X|%hu%%", (0xabcd, 7), b"\x82\x0b\xcd|\xc1\x00\x07%\xff"),
+                                  ("%llx", (-1,), b"\x8f"+b"\xff"*8+b"\xff"),
+                                  ]:
+            d = Dprintf.format(0x40, fmt, *args)
+            self.assertEqual(d.data, data, fmt)
+            self.assertEqual(bytes(d.output), dprintf_decode(data), fmt)
+            self.assertEqual(d.address, 0x40)
+            pass
+        pass
+    def test_random(self) -> None:
+        """
+        Random arguments give the output of Python formatting of the
+        masked arguments, and the data_list of the Dprintf constructor
+        """
+        rng = Random(1)
+        for (fmt, pyfmt, sizes) in [("a=%08x b=%4d c=%x", "a=%08X b=%4d c=%08X", (32, 32, 32)),
+                                    ("%hhx %hx %lx", "%02X %04X %016X", (8, 16, 64)),
+                                    ("%5hhu/%10u %%", "%5d/%10d %%", (8, 32)),
+                                    ("%1x%3x%15x", "%01X%03X%015X", (4, 12, 60)),
+                                    ("a 31 character text, no fields", "a 31 character text, no fields", ()),
+                                    ]:
+            for i in range(100):
+                args = [rng.getrandbits(70) for s in sizes]
+                d = Dprintf.format(0x1234, fmt, *args)
+                self.assertEqual(bytes(d.output), (pyfmt%tuple([a & ((1<<s)-1) for (a, s) in zip(args, sizes)])).encode())
+                self.assertEqual(bytes(d.output), dprintf_decode(d.data))
+                reference = Dprintf(0x1234, d.data)
+                self.assertEqual(d.data_list, reference.data_list)
+                self.assertEqual(bytes(d.output), bytes(reference.output))
+                pass
+            pass
+        pass
+    def test_cache(self) -> None:
+        self.assertIs(dprintf_format("x=%d"), dprintf_format("x=%d"))
+        pass
+    def test_errors(self) -> None:
+        for fmt in ["%17x", "%17X", "%05d", "%11d", "caf\xe9", "nul\x00", "%s", "x=%f", "%5.2f", "%-5d", "%c", "100%"]:
+            with self.assertRaises(ValueError, msg=fmt): dprintf_format(fmt)
+            pass
+        with self.assertRaises(TypeError): Dprintf.format(0, "%d %d", 1)
+        pass
+    def test_length(self) -> None:
+        """
+        Messages must fit in a t_dprintf_req_4; longer ones can be split by
+        dprintf_pack
+        """
+        self.assertEqual(len(Dprintf.format(0, "x"*31).data), 32)
+        self.assertEqual(len(Dprintf.format(0, "x"*27+"%hhx", 1).data), 29+1)
+        self.assertEqual(Dprintf.format(0, "x"*32).data, b"x"*32)
+        self.assertEqual([r.data for r in Dprintf.format_requests(0, "x=%d", 5)], [Dprintf.format(0, "x=%d", 5).data])
+        for (fmt, args) in [("x"*33, ()), ("val=%016llx and another val=%016llx", (1, 2))]:
+            with self.assertRaises(ValueError, msg=fmt): Dprintf.format(0, fmt, *args)
+            data = dprintf_format(fmt).encode(args)[0]
+            requests = Dprintf.format_requests(0x10, fmt, *args)
+            self.assertEqual([(r.address, r.data) for r in requests], [(r.address, r.data) for r in dprintf_pack([Dprintf(0x10, data)])])
+            self.assertEqual(len(requests), 2)
+            self.assertEqual(len(Dprintf.format_requests(0x10, fmt, *args, words=2)), 3)
+            self.assertEqual(b"".join([bytes(r.output) for r in requests]), dprintf_decode(data))
+            for r in requests: self.assertLessEqual(len(r.data), 32)
+            pass
+        pass
+    pass
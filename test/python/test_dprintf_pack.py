@@ -0,0 +1,152 @@
+#a Copyright
+#
+#  This file 'test_dprintf_pack.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.dprintf import Dprintf, dprintf_format, dprintf_pack, dprintf_decode, dprintf_interpret
+
+#a Useful functions
+#f screen_of
+def screen_of(dprintfs:list) -> dict:
+    """
+    Bytes written to each address by dprintfs, in order
+    """
+    screen = {}
+    for d in dprintfs:
+        for (i, c) in enumerate(dprintf_decode(d.data)):
+            screen[(d.address+i) & 0xffff] = c
+            pass
+        pass
+    return screen
+
+#f field_sizes
+def field_sizes(data:bytes) -> list:
+    """
+    Sizes of the characters (1 each) and fields of message data, with
+    zeros and anything after an 0xff dropped
+    """
+    sizes = []
+    n = 0
+    while n<len(data):
+        c = data[n]
+        if c==0xff: break
+        size = 1 if c<0x80 else 1+(((c&0x1f)+2)//2 if c<0xc0 else (c&3)+1)
+        if c!=0: sizes.append(size)
+        n += size
+        pass
+    return sizes
+
+#f count_requests
+def count_requests(messages:list, capacity:int) -> int:
+    """
+    Requests needed filling each with whole fields and characters while
+    the messages run on at consecutive addresses
+    """
+    count = 0
+    room = 0
+    next_address = None
+    for m in messages:
+        if m.address!=next_address: room = 0
+        for size in field_sizes(m.data):
+            if size>room:
+                count += 1
+                room = capacity
+                pass
+            room -= size
+            pass
+        next_address = (m.address+len(m.output)) & 0xffff
+        pass
+    return count
+
+#f message_of
+def message_of(address:int, fmt:str, *args:int) -> Dprintf:
+    """
+    A Dprintf of a format of any length (Dprintf.format takes only those
+    that fit in a request)
+    """
+    return Dprintf(address, dprintf_format(fmt).encode(args)[0])
+
+#f random_message
+def random_message(rng:Random, address:int) -> Dprintf:
+    fmt = ""
+    args = []
+    for i in range(rng.randrange(1, 8)):
+        kind = rng.randrange(4)
+        if kind==0: fmt += "%%0%dx"%rng.randrange(1, 17)
+        elif kind==1: fmt += "%%%dd"%rng.randrange(1, 11)
+        else: fmt += "".join([chr(rng.randrange(33, 127)).replace("%", "%%") for j in range(rng.randrange(1, 20))])
+        if kind<2: args.append(rng.getrandbits(64))
+        pass
+    return message_of(address, fmt, *args)
+
+#a Tests
+#c DprintfPackTest
+class DprintfPackTest(unittest.TestCase):
+    """
+    dprintf_pack against the messages it packs
+    """
+    def check(self, messages:list, words:int) -> list:
+        requests = dprintf_pack(messages, words)
+        self.assertEqual(screen_of(requests), screen_of(messages))
+        self.assertEqual(len(requests), count_requests(messages, 8*words))
+        for r in requests:
+            self.assertLessEqual(len(r.data), 8*words)
+            self.assertLessEqual(len(r.data_list), 4)
+            self.assertEqual(bytes(r.output), dprintf_decode(r.data))
+            skeleton = []
+            dprintf_interpret(r.data, 0, len(r.data), skeleton)
+            self.assertNotIn(False, skeleton, "field split in %r"%r.data)
+            pass
+        return requests
+    def test_continuation(self) -> None:
+        """
+        Short messages at consecutive addresses share requests
+        """
+        messages = [Dprintf.format(0x100+5*i, "a=%02x ", i) for i in range(10)]
+        requests = self.check(messages, 4)
+        self.assertEqual(len(requests), 2)
+        self.assertEqual([r.address for r in requests], [0x100, 0x120])
+        requests = self.check(messages+[Dprintf.format(0x10, "x")], 2)
+        self.assertEqual(requests[-1].address, 0x10)
+        pass
+    def test_long(self) -> None:
+        """
+        A long message is split between fields and within text
+        """
+        message = message_of(0xfff0, "%016x and some text %10d then %016x", 1<<60, 12345, 3)
+        for words in [2, 4]:
+            requests = self.check([message], words)
+            self.assertEqual(requests[0].address, 0xfff0)
+            pass
+        pass
+    def test_random(self) -> None:
+        rng = Random(1)
+        for words in [2, 4]:
+            for i in range(50):
+                messages = []
+                address = rng.randrange(0x10000)
+                for j in range(rng.randrange(1, 20)):
+                    if rng.randrange(4)==0: address = rng.randrange(0x10000)
+                    messages.append(random_message(rng, address))
+                    address = (address+len(messages[-1].output)) & 0xffff
+                    pass
+                self.check(messages, words)
+                pass
+            pass
+        pass
+    pass
@@ -0,0 +1,232 @@
+#a Copyright
+#
+#  This file 'test_dprintf_timing.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Documentation
+# DprintfTiming is checked in simulation by DprintfTest_Timing in
+# test_dprintf.py; these tests check it without a simulator, against
+# DprintfRtl, a register-by-register Python transcription of dprintf.cdl
+# clocked once per cycle
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.dprintf import Dprintf, dprintf_decode
+
+#a DprintfRtl
+#c DprintfRtl
+class DprintfRtl:
+    """
+    The registers of dprintf.cdl (byte_blocked never asserted), updated by
+    clock() as the clock edge does
+    """
+    mask_64 = (1<<64)-1
+    #f __init__
+    def __init__(self):
+        self.ack = 0
+        self.byte = (0, 0, 0, 0) # valid, last, address, data
+        self.full = 0
+        self.address = 0
+        self.data = [self.mask_64]*4
+        self.accumulator = 0
+        self.dividend = 0
+        self.fsm_state = "idle"
+        self.bytes_left = 0
+        self.skip_left = 0
+        pass
+    #f clock
+    def clock(self, req=None) -> None:
+        """
+        Clock edge with dprintf_req of None (invalid) or (address, data_list)
+        """
+        byte = self.data[0]>>56
+        acc_minus_10e9 = (self.accumulator - 1000000000) & ((1<<35)-1)
+        acc_less_than_10e9 = acc_minus_10e9>>34
+        def hex_nybble(n): return 0x30|n if n<=9 else 0x37+n
+
+        action = None
+        if self.fsm_state=="idle":
+            if self.full: action = "start_formatting"
+            pass
+        elif self.fsm_state=="start_byte":
+            action = "write_byte"
+            if byte==0xff:     action = "complete_string"
+            elif byte==0:      action = "skip_byte"
+            elif byte>>6==2:   action = "start_hex"
+            elif byte>>6==3:   action = "start_decimal"
+            pass
+        elif self.fsm_state=="hex_top":     action = "hex_top"
+        elif self.fsm_state=="hex_bottom":  action = "hex_bottom"
+        elif self.fsm_state=="decimal_capture": action = "capture_decimal"
+        elif self.fsm_state=="decimal_predigits": action = "decimal_skip" if acc_less_than_10e9 else "decimal_subtract"
+        elif self.fsm_state=="decimal_nonzero":   action = "decimal_output" if acc_less_than_10e9 else "decimal_subtract"
+
+        (write, write_data, last, pop, increment, completed, decimal) = (False, byte, False, False, False, False, None)
+        (fsm_state, bytes_left, skip_left) = (self.fsm_state, self.bytes_left, self.skip_left)
+        if action=="start_formatting":
+            fsm_state = "start_byte"
+            pass
+        elif action=="write_byte":
+            (write, increment, pop) = (True, True, True)
+            pass
+        elif action=="skip_byte":
+            pop = True
+            pass
+        elif action=="start_hex":
+            pop = True
+            bytes_left = (byte>>1) & 15
+            fsm_state = "hex_top" if byte&1 else "hex_bottom"
+            pass
+        elif action=="hex_top":
+            (write, write_data, increment) = (True, hex_nybble(byte>>4), True)
+            fsm_state = "hex_bottom"
+            pass
+        elif action=="hex_bottom":
+            (write, write_data, increment, pop) = (True, hex_nybble(byte&15), True, True)
+            bytes_left = (self.bytes_left-1) & 15
+            fsm_state = "start_byte" if self.bytes_left==0 else "hex_top"
+            pass
+        elif action=="start_decimal":
+            (pop, decimal) = (True, "zero")
+            (bytes_left, skip_left) = (byte&3, (byte>>2)&15)
+            fsm_state = "decimal_capture"
+            pass
+        elif action=="capture_decimal":
+            (pop, decimal) = (True, "shift")
+            bytes_left = (self.bytes_left-1) & 15
+            if self.bytes_left==0: (fsm_state, bytes_left) = ("decimal_predigits", 9)
+            pass
+        elif action=="decimal_skip":
+            if self.bytes_left<=self.skip_left: (write, write_data, increment) = (True, 0x20, True)
+            if self.bytes_left==0:              (write, write_data, increment) = (True, 0x30, True)
+            decimal = "multiply"
+            bytes_left = (self.bytes_left-1) & 15
+            if self.bytes_left==0: fsm_state = "start_byte"
+            pass
+        elif action=="decimal_output":
+            (write, write_data, increment) = (True, 0x30|self.dividend, True)
+            decimal = "multiply"
+            bytes_left = (self.bytes_left-1) & 15
+            fsm_state = "start_byte" if self.bytes_left==0 else "decimal_nonzero"
+            pass
+        elif action=="decimal_subtract":
+            decimal = "subtract"
+            fsm_state = "decimal_nonzero"
+            pass
+        elif action=="complete_string":
+            (last, completed) = (True, True)
+            fsm_state = "idle"
+            pass
+
+        (ack, full, address, data) = (0, self.full, self.address, list(self.data))
+        if req is not None and not self.full:
+            (ack, full, address, data) = (1, 1, req[0] & 0xffff, [d & self.mask_64 for d in req[1]])
+            pass
+        if pop:
+            for i in range(3): data[i] = ((self.data[i]<<8) & self.mask_64) | (self.data[i+1]>>56)
+            data[3] = ((self.data[3]<<8) & self.mask_64) | 0xff
+            pass
+        if increment: address = (self.address+1) & 0xffff
+        if completed: full = 0
+
+        (accumulator, dividend) = (self.accumulator, self.dividend)
+        if decimal=="zero":       (accumulator, dividend) = (0, 0)
+        elif decimal=="shift":    accumulator = ((self.accumulator & ((1<<26)-1))<<8) | byte
+        elif decimal=="multiply": (accumulator, dividend) = ((((self.accumulator & ((1<<33)-1))<<1) + ((self.accumulator & ((1<<31)-1))<<3)) & ((1<<34)-1), 0)
+        elif decimal=="subtract": (accumulator, dividend) = (acc_minus_10e9 & ((1<<34)-1), (self.dividend+1) & 15)
+
+        if write:  self.byte = (1, 0, self.address, write_data)
+        elif last: self.byte = (1, 1, self.byte[2], self.byte[3])
+        else:      self.byte = (0, 0, self.byte[2], self.byte[3])
+        (self.ack, self.full, self.address, self.data) = (ack, full, address, data)
+        (self.accumulator, self.dividend) = (accumulator, dividend)
+        (self.fsm_state, self.bytes_left, self.skip_left) = (fsm_state, bytes_left, skip_left)
+        pass
+    #f timing
+    def timing(self, address:int, data_list:list) -> tuple[list,int]:
+        """
+        Present a request in cycle 0, and return the (cycle, address, data)
+        of each byte output and the cycle the last marker is valid in
+        """
+        self.clock((address, (list(data_list)+[0]*4)[:4]))
+        assert self.ack
+        output = []
+        cycle = 1
+        while cycle<10000:
+            (valid, last, byte_address, data) = self.byte
+            if valid and last: return (output, cycle)
+            if valid: output.append((cycle, byte_address, data))
+            self.clock()
+            cycle += 1
+            pass
+        raise Exception("dprintf did not complete the request")
+    pass
+
+#a Tests
+#c DprintfTimingTest
+class DprintfTimingTest(unittest.TestCase):
+    """
+    DprintfTiming against clocking DprintfRtl
+    """
+    def check(self, d:Dprintf) -> None:
+        timing = d.timing()
+        (output, cycles) = DprintfRtl().timing(d.address, d.data_list)
+        self.assertEqual(timing.bytes, output, d.data.hex())
+        self.assertEqual(timing.cycles, cycles, d.data.hex())
+        self.assertEqual(sum([c for (_,_,c) in timing.tokens]), cycles-2)
+        pass
+    def test_formats(self) -> None:
+        rng = Random(1)
+        for (fmt, sizes) in [("Hello world", ()),
+                             ("val=%08x n=%5d", (32, 32)),
+                             ("%1x %3X %16x", (4, 12, 64)),
+                             ("%hhd %hd %d %10u", (8, 16, 32, 32)),
+                             ("%4hhu|%7hu|%2d", (8, 16, 32)),
+                             ]:
+            for i in range(20):
+                args = [rng.choice([0, 1, 9, 10, (1<<s)-1, rng.getrandbits(s)]) for s in sizes]
+                d = Dprintf.format(rng.randrange(0x10000), fmt, *args)
+                self.check(d)
+                self.assertEqual(d.timing().output(), bytes(d.output))
+                pass
+            pass
+        pass
+    def test_random(self) -> None:
+        """
+        Random request data, including fields cut off by the end of the
+        request and paddings beyond 10 characters
+        """
+        rng = Random(2)
+        for i in range(500):
+            data = bytes([rng.choice([rng.randrange(256), rng.randrange(0x80, 0xc0), rng.randrange(0xc0, 0xff),
+                                      rng.randrange(32, 127), 0, 0xff]) for j in range(rng.randrange(34))])
+            d = Dprintf.of_request(rng.randrange(0x10000), data, b"")
+            self.check(d)
+            pass
+        pass
+    def test_output(self) -> None:
+        """
+        The bytes output are the decoded request, with zeros padding the
+        request to 32 bytes
+        """
+        rng = Random(3)
+        for i in range(500):
+            data = bytes([rng.choice([rng.randrange(0xc0), rng.randrange(32, 127), 0x87, 0xc7]) for j in range(32)])
+            d = Dprintf(rng.randrange(0x10000), data)
+            self.assertEqual(d.timing().output(), dprintf_decode(data), data.hex())
+            pass
+        pass
+    pass
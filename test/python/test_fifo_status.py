@@ -0,0 +1,70 @@
+#a Copyright
+#
+#  This file 'test_fifo_status.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.fifo_status import FifoStatus
+
+#a Tests
+#c FifoStatusTest
+class FifoStatusTest(unittest.TestCase):
+    def fields(self, status:FifoStatus) -> tuple:
+        return (status.size, status.entries_full, status.spaces_available, status.empty, status.full, status.overflowed, status.underflowed)
+    def test_csr32(self) -> None:
+        """
+        Status words decode to the status they encode
+        """
+        rng = Random(1)
+        for i in range(500):
+            size = rng.randrange(1, 0x3fff)
+            status = FifoStatus(size, rng.randrange(size+1), overflowed=rng.randrange(2)==1, underflowed=rng.randrange(2)==1)
+            value = status.as_csr32()
+            self.assertEqual(value>>32, 0)
+            self.assertEqual(self.fields(FifoStatus.of_csr32(value)), self.fields(status))
+            self.assertEqual(self.fields(FifoStatus.of_csr32(value, size)), self.fields(status))
+            self.assertEqual(status.as_dbg_master_fifo_status(), value)
+            pass
+        self.assertEqual(FifoStatus(515, 0).as_csr32(), 1 | (515<<18))
+        self.assertEqual(FifoStatus(515, 515, overflowed=True).as_csr32(), 2 | 8 | (515<<4))
+        self.assertEqual(FifoStatus(515, 3, underflowed=True).as_csr32(), 4 | (3<<4) | (512<<18))
+        pass
+    def test_saturation(self) -> None:
+        """
+        Counts above 0x3fff saturate; the size then decodes the status
+        """
+        status = FifoStatus(0x10000, 0x8000)
+        self.assertEqual(status.as_csr32(), (0x3fff<<4) | (0x3fff<<18))
+        self.assertEqual(FifoStatus(0x10000, 0x10000).as_csr32(), 2 | (0x3fff<<4))
+        self.assertEqual(FifoStatus.of_csr32(status.as_csr32()).size, 0x7ffe)
+        decoded = FifoStatus.of_csr32(FifoStatus(0x10000, 5).as_csr32(), 0x10000)
+        self.assertEqual(self.fields(decoded), self.fields(FifoStatus(0x10000, 5)))
+        pass
+    def test_push_pop(self) -> None:
+        """
+        Pushing a full FIFO overflows and popping an empty one underflows;
+        both are sticky
+        """
+        status = FifoStatus(2, 0)
+        self.assertFalse(status.pop())
+        self.assertTrue(status.underflowed)
+        self.assertEqual([status.push(), status.push(), status.push()], [True, True, False])
+        self.assertEqual(self.fields(status), (2, 2, 0, False, True, True, True))
+        self.assertEqual([status.pop(), status.pop(), status.pop()], [True, True, False])
+        self.assertEqual(self.fields(status), (2, 0, 2, True, False, True, True))
+        pass
+    pass
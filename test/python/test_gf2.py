@@ -0,0 +1,166 @@
+#a Copyright
+#
+#  This file 'test_gf2.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.gf2 import gf2_mul, gf2_mod, gf2_mulmod, gf2_powmod, gf2_xpow, gf2_divmod, gf2_gcd
+from regress.utils.gf2 import is_prime, prime_factors, gf2_order_of_x, gf2_is_primitive
+
+#a Useful functions
+#f times_x
+def times_x(a:int, poly:int) -> int:
+    """
+    a.x mod poly, as one clock of a CRC register
+    """
+    a <<= 1
+    if a>>(poly.bit_length()-1): a ^= poly
+    return a
+
+#f walk_order
+def walk_order(poly:int) -> int:
+    """
+    Order of x modulo poly by clocking from 1 back to 1 (0 if it never
+    returns)
+    """
+    v = times_x(1, poly)
+    n = 1
+    while v!=1:
+        if n > 1<<poly.bit_length(): return 0
+        v = times_x(v, poly)
+        n += 1
+        pass
+    return n
+
+#a Tests
+#c Gf2ArithmeticTest
+class Gf2ArithmeticTest(unittest.TestCase):
+    """
+    GF(2) polynomial arithmetic against shift-and-reduce
+    """
+    polys = [0x13, 0x11d, 0x104C11DB7, (1<<64)|0x1B, (1<<7)|0x3]
+    def test_mul_mod(self) -> None:
+        rng = Random(1)
+        for poly in self.polys:
+            nbits = poly.bit_length()-1
+            for i in range(50):
+                (a, b) = (rng.getrandbits(nbits), rng.getrandbits(nbits))
+                product = 0
+                for j in range(nbits):
+                    if (b>>j)&1: product ^= a<<j
+                    pass
+                self.assertEqual(gf2_mul(a, b), product)
+                r = product
+                for j in range(r.bit_length()-1, nbits-1, -1):
+                    if (r>>j)&1: r ^= poly<<(j-nbits)
+                    pass
+                self.assertEqual(gf2_mod(product, poly), r)
+                self.assertEqual(gf2_mulmod(a, b, poly), r)
+                (q, r2) = gf2_divmod(product, poly)
+                self.assertEqual(r2, r)
+                self.assertEqual(gf2_mul(q, poly) ^ r, product)
+                if a: self.assertEqual(gf2_divmod(product, a), (b, 0))
+                pass
+            pass
+        pass
+    def test_gcd(self) -> None:
+        rng = Random(3)
+        for i in range(100):
+            (a, b, c) = (rng.getrandbits(12) | 1, rng.getrandbits(12) | 1, rng.getrandbits(8) | 1)
+            g = gf2_gcd(gf2_mul(a, c), gf2_mul(b, c))
+            self.assertEqual(gf2_divmod(gf2_mul(a, c), g)[1], 0)
+            self.assertEqual(gf2_divmod(gf2_mul(b, c), g)[1], 0)
+            self.assertEqual(gf2_divmod(g, c)[1], 0)
+            pass
+        pass
+    def test_xpow(self) -> None:
+        for poly in self.polys:
+            x = 1
+            for n in range(200):
+                self.assertEqual(gf2_xpow(n, poly), x)
+                self.assertEqual(gf2_powmod(2, n, poly), x)
+                self.assertEqual(gf2_mulmod(gf2_xpow(-n, poly), x, poly), 1)
+                x = times_x(x, poly)
+                pass
+            pass
+        pass
+    def test_powmod(self) -> None:
+        rng = Random(2)
+        for poly in self.polys:
+            nbits = poly.bit_length()-1
+            a = rng.getrandbits(nbits)
+            r = 1
+            for n in range(40):
+                self.assertEqual(gf2_powmod(a, n, poly), r)
+                r = gf2_mulmod(r, a, poly)
+                pass
+            pass
+        pass
+    pass
+
+#c Gf2OrderTest
+class Gf2OrderTest(unittest.TestCase):
+    """
+    Order of x and primitivity against walking the sequence
+    """
+    def test_primes(self) -> None:
+        primes = [n for n in range(2, 2000) if all([n%d for d in range(2, n)])]
+        self.assertEqual([n for n in range(2000) if is_prime(n)], primes)
+        for n in [(1<<32)-1, (1<<61)-1, (1<<64)-1, (1<<59)-1, 2**89-1]:
+            factors = prime_factors(n)
+            self.assertTrue(all([is_prime(q) for q in factors]))
+            m = n
+            for q in factors:
+                while m%q==0: m //= q
+                pass
+            self.assertEqual(m, 1)
+            pass
+        pass
+    def test_order_all_small(self) -> None:
+        """
+        Every polynomial of 1 to 10 bits with a constant term
+        """
+        for nbits in range(1, 11):
+            for poly in range((1<<nbits)|1, 1<<(nbits+1), 2):
+                order = walk_order(poly)
+                self.assertEqual(gf2_order_of_x(poly), order, "poly %x"%poly)
+                self.assertEqual(gf2_is_primitive(poly), order==(1<<nbits)-1, "poly %x"%poly)
+                pass
+            pass
+        pass
+    def test_order_reducible(self) -> None:
+        """
+        Non-maximal 8-bit polynomials whose order does not divide 255
+        """
+        for (poly, order) in [(0x103, 63), (0x111, 12), (0x155, 10), (0x10f, 217)]:
+            self.assertEqual(gf2_order_of_x(poly), order)
+            self.assertEqual(walk_order(poly), order)
+            pass
+        self.assertEqual(gf2_order_of_x(0x102), 0)
+        pass
+    def test_order_large(self) -> None:
+        """
+        Products of primitive polynomials (and their squares) of coprime
+        orders
+        """
+        (a, b) = ((1<<31)|(1<<3)|1, (1<<17)|(1<<3)|1)
+        self.assertEqual(gf2_order_of_x(a), (1<<31)-1)
+        self.assertEqual(gf2_order_of_x(gf2_mul(a, b)), ((1<<31)-1)*((1<<17)-1))
+        self.assertEqual(gf2_order_of_x(gf2_mul(gf2_mul(a, b), b)), ((1<<31)-1)*((1<<17)-1)*2)
+        self.assertFalse(gf2_is_primitive(gf2_mul(a, b)))
+        pass
+    pass
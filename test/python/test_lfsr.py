@@ -0,0 +1,165 @@
+#a Copyright
+#
+#  This file 'test_lfsr.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils import lfsr
+from regress.utils.lfsr import Lfsr, max_lfsr, max_lfsr_taps, poly_of_list
+from regress.utils.gf2 import gf2_is_primitive
+
+#a Tests
+#c LfsrClkTest
+class LfsrClkTest(unittest.TestCase):
+    """
+    Lfsr.clk against repeated clk_once
+    """
+    def test_clk(self) -> None:
+        rng = Random(1)
+        for (nbits, poly) in [(32, 0x04C11DB7), (8, 0x1d), (5, 0x5), (64, 0x1b), (80, (1<<38)|0x3)]:
+            l = Lfsr(value=rng.getrandbits(nbits) | 1, nbits=nbits, poly=poly)
+            for n in [0, 1, 3, 8, 100, 513]:
+                start = l.value
+                for i in range(n): l.clk_once()
+                stepped = l.value
+                l.set(start)
+                l.clk(n)
+                self.assertEqual(l.get(), stepped, "nbits %d n %d"%(nbits, n))
+                l.clk(-n)
+                self.assertEqual(l.get(), start, "nbits %d n %d"%(nbits, n))
+                l.set(stepped)
+                pass
+            pass
+        pass
+    def test_clk_period(self) -> None:
+        """
+        Clocking a maximal length LFSR by its period returns to the start
+        """
+        for nbits in [7, 31, 64]:
+            l = max_lfsr(nbits)(value=12345)
+            l.clk((1<<nbits)-1)
+            self.assertEqual(l.get(), 12345)
+            l.clk(1<<(nbits-1))
+            self.assertNotEqual(l.get(), 12345)
+            pass
+        pass
+    pass
+
+#c LfsrLengthTest
+class LfsrLengthTest(unittest.TestCase):
+    """
+    Maximal-length table and sequence lengths
+    """
+    def test_max_lfsr_taps(self) -> None:
+        """
+        Every entry of max_lfsr_taps is primitive and has the stated taps
+        """
+        for (nbits, options) in max_lfsr_taps.items():
+            for (ntaps, taps) in options.items():
+                self.assertEqual(len(taps)+1, ntaps, "%d bits %d taps"%(nbits, ntaps))
+                self.assertTrue(all([0<t<nbits for t in taps]))
+                poly = poly_of_list(taps+[0,nbits])
+                self.assertTrue(gf2_is_primitive(poly), "%d bits %d taps %s"%(nbits, ntaps, str(taps)))
+                self.assertTrue(max_lfsr(nbits, ntaps)().is_maximal())
+                pass
+            self.assertIs(max_lfsr(nbits).__mro__[1], max_lfsr(nbits, min(options)))
+            pass
+        self.assertEqual(sorted(max_lfsr_taps.keys()), list(range(2, 65)))
+        pass
+    def test_max_lfsr_names(self) -> None:
+        """
+        A one-tap list and a tap count of the same number are different
+        classes, whichever is created first
+        """
+        for (nbits, first_list) in [(7, True), (9, False)]:
+            (tap_list, tap_count) = ([2], 2)
+            for name in ["MaxLfsr_%d"%nbits, "MaxLfsr_%d_2"%nbits, "MaxLfsr_%d_taps_2"%nbits]: lfsr._max_lfsr_classes.pop(name, None)
+            if first_list: classes = [max_lfsr(nbits, tap_list), max_lfsr(nbits, tap_count)]
+            else: classes = list(reversed([max_lfsr(nbits, tap_count), max_lfsr(nbits, tap_list)]))
+            self.assertIsNot(classes[0], classes[1])
+            self.assertEqual(classes[0].__name__, "MaxLfsr_%d_taps_2"%nbits)
+            self.assertEqual(classes[1].__name__, "MaxLfsr_%d_2"%nbits)
+            self.assertEqual(classes[0].poly, poly_of_list([2, 0]))
+            self.assertEqual(classes[1].poly, poly_of_list(max_lfsr_taps[nbits][2]+[0]))
+            self.assertIs(max_lfsr(nbits, [2]), classes[0])
+            self.assertIs(max_lfsr(nbits, 2), classes[1])
+            pass
+        pass
+    def test_find_length(self) -> None:
+        """
+        find_length against walking from 1 back to 1
+        """
+        for nbits in [4, 8, 9]:
+            for poly in range(1, 1<<nbits, 2):
+                l = Lfsr(value=1, nbits=nbits, poly=poly)
+                n = 0
+                while True:
+                    l.clk_once()
+                    n += 1
+                    if l.value==1: break
+                    pass
+                self.assertEqual(Lfsr(nbits=nbits, poly=poly).find_length(), n, "poly %x"%poly)
+                pass
+            pass
+        self.assertEqual(Lfsr(nbits=8, poly=0x03).find_length(), 63)
+        self.assertEqual(Lfsr(nbits=8, poly=0x0f).find_length(), 217)
+        self.assertEqual(max_lfsr(33)().find_length(), (1<<33)-1)
+        pass
+    pass
+
+#c LfsrFillTest
+class LfsrFillTest(unittest.TestCase):
+    """
+    Bulk output (fill and stream) against clk_once
+    """
+    def serial_bits(self, l:Lfsr, n:int) -> list[int]:
+        bits = []
+        for i in range(n):
+            bits.append((l.value>>(l.nbits-1))&1)
+            l.clk_once()
+            pass
+        return bits
+    def test_fill(self) -> None:
+        for (nbits, poly) in [(5, 0x5), (8, 0x1d), (16, 0x2d), (31, 0x9), (32, 0x04C11DB7), (64, 0x1b), (72, 0x41)]:
+            for length in [0, 1, 3, 8, 100, 2*nbits*8+5, 3000]:
+                serial = Lfsr(value=0x5a5a5a5a5a5a5a5a5a & ((1<<nbits)-1), nbits=nbits, poly=poly)
+                bits = self.serial_bits(serial, 8*length)
+                l = Lfsr(value=0x5a5a5a5a5a5a5a5a5a & ((1<<nbits)-1), nbits=nbits, poly=poly)
+                buffer = bytearray(length)
+                l.fill(buffer)
+                expected = bytes([int("".join([str(b) for b in bits[8*i:8*i+8]]), 2) for i in range(length)])
+                self.assertEqual(bytes(buffer), expected, "nbits %d length %d"%(nbits, length))
+                self.assertEqual(l.value, serial.value)
+                pass
+            pass
+        pass
+    def test_stream(self) -> None:
+        lfsr = max_lfsr(24)
+        for bits_per_output in [1, 5, 8, 16, 24, 33]:
+            serial = lfsr(value=0x123456)
+            l = lfsr(value=0x123456)
+            for count in [1, 7, 50]:
+                bits = self.serial_bits(serial, count*bits_per_output)
+                expected = [int("".join([str(b) for b in bits[i*bits_per_output:(i+1)*bits_per_output]]), 2) for i in range(count)]
+                r = l.stream(count, bits_per_output)
+                if bits_per_output==8: self.assertIsInstance(r, bytes)
+                self.assertEqual(list(r), expected, "bits_per_output %d count %d"%(bits_per_output, count))
+                self.assertEqual(l.value, serial.value)
+                pass
+            pass
+        pass
+    pass
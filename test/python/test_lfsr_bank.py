@@ -0,0 +1,117 @@
+#a Copyright
+#
+#  This file 'test_lfsr_bank.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.lfsr import Lfsr, max_lfsr
+try:
+    from regress.utils.lfsr_bank import LfsrBank
+    pass
+except ImportError:
+    LfsrBank = None
+    pass
+
+#a Tests
+#c LfsrBankTest
+class LfsrBankTest(unittest.TestCase):
+    """
+    LfsrBank lanes against one Lfsr per lane
+    """
+    def setUp(self) -> None:
+        if LfsrBank is None: self.skipTest("numpy not installed")
+        pass
+    def lanes(self, lfsr_class, values) -> list:
+        return [lfsr_class(value=v) for v in values]
+    def check(self, bank, lanes) -> None:
+        self.assertEqual([int(v) for v in bank.get()], [l.value for l in lanes])
+        pass
+    def test_clk_once(self) -> None:
+        rng = Random(1)
+        for nbits in [5, 17, 32, 64]:
+            lfsr = max_lfsr(nbits)
+            values = [rng.getrandbits(nbits) for i in range(20)]
+            (bank, lanes) = (LfsrBank(lfsr, values), self.lanes(lfsr, values))
+            for i in range(100):
+                bank.clk_once()
+                for l in lanes: l.clk_once()
+                pass
+            self.check(bank, lanes)
+            pass
+        pass
+    def test_clk(self) -> None:
+        rng = Random(2)
+        for nbits in [8, 33, 64]:
+            lfsr = max_lfsr(nbits)
+            values = [rng.getrandbits(nbits) for i in range(20)]
+            (bank, lanes) = (LfsrBank(lfsr, values), self.lanes(lfsr, values))
+            for n in [0, 1, 1000, -37, 1<<40]:
+                bank.clk(n)
+                for l in lanes: l.clk(n)
+                self.check(bank, lanes)
+                pass
+            pass
+        pass
+    def test_clk_lanes(self) -> None:
+        rng = Random(3)
+        lfsr = max_lfsr(48)
+        values = [rng.getrandbits(48) for i in range(50)]
+        counts = [rng.randrange(-500, 500) for i in range(50)]
+        (bank, lanes) = (LfsrBank(lfsr, values), self.lanes(lfsr, values))
+        bank.clk_lanes(counts)
+        for (l, n) in zip(lanes, counts):
+            for i in range(abs(n)): l.clk(1 if n>0 else -1)
+            pass
+        self.check(bank, lanes)
+        pass
+    def test_table_limit(self) -> None:
+        rng = Random(4)
+        lfsr = max_lfsr(32)
+        values = [rng.getrandbits(32) for i in range(10)]
+        (bank, lanes) = (LfsrBank(lfsr, values), self.lanes(lfsr, values))
+        for i in range(3*LfsrBank.max_multiply_tables):
+            n = rng.randrange(-10000, 10000)
+            bank.clk(n)
+            for l in lanes: l.clk(n)
+            self.assertTrue(len(bank.multiply_tables)<=LfsrBank.max_multiply_tables)
+            pass
+        self.check(bank, lanes)
+        for i in range(20):
+            counts = [rng.randrange(-1000, 1000) for l in lanes]
+            bank.clk_lanes(counts)
+            for (l, n) in zip(lanes, counts): l.clk(n)
+            pass
+        self.check(bank, lanes)
+        self.assertTrue(len(bank.step_tables)<=2*10)
+        self.assertTrue(len(bank.multiply_tables)<=LfsrBank.max_multiply_tables)
+        pass
+    def test_lanes_default(self) -> None:
+        bank = LfsrBank(max_lfsr(16), 4)
+        self.assertEqual(len(bank), 4)
+        bank.clk_once()
+        l = max_lfsr(16)()
+        l.clk_once()
+        self.check(bank, [l]*4)
+        bank = LfsrBank(Lfsr, [1, 2], nbits=8, poly=0x1d)
+        bank.clk(9)
+        lanes = [Lfsr(value=v, nbits=8, poly=0x1d) for v in [1, 2]]
+        for l in lanes:
+            for i in range(9): l.clk_once()
+            pass
+        self.check(bank, lanes)
+        pass
+    pass
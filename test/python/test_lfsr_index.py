@@ -0,0 +1,114 @@
+#a Copyright
+#
+#  This file 'test_lfsr_index.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import os
+import tempfile
+import unittest
+from random import Random
+from regress.utils.lfsr import Lfsr, max_lfsr
+from regress.utils.lfsr_index import LfsrIndex
+
+#a Tests
+#c LfsrIndexTest
+class LfsrIndexTest(unittest.TestCase):
+    """
+    Discrete log index against clocking the LFSR
+    """
+    def setUp(self) -> None:
+        self.cache = tempfile.TemporaryDirectory()
+        self.cache_dir = self.cache.name
+        pass
+    def tearDown(self) -> None:
+        self.cache.cleanup()
+        pass
+    def test_walk(self) -> None:
+        """
+        Every state of small LFSRs, including a reducible polynomial
+        """
+        for (nbits, poly) in [(8, max_lfsr(8).poly), (10, max_lfsr(10).poly), (8, 0x03)]:
+            l = Lfsr(value=1, nbits=nbits, poly=poly)
+            index = LfsrIndex(l.poly, cache_dir=self.cache_dir)
+            for k in range(index.order):
+                self.assertEqual(index.cycles_between(1, l.value), k)
+                l.clk_once()
+                pass
+            self.assertEqual(l.value, 1)
+            pass
+        pass
+    def test_random(self) -> None:
+        rng = Random(1)
+        for nbits in [17, 31, 32, 48, 64]:
+            lfsr = max_lfsr(nbits)
+            for i in range(3):
+                seed = rng.getrandbits(nbits) | 1
+                k = rng.randrange((1<<nbits)-1)
+                l = lfsr(value=seed)
+                l.clk(k)
+                self.assertEqual(lfsr(value=seed).cycles_to(l.value, cache_dir=self.cache_dir), k)
+                pass
+            pass
+        pass
+    def test_not_in_sequence(self) -> None:
+        l = Lfsr(value=1, nbits=8, poly=0x03)
+        index = LfsrIndex(l.poly, cache_dir=self.cache_dir)
+        sequence = set()
+        for i in range(index.order):
+            sequence.add(l.value)
+            l.clk_once()
+            pass
+        value = min(set(range(1,256)) - sequence)
+        with self.assertRaises(ValueError): index.cycles_between(1, value)
+        with self.assertRaises(ValueError): index.cycles_between(1, 0)
+        pass
+    def test_refused(self) -> None:
+        """
+        Widths whose order has too large a prime factor are refused
+        """
+        for nbits in [49, 59, 61]:
+            with self.assertRaises(ValueError):
+                LfsrIndex(max_lfsr(nbits)().poly, cache_dir=self.cache_dir)
+                pass
+            pass
+        index = LfsrIndex(max_lfsr(49)().poly, max_table_entries=1<<23, cache_dir=self.cache_dir)
+        self.assertLessEqual(index.giant_steps(4432676798593), index.max_giant_steps)
+        pass
+    def test_cache(self) -> None:
+        """
+        Tables are saved, reloaded, and rewritten if they do not check out
+        """
+        poly = max_lfsr(31)().poly
+        l = max_lfsr(31)(value=1)
+        l.clk(123456789)
+        self.assertEqual(LfsrIndex(poly, cache_dir=self.cache_dir).cycles_between(1, l.value), 123456789)
+        files = os.listdir(self.cache_dir)
+        self.assertEqual(len(files), 1)
+        filename = os.path.join(self.cache_dir, files[0])
+        with open(filename, "rb") as f: data = f.read()
+        index = LfsrIndex(poly, cache_dir=self.cache_dir)
+        q = (1<<31)-1
+        m = index.table_size(q)
+        g = index.modulus.xpow(index.order//q)
+        self.assertIsNotNone(index.load(q, m, g))
+        for corrupt in [data[:-1], data.replace(b"lfsr_index 1", b"lfsr_index 0"), data[:-4]+b"\xff\xff\xff\xff", b"\x80\x04garbage"]:
+            with open(filename, "wb") as f: f.write(corrupt)
+            self.assertIsNone(index.load(q, m, g))
+            self.assertEqual(LfsrIndex(poly, cache_dir=self.cache_dir).cycles_between(1, l.value), 123456789)
+            with open(filename, "rb") as f: self.assertEqual(f.read(), data)
+            pass
+        pass
+    pass
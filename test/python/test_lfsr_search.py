@@ -0,0 +1,109 @@
+#a Copyright
+#
+#  This file 'test_lfsr_search.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import os
+import tempfile
+import unittest
+from itertools import combinations
+from regress.utils.lfsr import Lfsr, poly_of_list, max_lfsr_taps
+from regress.utils.lfsr_search import search_taps, tap_cost, table_source, write_table
+from regress.utils.gf2 import gf2_is_primitive
+
+#a Useful functions
+#f is_maximal_by_walk
+def is_maximal_by_walk(nbits:int, taps) -> bool:
+    """
+    True if the LFSR returns to 1 only after 2^nbits-1 clocks
+    """
+    l = Lfsr(value=1, nbits=nbits, poly=poly_of_list(list(taps)+[0]))
+    for i in range((1<<nbits)-2):
+        l.clk_once()
+        if l.value==1: return False
+        pass
+    l.clk_once()
+    return l.value==1
+
+#a Tests
+#c LfsrSearchTest
+class LfsrSearchTest(unittest.TestCase):
+    """
+    Tap set search against walking every candidate LFSR
+    """
+    def test_search_small(self) -> None:
+        for nbits in range(2, 11):
+            for ntaps in [2, 3, 4]:
+                expected = set()
+                for taps in combinations(range(nbits-1, 0, -1), ntaps-1):
+                    if is_maximal_by_walk(nbits, taps): expected.add(taps)
+                    pass
+                found = search_taps(nbits, ntaps, processes=1)
+                self.assertEqual(set(found), expected, "%d bits %d taps"%(nbits, ntaps))
+                self.assertEqual(len(found), len(expected))
+                pass
+            pass
+        pass
+    def test_cost_order(self) -> None:
+        """
+        Options are cheapest first at the given steps per clock
+        """
+        for steps in [1, 8]:
+            found = search_taps(12, 4, steps=steps, processes=1)
+            costs = [tap_cost(12, taps, steps) for taps in found]
+            self.assertEqual(costs, sorted(costs))
+            pass
+        self.assertEqual(tap_cost(8, (6,5,4), 1), (2, 11))
+        pass
+    def test_process_pool(self) -> None:
+        self.assertEqual(search_taps(14, 4, processes=2), search_taps(14, 4, processes=1))
+        pass
+    pass
+
+#c LfsrTableTest
+class LfsrTableTest(unittest.TestCase):
+    """
+    Generated max_lfsr_taps tables
+    """
+    def table_of_source(self, source:str) -> dict:
+        namespace = {}
+        exec(source, namespace)
+        return namespace["max_lfsr_taps"]
+    def test_table_source(self) -> None:
+        options = {(nbits,ntaps):search_taps(nbits, ntaps, processes=1) for nbits in range(2, 13) for ntaps in (2,4)}
+        table = self.table_of_source(table_source(options))
+        expected = {}
+        for ((nbits, ntaps), found) in options.items():
+            if found: expected.setdefault(nbits, {})[ntaps] = list(found[0])
+            pass
+        self.assertEqual(table, expected)
+        for (nbits, entry) in table.items():
+            for (ntaps, taps) in entry.items():
+                self.assertTrue(gf2_is_primitive(poly_of_list(taps+[0,nbits])))
+                pass
+            self.assertEqual(set(entry.keys()), set(max_lfsr_taps[nbits].keys()), "%d bits"%nbits)
+            pass
+        pass
+    def test_write_table(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "lfsr_table.py")
+            write_table(filename, range(5, 9), (2,4), steps=8, processes=2, max_options=2)
+            with open(filename) as f: source = f.read()
+            pass
+        self.assertEqual(self.table_of_source(source)[8], {4:list(search_taps(8, 4, steps=8, processes=1)[0])})
+        self.assertIn("# Generated by lfsr_search.write_table; options ordered by cost at 8 bits per clock", source)
+        pass
+    pass
@@ -0,0 +1,90 @@
+#a Copyright
+#
+#  This file 'test_parallel_xor.py' copyright Gavin J Stark 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import unittest
+from random import Random
+from regress.utils.parallel_xor import XorEquations
+from regress.utils.crc import crc, crc_bytes, crc_catalogue
+from regress.utils.lfsr import max_lfsr
+
+#a Tests
+#c XorEquationsTest
+class XorEquationsTest(unittest.TestCase):
+    """
+    Parallel CRC and LFSR equations against the serial models
+    """
+    def test_crc_bytes(self) -> None:
+        """
+        One byte per clock against the table-driven CRC
+        """
+        rng = Random(1)
+        for cls in [crc, crc_catalogue["CRC-16/XMODEM"], crc_catalogue["CRC-8/SMBUS"]]:
+            x = XorEquations.of_crc(cls, 8)
+            for i in range(200):
+                (state, data) = (rng.getrandbits(cls.nbits), rng.randrange(256))
+                self.assertEqual(x.evaluate(state, data), [crc_bytes(state, bytes([data]), cls.poly, cls.nbits)])
+                pass
+            pass
+        pass
+    def test_crc_shared(self) -> None:
+        """
+        Sharing subexpressions keeps the equations equal, and does not add
+        XOR gates
+        """
+        for (cls, data_bits) in [(crc, 8), (crc, 32), (crc_catalogue["CRC-16/XMODEM"], 16)]:
+            x = XorEquations.of_crc(cls, data_bits)
+            self.assertTrue(x.check_against_serial(200))
+            xors = x.num_xors()
+            x.share_subexpressions()
+            self.assertTrue(x.check_against_serial(200))
+            self.assertLessEqual(x.num_xors(), xors)
+            self.assertGreater(len(x.terms), 0)
+            pass
+        pass
+    def test_lfsr(self) -> None:
+        for (nbits, steps) in [(8, 8), (31, 16), (64, 64)]:
+            x = XorEquations.of_lfsr(max_lfsr(nbits), steps)
+            self.assertTrue(x.check_against_serial(200))
+            x.share_subexpressions()
+            self.assertTrue(x.check_against_serial(200))
+            pass
+        pass
+    def test_lfsr_out(self) -> None:
+        """
+        The out bits are those shifted out of the top, first in out[steps-1]
+        """
+        lfsr = max_lfsr(16)
+        x = XorEquations.of_lfsr(lfsr, 16)
+        l = lfsr(value=0x1234)
+        bits = 0
+        for i in range(16):
+            bits = (bits<<1) | (l.value>>15)
+            l.clk_once()
+            pass
+        self.assertEqual(x.evaluate(0x1234), [l.value, bits])
+        pass
+    def test_as_cdl(self) -> None:
+        x = XorEquations.of_crc(crc_catalogue["CRC-8/SMBUS"], 8)
+        x.share_subexpressions()
+        cdl = x.as_cdl("crc8_x8")
+        self.assertIn("module crc8_x8( input bit[8] state", cdl)
+        for i in range(8): self.assertIn("next_state[%d] = "%i, cdl)
+        for i in range(len(x.terms)): self.assertIn("comb bit xor_%d;"%i, cdl)
+        self.assertIn("(%d two-input XORs, depth %d)"%(x.num_xors(), x.max_depth()), cdl)
+        pass
+    pass